@@ -0,0 +1,87 @@
+"""Authentication hot paths: tokens, password login and current-identity resolution."""
+from benchmarks import fixtures
+from benchmarks.harness import benchmark
+
+
+@benchmark("token.create_access_token", iterations=20_000)
+async def create_access_token():
+    from pydentity.core.services import TokenService
+
+    service = TokenService()
+    data = {"sub": fixtures.BENCH_USERNAME}
+    return lambda: service.create_access_token(data)
+
+
+@benchmark("token.decode_token", iterations=20_000)
+async def decode_token():
+    from pydentity.core.services import TokenService
+
+    service = TokenService()
+    token = service.create_access_token({"sub": fixtures.BENCH_USERNAME})
+    return lambda: service.decode_token(token)
+
+
+async def _auth_service(throttled: bool = False):
+    from pydentity.core.services import AuthService, TokenService
+    from pydentity.core.services.login_throttle import LoginThrottle
+
+    await fixtures.init_database()
+    await fixtures.create_bench_user()
+    service = AuthService(TokenService())
+    if not throttled:
+        # Repeated failures would otherwise trip the lockout and turn the case into a rejection benchmark
+        service.login_throttle = LoginThrottle(10**9, 10**9, window_seconds=300, lockout_seconds=900)
+    return service
+
+
+@benchmark("auth.authenticate_user.valid", iterations=50, warmup=2)
+async def authenticate_user_valid():
+    service = await _auth_service()
+
+    async def run():
+        await service.authenticate_user(fixtures.BENCH_USERNAME, fixtures.BENCH_PASSWORD)
+    return run
+
+
+@benchmark("auth.authenticate_user.wrong_password", iterations=50, warmup=2)
+async def authenticate_user_wrong_password():
+    service = await _auth_service()
+
+    async def run():
+        await service.authenticate_user(fixtures.BENCH_USERNAME, "Wrong123!pass")
+    return run
+
+
+@benchmark("auth.authenticate_user.unknown_user", iterations=50, warmup=2)
+async def authenticate_user_unknown_user():
+    service = await _auth_service()
+
+    async def run():
+        await service.authenticate_user("nobody-here", fixtures.BENCH_PASSWORD)
+    return run
+
+
+@benchmark("auth.authenticate_user.locked_out", iterations=50_000)
+async def authenticate_user_locked_out():
+    from fastapi import HTTPException
+
+    service = await _auth_service(throttled=True)
+    for _ in range(service.login_throttle._usernames.max_failures):
+        service.login_throttle.record_failure("locked-user", "203.0.113.7")
+
+    async def run():
+        try:
+            await service.authenticate_user("locked-user", "Wrong123!pass", source="203.0.113.7")
+        except HTTPException:
+            pass
+    return run
+
+
+@benchmark("auth.get_current_identity", iterations=2_000)
+async def get_current_identity():
+    service = await _auth_service()
+    token = service.token_service.create_access_token({"sub": fixtures.BENCH_USERNAME})
+
+    async def run():
+        await service.get_current_identity(token)
+    return run
@@ -0,0 +1,233 @@
+"""Authorization hot paths: role permission checks and the require_* decorators."""
+from benchmarks import fixtures
+from benchmarks.harness import benchmark
+
+
+async def _identity(permission_count: int = 50, claims=None):
+    """Build an in-memory identity so that only the check itself is measured."""
+    from pydentity.core.models import IdentityType, Role, User
+
+    # Documents can only be built once Beanie knows their collections
+    await fixtures.init_database()
+    role = Role(name="bench-role", permissions=[f"resource{i}:read" for i in range(permission_count)])
+    return User(
+        username=fixtures.BENCH_USERNAME,
+        email="bench@example.com",
+        hashed_password="not-a-real-hash",
+        identity_type=IdentityType.user,
+        roles=[role],
+        claims=claims or {"department": ["engineering", "ops"], "clearance": ["3"]},
+    )
+
+
+@benchmark("identity.has_role_permission.hit", iterations=50_000)
+async def has_role_permission_hit():
+    identity = await _identity()
+
+    async def run():
+        await identity.has_role_permission("resource49:read")
+    return run
+
+
+@benchmark("identity.has_role_permission.miss", iterations=50_000)
+async def has_role_permission_miss():
+    identity = await _identity()
+
+    async def run():
+        await identity.has_role_permission("resource:write")
+    return run
+
+
+def _wildcard_grants(count: int = 10_000):
+    """Exact grants plus one wildcard grant per resource family, as a large role might hold."""
+    grants = [f"resource{i}:items:read" for i in range(count)]
+    grants += [f"family{i}:*" for i in range(count // 100)]
+    return grants
+
+
+@benchmark("role.fetch_and_check.1k", iterations=2_000)
+async def role_fetch_and_check():
+    """A role read from the database and checked, as every request does with a fresh copy."""
+    from pydentity.core.models import Role
+
+    await fixtures.init_database()
+    grants = _wildcard_grants(1_000)
+    role = Role(name="bench-large-role", permissions=grants, effective_permissions=grants)
+    await role.insert()
+
+    async def run():
+        fetched = await Role.get(role.id)
+        fetched.grants("resource999:items:read")
+    return run
+
+
+@benchmark("permissions.compile.10k", iterations=50, warmup=5)
+async def compile_10k():
+    from pydentity.core.permissions import PermissionMatcher
+
+    grants = _wildcard_grants()
+
+    def run():
+        PermissionMatcher(grants)
+    return run
+
+
+@benchmark("permissions.match.10k.exact", iterations=100_000)
+async def match_10k_exact():
+    from pydentity.core.permissions import PermissionMatcher
+
+    matcher = PermissionMatcher(_wildcard_grants())
+
+    def run():
+        matcher.matches("resource9999:items:read")
+    return run
+
+
+@benchmark("permissions.match.10k.wildcard", iterations=100_000)
+async def match_10k_wildcard():
+    from pydentity.core.permissions import PermissionMatcher
+
+    matcher = PermissionMatcher(_wildcard_grants())
+
+    def run():
+        matcher.matches("family99:billing:invoices:read")
+    return run
+
+
+@benchmark("permissions.match.10k.miss", iterations=100_000)
+async def match_10k_miss():
+    from pydentity.core.permissions import PermissionMatcher
+
+    matcher = PermissionMatcher(_wildcard_grants())
+
+    def run():
+        matcher.matches("resource9999:items:write")
+    return run
+
+
+@benchmark("permissions.fnmatch.10k.miss", iterations=200, warmup=5)
+async def fnmatch_10k_miss():
+    """Reference point: the naive scan of every grant with fnmatch that the matcher replaces."""
+    from fnmatch import fnmatchcase
+
+    grants = _wildcard_grants()
+
+    def run():
+        any(fnmatchcase("resource9999:items:write", grant) for grant in grants)
+    return run
+
+
+async def _endpoint(*args, current_identity, **kwargs):
+    return None
+
+
+@benchmark("decorators.require_permissions", iterations=50_000)
+async def require_permissions():
+    from pydentity.utils.decorators import require_permissions
+
+    identity = await _identity()
+    endpoint = require_permissions(["resource1:read", "resource49:read"])(_endpoint)
+
+    async def run():
+        await endpoint(current_identity=identity)
+    return run
+
+
+@benchmark("decorators.require_any_permission", iterations=50_000)
+async def require_any_permission():
+    from pydentity.utils.decorators import require_any_permission
+
+    identity = await _identity()
+    endpoint = require_any_permission(["resource:write", "resource49:read"])(_endpoint)
+
+    async def run():
+        await endpoint(current_identity=identity)
+    return run
+
+
+@benchmark("decorators.require_claims", iterations=50_000)
+async def require_claims():
+    from pydentity.utils.decorators import require_claims
+
+    identity = await _identity()
+    endpoint = require_claims({"department": ["eng", "ops"], "clearance": "3"})(_endpoint)
+
+    async def run():
+        await endpoint(current_identity=identity)
+    return run
+
+
+@benchmark("decorators.require_any_claim", iterations=50_000)
+async def require_any_claim():
+    from pydentity.utils.decorators import require_any_claim
+
+    identity = await _identity()
+    endpoint = require_any_claim({"team": "platform", "department": ["engineering"]})(_endpoint)
+
+    async def run():
+        await endpoint(current_identity=identity)
+    return run
+
+
+POLICY = "(department in {engineering, ops}) and clearance >= 3 and not suspended"
+
+
+@benchmark("decorators.require_policy.claims", iterations=50_000)
+async def require_policy_claims():
+    """The rule of decorators.require_claims, written as a policy."""
+    from pydentity.utils.decorators import require_policy
+
+    identity = await _identity()
+    endpoint = require_policy("department in {eng, ops} and clearance == 3")(_endpoint)
+
+    async def run():
+        await endpoint(current_identity=identity)
+    return run
+
+
+@benchmark("decorators.require_policy.compound", iterations=50_000)
+async def require_policy_compound():
+    from pydentity.utils.decorators import require_policy
+
+    identity = await _identity()
+    endpoint = require_policy(POLICY)(_endpoint)
+
+    async def run():
+        await endpoint(current_identity=identity)
+    return run
+
+
+@benchmark("policy.evaluate.compound", iterations=100_000)
+async def policy_evaluate_compound():
+    from pydentity.core.policy import Policy
+
+    policy = Policy(POLICY)
+    claims = (await _identity()).claims
+
+    def run():
+        policy(claims)
+    return run
+
+
+@benchmark("policy.compile.compound", iterations=5_000)
+async def policy_compile_compound():
+    from pydentity.core.policy import Policy
+
+    def run():
+        Policy(POLICY)
+    return run
+
+
+@benchmark("claims.dict_loop.reference", iterations=50_000)
+async def claims_dict_loop_reference():
+    """Reference point: the per-request normalization and list scans require_claims used to do."""
+    claims = {"department": ["eng", "ops"], "clearance": "3"}
+    held = (await _identity()).claims
+
+    def run():
+        for claim_type, claim_values in claims.items():
+            if isinstance(claim_values, str):
+                claim_values = [claim_values]
+            if claim_type not in held or not any(value in held[claim_type] for value in claim_values):
+                break
+    return run
@@ -0,0 +1,59 @@
+"""JWT backends: encode and decode throughput per backend and algorithm."""
+import time
+from functools import lru_cache
+from typing import Tuple
+
+from benchmarks.harness import benchmark
+
+SECRET = "bench-secret-key-bench-secret-key-1234"
+
+# algorithm -> (iterations, backends that support it)
+ALGORITHMS = {
+    "HS256": (20_000, ("pyjwt", "jose")),
+    "RS256": (200, ("pyjwt", "jose")),  # python-jose parses the PEM key on every call
+    "EdDSA": (5_000, ("pyjwt",)),  # python-jose has no EdDSA
+}
+
+
+@lru_cache(maxsize=None)
+def _keys(algorithm: str) -> Tuple[str, str]:
+    """Return the (signing, verification) keys of an algorithm, as the settings would hold them."""
+    if algorithm.startswith("HS"):
+        return SECRET, SECRET
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048) if algorithm == "RS256" else ed25519.Ed25519PrivateKey.generate()
+    private = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    public = key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+    return private.decode(), public.decode()
+
+
+def _claims() -> dict:
+    return {"sub": "bench-user", "tid": "acme", "exp": int(time.time()) + 3600}
+
+
+def _register(backend_name: str, algorithm: str, iterations: int) -> None:
+    @benchmark(f"jwt.{backend_name}.{algorithm}.encode", iterations=iterations)
+    async def encode():
+        from pydentity.core.jwt_backends import get_jwt_backend
+
+        backend = get_jwt_backend(backend_name)
+        signing_key, _ = _keys(algorithm)
+        claims = _claims()
+        return lambda: backend.encode(claims, signing_key, algorithm)
+
+    @benchmark(f"jwt.{backend_name}.{algorithm}.decode", iterations=iterations)
+    async def decode():
+        from pydentity.core.jwt_backends import get_jwt_backend
+
+        backend = get_jwt_backend(backend_name)
+        signing_key, verifying_key = _keys(algorithm)
+        token = backend.encode(_claims(), signing_key, algorithm)
+        algorithms = [algorithm]
+        return lambda: backend.decode(token, verifying_key, algorithms)
+
+
+for _algorithm, (_iterations, _backends) in ALGORITHMS.items():
+    for _backend in _backends:
+        _register(_backend, _algorithm, _iterations)
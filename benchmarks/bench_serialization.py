@@ -0,0 +1,70 @@
+"""Response serialization: list endpoints encoding users with their roles."""
+import json
+
+from benchmarks import fixtures
+from benchmarks.harness import benchmark
+
+
+async def _users(count: int):
+    """Build in-memory users with fetched roles, as a list endpoint would hold them."""
+    from beanie import PydanticObjectId
+    from pydentity.core.models import IdentityType, Role, User
+
+    await fixtures.init_database()
+    roles = [Role(id=PydanticObjectId(), name=f"role{i}", permissions=[f"resource{i}:read", f"resource{i}:write"]) for i in range(3)]
+    return [
+        User(
+            id=PydanticObjectId(),
+            username=f"user{i:06d}",
+            email=f"user{i}@example.com",
+            hashed_password="not-a-real-hash",
+            identity_type=IdentityType.user,
+            roles=roles,
+            claims={"department": ["engineering"], "clearance": ["3"]},
+        )
+        for i in range(count)
+    ]
+
+
+async def _response_model(count: int):
+    """What FastAPI does for ``response_model=List[UserOut]``: validate, dump to Python, then json.dumps."""
+    from typing import List
+    from pydantic import TypeAdapter
+    from pydentity.core.schemas.user import UserOut
+
+    users = await _users(count)
+    adapter = TypeAdapter(List[UserOut])
+
+    def run():
+        content = adapter.dump_python(adapter.validate_python(users, from_attributes=True), mode="json")
+        json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+    return run
+
+
+async def _serializer(count: int):
+    from pydentity.core.schemas.user import UserOut
+    from pydentity.core.serialization import get_serializer
+
+    users = await _users(count)
+    serializer = get_serializer(UserOut)
+    return lambda: serializer.dump_many(users)
+
+
+@benchmark("serialize.users.1k.response_model", iterations=50, warmup=5)
+async def users_1k_response_model():
+    return await _response_model(1_000)
+
+
+@benchmark("serialize.users.1k.serializer", iterations=50, warmup=5)
+async def users_1k_serializer():
+    return await _serializer(1_000)
+
+
+@benchmark("serialize.users.10k.response_model", iterations=10, warmup=2)
+async def users_10k_response_model():
+    return await _response_model(10_000)
+
+
+@benchmark("serialize.users.10k.serializer", iterations=10, warmup=2)
+async def users_10k_serializer():
+    return await _serializer(10_000)
@@ -0,0 +1,49 @@
+"""Credential validators from pydentity.utils.validators."""
+from benchmarks.harness import benchmark
+
+
+@benchmark("validators.validate_password", iterations=100_000)
+async def validate_password():
+    from pydentity.utils.validators import validate_password
+
+    return lambda: validate_password("Sup3r$ecretPassw0rd")
+
+
+@benchmark("validators.validate_username", iterations=100_000)
+async def validate_username():
+    from pydentity.utils.validators import validate_username
+
+    return lambda: validate_username("bench_user-01")
+
+
+@benchmark("validators.validate_api_key", iterations=100_000)
+async def validate_api_key():
+    from pydentity.utils.validators import validate_api_key
+
+    return lambda: validate_api_key("0123456789abcdef0123456789abcdef")
+
+
+@benchmark("validators.validate_email", iterations=20_000)
+async def validate_email():
+    from pydentity.utils.validators import validate_email
+
+    return lambda: validate_email("bench.user@example.com")
+
+
+BATCH_SIZE = 10_000
+
+
+@benchmark("validators.validate_passwords.batch_10k", iterations=20, warmup=2)
+async def validate_passwords_batch():
+    from pydentity.utils.validators import validate_passwords
+
+    passwords = [f"Sup3r$ecret{i}" if i % 3 else f"weak{i}" for i in range(BATCH_SIZE)]
+    return lambda: validate_passwords(passwords)
+
+
+@benchmark("validators.validate_usernames.batch_10k", iterations=20, warmup=2)
+async def validate_usernames_batch():
+    from pydentity.utils.validators import validate_usernames
+
+    usernames = [f"user_{i}" if i % 5 else f"{i}user" for i in range(BATCH_SIZE)]
+    return lambda: validate_usernames(usernames)
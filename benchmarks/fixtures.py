@@ -0,0 +1,86 @@
+"""Shared benchmark fixtures: settings, database and sample identities."""
+import os
+from typing import Optional
+
+# Settings are read from the environment; give the required ones harmless values so the
+# benchmarks run without a .env file. Real values in the environment take precedence.
+BENCH_ENV = {
+    "SECRET_KEY": "benchmark-secret-key-benchmark-secret-key",
+    "MONGODB_URL": "mongodb://localhost:27017",
+    "GOOGLE_CLIENT_ID": "bench",
+    "APPLE_CLIENT_ID": "bench",
+    "APPLE_TEAM_ID": "bench",
+    "APPLE_KEY_ID": "bench",
+    "APPLE_PRIVATE_KEY": "bench",
+    "FACEBOOK_APP_ID": "bench",
+    "FACEBOOK_APP_SECRET": "bench",
+    "FIRST_SUPERUSER": "admin@example.com",
+    "FIRST_SUPERUSER_PASSWORD": "Admin123!",
+    "BCRYPT_ROUNDS": "10",
+}
+for key, value in BENCH_ENV.items():
+    os.environ.setdefault(key, value)
+
+BENCH_DB_NAME = "pydentity_bench"
+BENCH_USERNAME = "benchuser"
+BENCH_PASSWORD = "Bench123!pass"
+
+# Set by the runner from --mongo-url
+MONGO_URL: Optional[str] = None
+
+_initialized = False
+
+
+async def init_database() -> None:
+    """
+    Initialize Beanie once for the benchmark process.
+
+    Uses the Mongo server at ``MONGO_URL`` when set, otherwise an in-memory stand-in from
+    ``mongomock_motor`` so that query benchmarks measure our code rather than the network.
+    """
+    global _initialized
+    if _initialized:
+        return
+
+    from beanie import init_beanie
+    from pydentity.core.models import Agent, Identity, Role, User
+
+    if MONGO_URL:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(MONGO_URL)
+    else:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError as e:
+            raise RuntimeError(
+                "Install mongomock-motor or pass --mongo-url to run database benchmarks"
+            ) from e
+        client = AsyncMongoMockClient()
+
+    database = client[BENCH_DB_NAME]
+    await init_beanie(database=database, document_models=[Identity, User, Agent, Role])
+    await User.find_all().delete()
+    await Role.find_all().delete()
+    _initialized = True
+
+
+async def create_bench_user(permission_count: int = 20):
+    """Insert the benchmark user with one role holding ``permission_count`` permissions."""
+    from pydentity.core.models import IdentityType, Role, User
+    from pydentity.core.security import get_password_context
+
+    existing = await User.by_username(BENCH_USERNAME)
+    if existing:
+        return existing
+
+    role = Role(name="bench-role", permissions=[f"resource{i}:read" for i in range(permission_count)])
+    await role.insert()
+    user = User(
+        username=BENCH_USERNAME,
+        email="bench@example.com",
+        hashed_password=get_password_context().hash(BENCH_PASSWORD),
+        identity_type=IdentityType.user,
+        roles=[role],
+    )
+    await user.insert()
+    return user
@@ -0,0 +1,160 @@
+"""Benchmark registry, timing loop and baseline storage."""
+import asyncio
+import json
+import platform
+import subprocess
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+
+BenchFn = Callable[[], Union[None, Awaitable[None]]]
+SetupFn = Callable[[], Awaitable[BenchFn]]
+
+
+@dataclass
+class Case:
+    """
+    A registered benchmark.
+
+    Attributes:
+        name (str): Dotted name of the benchmark, e.g. ``token.create_access_token``.
+        setup (SetupFn): Coroutine that prepares state and returns the callable to time.
+        iterations (int): Number of timed calls.
+        warmup (int): Number of untimed calls made before timing starts.
+    """
+    name: str
+    setup: SetupFn
+    iterations: int
+    warmup: int
+
+
+@dataclass
+class Result:
+    """
+    Timing summary of one benchmark run.
+
+    Attributes:
+        name (str): Name of the benchmark.
+        iterations (int): Number of timed calls.
+        ops_per_sec (float): Throughput over the whole timed loop.
+        p50_us (float): Median latency of a single call, in microseconds.
+        p99_us (float): 99th percentile latency of a single call, in microseconds.
+    """
+    name: str
+    iterations: int
+    ops_per_sec: float
+    p50_us: float
+    p99_us: float
+
+
+REGISTRY: Dict[str, Case] = {}
+
+
+def benchmark(name: str, iterations: int = 10_000, warmup: int = 100):
+    """
+    Register a benchmark.
+
+    The decorated coroutine runs once before timing and returns the sync or async callable
+    that is timed, so fixtures such as documents and tokens are built outside the loop.
+    """
+    def decorator(setup: SetupFn) -> SetupFn:
+        REGISTRY[name] = Case(name=name, setup=setup, iterations=iterations, warmup=warmup)
+        return setup
+    return decorator
+
+
+def percentile(samples: List[int], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_case(case: Case, scale: float = 1.0) -> Result:
+    fn = await case.setup()
+    is_async = asyncio.iscoroutinefunction(fn)
+    iterations = max(1, int(case.iterations * scale))
+    samples: List[int] = []
+    clock = time.perf_counter_ns
+
+    for _ in range(case.warmup):
+        if is_async:
+            await fn()
+        else:
+            fn()
+
+    started = clock()
+    if is_async:
+        for _ in range(iterations):
+            t0 = clock()
+            await fn()
+            samples.append(clock() - t0)
+    else:
+        for _ in range(iterations):
+            t0 = clock()
+            fn()
+            samples.append(clock() - t0)
+    total = clock() - started
+
+    return Result(
+        name=case.name,
+        iterations=iterations,
+        ops_per_sec=iterations / (total / 1e9),
+        p50_us=percentile(samples, 0.50) / 1000,
+        p99_us=percentile(samples, 0.99) / 1000,
+    )
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(results: List[Result], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {result.name: asdict(result) for result in results},
+    }
+    path.write_text(json.dumps(payload, indent=2, sort_keys=True))
+
+
+def load_results(path: Path) -> Dict[str, dict]:
+    return json.loads(path.read_text())["results"]
+
+
+def format_table(results: List[Result], baseline: Optional[Dict[str, dict]] = None, threshold: float = 0.10) -> str:
+    """Render results as a table, with the throughput change against ``baseline`` when given."""
+    header = f"{'benchmark':<44} {'ops/sec':>12} {'p50 us':>10} {'p99 us':>10}"
+    if baseline is not None:
+        header += f" {'vs base':>9}"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        line = f"{result.name:<44} {result.ops_per_sec:>12,.0f} {result.p50_us:>10.2f} {result.p99_us:>10.2f}"
+        if baseline is not None:
+            previous = baseline.get(result.name)
+            if previous:
+                change = result.ops_per_sec / previous["ops_per_sec"] - 1
+                marker = " !" if change < -threshold else ""
+                line += f" {change:>+8.1%}{marker}"
+            else:
+                line += f" {'new':>9}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def regressions(results: List[Result], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Return the names of benchmarks whose throughput dropped by more than ``threshold``."""
+    slower = []
+    for result in results:
+        previous = baseline.get(result.name)
+        if previous and result.ops_per_sec < previous["ops_per_sec"] * (1 - threshold):
+            slower.append(result.name)
+    return slower
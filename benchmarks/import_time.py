@@ -0,0 +1,81 @@
+"""
+Measure the cold import time of pydentity and fail when it exceeds a budget.
+
+Every sample runs in a fresh interpreter. The reported time is the median of the
+``-X importtime`` cumulative time of the target module, so interpreter start-up is excluded.
+
+Examples:
+    PYTHONPATH=src python -m benchmarks.import_time
+    PYTHONPATH=src python -m benchmarks.import_time --module pydentity.core.services --budget-ms 400
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import List, Tuple
+
+
+DEFAULT_BUDGET_MS = 25.0
+
+# Modules that must never be imported by ``import pydentity`` alone
+HEAVY_MODULES = ("google.auth", "httpx", "passlib", "jose", "jwt", "fastapi", "beanie", "motor")
+
+
+def sample(module: str) -> Tuple[float, List[Tuple[float, str]], List[str]]:
+    """
+    Import ``module`` in a fresh interpreter.
+
+    Returns:
+        Tuple: The cumulative import time in milliseconds, the ten slowest modules as
+        (self time in ms, name) pairs, and the heavy modules that were loaded.
+    """
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=dict(os.environ), check=True,
+    )
+    total_us = 0
+    modules = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        modules.append((int(self_us) / 1000, name.strip()))
+        if name.strip() == module:
+            total_us = int(cumulative_us)
+    loaded = [name for name in process.stdout.strip().split(",") if name]
+    return total_us / 1000, sorted(modules, reverse=True)[:10], loaded
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="pydentity", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Maximum median import time")
+    parser.add_argument("--samples", type=int, default=7, help="Number of fresh interpreters to sample")
+    args = parser.parse_args(argv)
+
+    results = [sample(args.module) for _ in range(args.samples)]
+    median_ms = statistics.median(total for total, _, _ in results)
+    _, slowest, loaded = results[-1]
+
+    print(f"import {args.module}: median {median_ms:.1f} ms over {args.samples} runs (budget {args.budget_ms:.1f} ms)")
+    print("slowest modules (self time):")
+    for self_ms, name in slowest:
+        print(f"  {self_ms:8.2f} ms  {name}")
+
+    failed = False
+    if median_ms > args.budget_ms:
+        print(f"FAIL: import time exceeds the {args.budget_ms:.1f} ms budget")
+        failed = True
+    if args.module == "pydentity" and loaded:
+        print(f"FAIL: 'import pydentity' eagerly loaded {', '.join(loaded)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
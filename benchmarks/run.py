@@ -0,0 +1,82 @@
+"""
+Run the pydentity micro-benchmarks.
+
+Examples:
+    python -m benchmarks.run
+    python -m benchmarks.run -k token --save .benchmarks/main.json
+    python -m benchmarks.run --compare .benchmarks/main.json --fail-on-regression
+"""
+import argparse
+import asyncio
+import importlib
+import pkgutil
+import sys
+import traceback
+from pathlib import Path
+
+from benchmarks import fixtures
+from benchmarks.harness import REGISTRY, current_commit, format_table, load_results, regressions, run_case, save_results
+
+
+def discover() -> None:
+    """Import every ``bench_*`` module in this package so that its cases register."""
+    package_dir = Path(__file__).parent
+    for module in pkgutil.iter_modules([str(package_dir)]):
+        if module.name.startswith("bench_"):
+            importlib.import_module(f"benchmarks.{module.name}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", "--filter", action="append", default=[], help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every case's iteration count")
+    parser.add_argument("--mongo-url", help="Benchmark against this Mongo server instead of the in-memory stand-in")
+    parser.add_argument("--save", type=Path, nargs="?", const=Path(".benchmarks") / f"{current_commit()}.json",
+                        help="Save results as a baseline (default: .benchmarks/<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="Baseline file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Throughput drop reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit non-zero when a regression is found")
+    parser.add_argument("--list", action="store_true", help="List benchmarks and exit")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None) -> int:
+    args = parse_args(argv)
+    fixtures.MONGO_URL = args.mongo_url
+    discover()
+
+    cases = [case for name, case in sorted(REGISTRY.items()) if not args.filter or any(f in name for f in args.filter)]
+    if args.list:
+        print("\n".join(case.name for case in cases))
+        return 0
+
+    results = []
+    failed = []
+    for case in cases:
+        # A broken case is reported at the end instead of discarding the others' results
+        try:
+            results.append(await run_case(case, scale=args.scale))
+        except Exception:
+            failed.append(case.name)
+            print(f"{case.name} failed:\n{traceback.format_exc()}", file=sys.stderr)
+
+    baseline = load_results(args.compare) if args.compare else None
+    print(format_table(results, baseline, args.threshold))
+    if failed:
+        print(f"\nFailed: {', '.join(failed)}")
+
+    if args.save:
+        save_results(results, args.save)
+        print(f"\nSaved baseline to {args.save}")
+
+    if baseline is not None:
+        slower = regressions(results, baseline, args.threshold)
+        if slower:
+            print(f"\nRegressions over {args.threshold:.0%}: {', '.join(slower)}")
+            if args.fail_on_regression:
+                return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,51 @@
+"""Pydentity: identity and access management for FastAPI applications."""
+from typing import TYPE_CHECKING
+
+from pydentity._lazy import attach
+
+# Public names are resolved on first access so that ``import pydentity`` stays cheap
+__getattr__, __dir__, __all__ = attach(__name__, {
+    "Settings": ".core.config",
+    "get_settings": ".core.config",
+    "AuthService": ".core.services",
+    "IdentityService": ".core.services",
+    "PermissionService": ".core.services",
+    "TokenService": ".core.services",
+    "get_auth_service": ".core.deps",
+    "get_identity_service": ".core.deps",
+    "get_permission_service": ".core.deps",
+    "get_token_service": ".core.deps",
+    "get_current_identity": ".core.deps",
+    "MetricsMiddleware": ".middleware",
+    "ReadYourWritesMiddleware": ".middleware",
+    "serve": ".server",
+    "require_permissions": ".utils.decorators",
+    "require_any_permission": ".utils.decorators",
+    "require_claims": ".utils.decorators",
+    "require_any_claim": ".utils.decorators",
+    "require_identity_type": ".utils.decorators",
+    "require_policy": ".utils.decorators",
+    "Policy": ".core.policy",
+})
+
+if TYPE_CHECKING:
+    from .core.config import Settings, get_settings
+    from .core.deps import (
+        get_auth_service,
+        get_current_identity,
+        get_identity_service,
+        get_permission_service,
+        get_token_service,
+    )
+    from .core.policy import Policy
+    from .core.services import AuthService, IdentityService, PermissionService, TokenService
+    from .middleware import MetricsMiddleware, ReadYourWritesMiddleware
+    from .server import serve
+    from .utils.decorators import (
+        require_any_claim,
+        require_any_permission,
+        require_claims,
+        require_identity_type,
+        require_permissions,
+        require_policy,
+    )
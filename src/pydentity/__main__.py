@@ -0,0 +1,28 @@
+"""Command line entry point: ``python -m pydentity serve myservice.main:app``."""
+import argparse
+import logging
+from typing import List, Optional
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="pydentity", description="Pydentity command line tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Run an application in pre-forked, pre-warmed uvicorn workers.")
+    serve.add_argument("app", help="The ASGI application as 'module:attribute', e.g. myservice.main:app")
+    serve.add_argument("--host", help="The address to bind. Defaults to SERVER_HOST.")
+    serve.add_argument("--port", type=int, help="The port to bind. Defaults to SERVER_PORT.")
+    serve.add_argument("--workers", type=int, help="Worker processes. Defaults to SERVER_WORKERS, which is 1.")
+    serve.add_argument("--log-level", default="info", choices=["critical", "error", "warning", "info", "debug"])
+    serve.add_argument("--no-access-log", dest="access_log", action="store_false", help="Disable the access log.")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        from pydentity.server import serve as run
+
+        logging.basicConfig(level=args.log_level.upper())
+        run(args.app, host=args.host, port=args.port, workers=args.workers, log_level=args.log_level, access_log=args.access_log)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Lazy attribute loading for package ``__init__`` modules (PEP 562)."""
+from importlib import import_module
+from typing import Callable, Dict, List, Tuple
+
+
+def attach(package: str, attributes: Dict[str, str]) -> Tuple[Callable[[str], object], Callable[[], List[str]], List[str]]:
+    """
+    Build the module-level ``__getattr__``, ``__dir__`` and ``__all__`` for a lazy package.
+
+    Each public name is imported from its submodule on first access and then cached in the
+    package namespace, so later lookups are plain attribute reads.
+
+    Args:
+        package (str): The ``__name__`` of the package.
+        attributes (Dict[str, str]): Maps each public name to the module that defines it, relative to the package.
+
+    Returns:
+        Tuple: The ``__getattr__`` function, the ``__dir__`` function and the ``__all__`` list.
+
+    Example:
+        __getattr__, __dir__, __all__ = attach(__name__, {"TokenService": ".token_service"})
+    """
+    namespace = import_module(package).__dict__
+
+    def __getattr__(name: str):
+        module = attributes.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(import_module(module, package), name)
+        namespace[name] = value
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(namespace) | set(attributes))
+
+    return __getattr__, __dir__, list(attributes)
@@ -1,28 +1,41 @@
-from .config import get_settings, Settings
-from .deps import (
-    get_auth_service,
-    get_identity_service,
-    get_permission_service,
-    get_token_service,
-    get_current_identity
-)
-from .services import (
-    AuthService,
-    IdentityService,
-    PermissionService,
-    TokenService
-)
+from typing import TYPE_CHECKING
 
-__all__ = [
-    "get_settings",
-    "Settings",
-    "get_auth_service",
-    "get_identity_service",
-    "get_permission_service",
-    "get_token_service",
-    "get_current_identity",
-    "AuthService",
-    "IdentityService",
-    "PermissionService",
-    "TokenService"
-]
\ No newline at end of file
+from pydentity._lazy import attach
+
+__getattr__, __dir__, __all__ = attach(__name__, {
+    "get_settings": ".config",
+    "Settings": ".config",
+    "InvalidToken": ".jwt_backends",
+    "JWTBackend": ".jwt_backends",
+    "get_jwt_backend": ".jwt_backends",
+    "set_jwt_backend": ".jwt_backends",
+    "Policy": ".policy",
+    "PolicySyntaxError": ".policy",
+    "get_auth_service": ".deps",
+    "get_identity_service": ".deps",
+    "get_permission_service": ".deps",
+    "get_token_service": ".deps",
+    "get_current_identity": ".deps",
+    "AuthService": ".services",
+    "IdentityService": ".services",
+    "PermissionService": ".services",
+    "TokenService": ".services",
+})
+
+if TYPE_CHECKING:
+    from .config import get_settings, Settings
+    from .jwt_backends import InvalidToken, JWTBackend, get_jwt_backend, set_jwt_backend
+    from .policy import Policy, PolicySyntaxError
+    from .deps import (
+        get_auth_service,
+        get_identity_service,
+        get_permission_service,
+        get_token_service,
+        get_current_identity
+    )
+    from .services import (
+        AuthService,
+        IdentityService,
+        PermissionService,
+        TokenService
+    )
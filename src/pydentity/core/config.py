@@ -1,7 +1,8 @@
 # src/pyidentity/core/config.py
 
-from pydantic import BaseSettings, EmailStr, field_validator
-from typing import Optional, List, Union
+from pydantic import EmailStr, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Dict, Literal, Optional, List, Union
 from functools import lru_cache
 
 class Settings(BaseSettings):
@@ -10,9 +11,22 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     DEBUG: bool = False
 
+    # Server Settings (python -m pydentity serve)
+    SERVER_HOST: str = "127.0.0.1"
+    SERVER_PORT: int = 8000
+    # Worker processes. Login throttling, metrics and read-your-writes pins are kept per worker,
+    # so more than one needs the setup described under "Running in Production" in the README
+    SERVER_WORKERS: int = 1
+
     # Security Settings
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
+    # Signing library for access tokens: "pyjwt" (cached keys, prebuilt headers) or "jose"
+    JWT_BACKEND: Literal["pyjwt", "jose"] = "pyjwt"
+    # PEM keys for the asymmetric algorithms (RS*, PS*, ES*, EdDSA); HS* algorithms sign with SECRET_KEY.
+    # Without JWT_PUBLIC_KEY, tokens are verified with the public half of JWT_PRIVATE_KEY.
+    JWT_PRIVATE_KEY: Optional[str] = None
+    JWT_PUBLIC_KEY: Optional[str] = None
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
 
@@ -22,6 +36,25 @@ class Settings(BaseSettings):
 
     TEST_MONGODB_URL: str = "mongodb://localhost:27017"
     TEST_MONGODB_DB_NAME: str = "pydentity_test"
+    # Replica set used by the read preference tests, e.g. "mongodb://localhost:27017/?replicaSet=rs0"
+    TEST_MONGODB_REPLICA_SET_URL: Optional[str] = None
+
+    # Read Preference Settings
+    # Mode for identity lookups: primary, primaryPreferred, secondary, secondaryPreferred or nearest
+    READ_PREFERENCE: str = "primary"
+    # Per-operation modes, e.g. {"by_username": "secondaryPreferred"}; operations not listed use READ_PREFERENCE
+    READ_PREFERENCE_OVERRIDES: Dict[str, str] = {}
+    # Upper bound on secondary lag for non-primary modes; -1 for no bound, otherwise at least 90
+    READ_MAX_STALENESS_SECONDS: int = -1
+    # How long lookups of a just-written identity stay on the primary
+    READ_YOUR_WRITES_SECONDS: int = 10
+    # Cookie carrying the read-your-writes pin of a client across workers (see ReadYourWritesMiddleware)
+    READ_YOUR_WRITES_COOKIE: str = "pydentity_primary_until"
+
+    # last_login / last_active updates are buffered in memory and written at this interval,
+    # or sooner once this many are pending
+    ACTIVITY_FLUSH_SECONDS: float = 5.0
+    ACTIVITY_MAX_PENDING: int = 10_000
 
      # SSO Settings
     GOOGLE_CLIENT_ID: str
@@ -31,6 +64,23 @@ class Settings(BaseSettings):
     APPLE_PRIVATE_KEY: str
     FACEBOOK_APP_ID: str
     FACEBOOK_APP_SECRET: str
+    # Verified Facebook access tokens are trusted for this long without asking the Graph API again
+    FACEBOOK_TOKEN_CACHE_SECONDS: int = 300
+    FACEBOOK_TOKEN_CACHE_SIZE: int = 10_000
+    # How long a token Facebook rejected stays rejected; 0 disables negative caching
+    FACEBOOK_TOKEN_NEGATIVE_CACHE_SECONDS: int = 30
+    # Total time an outbound provider call may take, retries and hedges included
+    SSO_DEADLINE_SECONDS: float = 5.0
+    # Per-provider deadlines, e.g. {"apple": 3.0}
+    SSO_DEADLINE_OVERRIDES: Dict[str, float] = {}
+    # Extra attempts for idempotent provider calls that fail with a network error or a 5xx/429 reply
+    SSO_RETRIES: int = 2
+    SSO_RETRY_BACKOFF_SECONDS: float = 0.1
+    # Consecutive failed calls after which a provider's calls fail fast, and for how long
+    SSO_BREAKER_FAILURES: int = 5
+    SSO_BREAKER_RESET_SECONDS: float = 30.0
+    # Send a second copy of a provider GET that has not answered after this long; None disables hedging
+    SSO_HEDGE_DELAY_SECONDS: Optional[float] = None
 
     # CORS Settings
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost", "http://localhost:8080", "https://localhost", "https://localhost:8080"]
@@ -43,6 +93,14 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: Optional[str] = None
     EMAILS_FROM_EMAIL: Optional[EmailStr] = None
     EMAILS_FROM_NAME: Optional[str] = None
+    SMTP_TIMEOUT_SECONDS: float = 10.0
+    # Close a worker's SMTP connection after this long without messages
+    SMTP_IDLE_SECONDS: float = 30.0
+    EMAIL_QUEUE_WORKERS: int = 2
+    EMAIL_QUEUE_MAX_SIZE: int = 10000
+    EMAIL_QUEUE_BATCH_SIZE: int = 20
+    EMAIL_QUEUE_MAX_ATTEMPTS: int = 5
+    EMAIL_QUEUE_RETRY_BACKOFF_SECONDS: float = 1.0
 
     # Admin User
     FIRST_SUPERUSER: EmailStr
@@ -55,11 +113,39 @@ class Settings(BaseSettings):
     # Password Settings
     MIN_PASSWORD_LENGTH: int = 8
     PASSWORD_RESET_TOKEN_EXPIRE_HOURS: int = 24
+    EMAIL_VERIFICATION_TOKEN_EXPIRE_HOURS: int = 48
+
+    # Password Hashing Settings
+    PASSWORD_HASH_SCHEMES: List[str] = ["bcrypt"]
+    PASSWORD_HASH_TARGET_MS: Optional[int] = None
+    BCRYPT_ROUNDS: Optional[int] = None
+    ARGON2_TIME_COST: Optional[int] = None
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 2
 
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 60
 
-    @field_validator("BACKEND_CORS_ORIGINS", pre=True)
+    # Login Throttling Settings
+    LOGIN_MAX_FAILURES_PER_USERNAME: int = 5
+    LOGIN_MAX_FAILURES_PER_SOURCE: int = 50
+    LOGIN_FAILURE_WINDOW_SECONDS: int = 300
+    LOGIN_LOCKOUT_SECONDS: int = 900
+    LOGIN_THROTTLE_MAX_KEYS: int = 100000
+
+    # Identity Log Retention Settings
+    IDENTITY_LOG_STORAGE: Literal["standard", "timeseries"] = "standard"
+    IDENTITY_LOG_RETENTION_DAYS: Optional[int] = None
+    IDENTITY_LOG_ARCHIVE_DIR: str = "identity_log_archive"
+    IDENTITY_LOG_ARCHIVE_BATCH_SIZE: int = 5000
+
+    # Observability Settings (take effect once MetricsMiddleware is installed)
+    METRICS_ENABLED: bool = True
+    METRICS_PATH: str = "/metrics"
+    TRACING_ENABLED: bool = False
+
+    @field_validator("BACKEND_CORS_ORIGINS", mode="before")
+    @classmethod
     def assemble_cors_origins(cls, v: Union[str, List[str]]) -> Union[List[str], str]:
         """Ensure BACKEND_CORS_ORIGINS is a list of strings"""
         if isinstance(v, str) and not v.startswith("["):
@@ -68,9 +154,7 @@ class Settings(BaseSettings):
             return v
         #raise ValueError(v)
 
-    class Config:
-        case_sensitive = True
-        env_file = ".env"
+    model_config = SettingsConfigDict(case_sensitive=True, env_file=".env")
 
 @lru_cache()
 def get_settings() -> Settings:
@@ -1,7 +1,11 @@
 """Dependency injection for services."""
 
-from fastapi import Depends
+from typing import Optional
+
+from fastapi import Depends, Request
 from .services import AuthService, IdentityService, PermissionService, TokenService
+from .services.auth_service import oauth2_scheme
+from .tenancy import get_tenant_resolver, tenant_context
 
 def get_auth_service(token_service: TokenService = Depends()):
     return AuthService(token_service)
@@ -15,5 +19,12 @@ def get_permission_service():
 def get_token_service():
     return TokenService()
 
-def get_current_identity(auth_service: AuthService = Depends(get_auth_service)):
-    return auth_service.get_current_identity()
\ No newline at end of file
+def get_request_tenant(request: Request) -> Optional[str]:
+    """Return the tenant of a request made without an access token, such as a login."""
+    return get_tenant_resolver().resolve(request)
+
+async def get_current_identity(token: str = Depends(oauth2_scheme), auth_service: AuthService = Depends(get_auth_service)):
+    identity = await auth_service.get_current_identity(token)
+    # The rest of the request, and only this request, runs on behalf of the identity's tenant
+    with tenant_context(identity.tenant_id):
+        yield identity
@@ -0,0 +1,277 @@
+"""Pluggable JSON Web Token backends for TokenService."""
+import base64
+import binascii
+import json
+import time
+from abc import ABC, abstractmethod
+from calendar import timegm
+from datetime import datetime
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple, Type, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+try:
+    from jose import JWTError as _BaseTokenError
+except ImportError:  # pragma: no cover - python-jose is optional
+    _BaseTokenError = ValueError
+
+Key = Union[str, bytes]
+
+# Registered time claims a backend accepts as datetimes and encodes as NumericDate
+TIME_CLAIMS = ("exp", "iat", "nbf")
+
+
+class InvalidToken(_BaseTokenError):
+    """
+    Raised when a token is malformed, has a bad signature, uses a disallowed algorithm or has expired.
+
+    Derives from python-jose's ``JWTError`` when it is installed, so handlers written for it keep working.
+    """
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(segment: bytes) -> bytes:
+    return base64.urlsafe_b64decode(segment + b"=" * (-len(segment) % 4))
+
+
+def _dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def _numeric_dates(claims: Mapping[str, Any]) -> Mapping[str, Any]:
+    """Return the claims with datetime time claims converted to seconds since the epoch."""
+    if not any(isinstance(claims.get(name), datetime) for name in TIME_CLAIMS):
+        return claims
+    converted = dict(claims)
+    for name in TIME_CLAIMS:
+        value = converted.get(name)
+        if isinstance(value, datetime):
+            converted[name] = timegm(value.utctimetuple())
+    return converted
+
+
+class JWTBackend(ABC):
+    """
+    Signs and verifies compact JSON Web Tokens.
+
+    Keys are secrets for the HS* algorithms and PEM strings for the others. Decoding with a
+    private key verifies with its public half.
+    """
+
+    name: str = ""
+
+    @abstractmethod
+    def encode(self, claims: Mapping[str, Any], key: Key, algorithm: str) -> str:
+        """
+        Sign claims into a token.
+
+        Args:
+            claims (Mapping[str, Any]): The claims. ``exp``, ``iat`` and ``nbf`` may be datetimes.
+            key (Key): The signing key.
+            algorithm (str): The JWS algorithm, e.g. "HS256".
+
+        Returns:
+            str: The token.
+        """
+
+    @abstractmethod
+    def decode(self, token: str, key: Key, algorithms: Iterable[str]) -> Dict[str, Any]:
+        """
+        Verify a token and return its claims.
+
+        Args:
+            token (str): The token.
+            key (Key): The verification key.
+            algorithms (Iterable[str]): The algorithms the token may use.
+
+        Returns:
+            Dict[str, Any]: The claims.
+
+        Raises:
+            InvalidToken: If the token is malformed, its signature or algorithm is not accepted,
+                it has expired or is not valid yet.
+        """
+
+
+class JoseBackend(JWTBackend):
+    """python-jose, the original backend. It does not support EdDSA."""
+
+    name = "jose"
+
+    def __init__(self):
+        from jose import jwk, jwt
+
+        self._jwk = jwk
+        self._jwt = jwt
+        self._public_keys: Dict[Tuple[str, Key], str] = {}
+
+    def encode(self, claims: Mapping[str, Any], key: Key, algorithm: str) -> str:
+        try:
+            return self._jwt.encode(dict(claims), key, algorithm=algorithm)
+        except _BaseTokenError as e:
+            raise InvalidToken(str(e)) from e
+
+    def decode(self, token: str, key: Key, algorithms: Iterable[str]) -> Dict[str, Any]:
+        algorithms = list(algorithms)
+        try:
+            return self._jwt.decode(token, self._verifying_key(key, algorithms), algorithms=algorithms)
+        except _BaseTokenError as e:
+            raise InvalidToken(str(e)) from e
+
+    def _verifying_key(self, key: Key, algorithms: list) -> Key:
+        text = key.decode() if isinstance(key, bytes) else key
+        if "PRIVATE KEY" not in text:
+            return key
+        # python-jose cannot verify with a private key, so verify with its public half
+        cache_key = (algorithms[0], key)
+        public = self._public_keys.get(cache_key)
+        if public is None:
+            public = self._public_keys[cache_key] = self._jwk.construct(text, algorithms[0]).public_key().to_pem().decode()
+        return public
+
+
+class PyJWTBackend(JWTBackend):
+    """
+    PyJWT's algorithms and ``cryptography`` keys, with the per-token work kept to signing.
+
+    Parsed key objects are cached per algorithm and key, so PEM keys are loaded once rather
+    than on every call, and the base64url header segment of each algorithm is built once.
+    Encoding serializes the claims and signs; decoding compares the header segment with the
+    prebuilt one before falling back to parsing it, verifies the signature with the cached
+    key and checks ``exp`` and ``nbf``.
+    """
+
+    name = "pyjwt"
+
+    def __init__(self):
+        from jwt.algorithms import get_default_algorithms
+
+        self._algorithms = get_default_algorithms()
+        self._algorithms.pop("none", None)
+        self._headers: Dict[str, bytes] = {}
+        self._signing_keys: Dict[Tuple[str, Key], Any] = {}
+        self._verifying_keys: Dict[Tuple[str, Key], Any] = {}
+
+    def _algorithm(self, name: str):
+        algorithm = self._algorithms.get(name)
+        if algorithm is None:
+            raise InvalidToken(f"Algorithm not supported: {name}")
+        return algorithm
+
+    def _header(self, algorithm: str) -> bytes:
+        header = self._headers.get(algorithm)
+        if header is None:
+            self._algorithm(algorithm)
+            header = self._headers[algorithm] = _b64encode(_dumps({"alg": algorithm, "typ": "JWT"}))
+        return header
+
+    def _signing_key(self, algorithm: str, key: Key):
+        prepared = self._signing_keys.get((algorithm, key))
+        if prepared is None:
+            prepared = self._signing_keys[(algorithm, key)] = self._algorithm(algorithm).prepare_key(key)
+        return prepared
+
+    def _verifying_key(self, algorithm: str, key: Key):
+        prepared = self._verifying_keys.get((algorithm, key))
+        if prepared is None:
+            prepared = self._algorithm(algorithm).prepare_key(key)
+            public_key = getattr(prepared, "public_key", None)
+            if public_key is not None:
+                prepared = public_key()
+            self._verifying_keys[(algorithm, key)] = prepared
+        return prepared
+
+    def encode(self, claims: Mapping[str, Any], key: Key, algorithm: str) -> str:
+        signing_input = self._header(algorithm) + b"." + _b64encode(_dumps(_numeric_dates(claims)))
+        signature = self._algorithm(algorithm).sign(signing_input, self._signing_key(algorithm, key))
+        return (signing_input + b"." + _b64encode(signature)).decode()
+
+    def decode(self, token: str, key: Key, algorithms: Iterable[str]) -> Dict[str, Any]:
+        try:
+            data = token.encode("ascii")
+            signing_input, _, signature = data.rpartition(b".")
+            header, _, payload = signing_input.partition(b".")
+            if not header or not payload or b"." in payload:
+                raise InvalidToken("Not enough segments")
+            algorithm = self._algorithm_of(header, algorithms)
+            if not self._algorithm(algorithm).verify(signing_input, self._verifying_key(algorithm, key), _b64decode(signature)):
+                raise InvalidToken("Signature verification failed")
+            claims = json.loads(_b64decode(payload))
+        except InvalidToken:
+            raise
+        except (UnicodeError, binascii.Error, ValueError, TypeError) as e:
+            raise InvalidToken("Malformed token") from e
+        if not isinstance(claims, dict):
+            raise InvalidToken("Invalid payload")
+        self._check_claims(claims)
+        return claims
+
+    def _algorithm_of(self, header: bytes, algorithms: Iterable[str]) -> str:
+        for algorithm in algorithms:
+            if header == self._header(algorithm):
+                return algorithm
+        # Tokens from other issuers may order or add header fields differently
+        fields = json.loads(_b64decode(header))
+        algorithm = fields.get("alg") if isinstance(fields, dict) else None
+        if algorithm not in algorithms:
+            raise InvalidToken("The specified alg value is not allowed")
+        return algorithm
+
+    @staticmethod
+    def _check_claims(claims: Dict[str, Any]) -> None:
+        if "aud" in claims:
+            # Like the other backends: no audience is expected, so tokens meant for one are refused
+            raise InvalidToken("Invalid audience")
+        now = time.time()
+        for name in TIME_CLAIMS:
+            if name in claims and (isinstance(claims[name], bool) or not isinstance(claims[name], (int, float))):
+                raise InvalidToken(f"Invalid {name} claim")
+        if "exp" in claims and now >= claims["exp"]:
+            raise InvalidToken("Signature has expired")
+        if "nbf" in claims and now < claims["nbf"]:
+            raise InvalidToken("The token is not yet valid")
+
+
+BACKENDS: Dict[str, Type[JWTBackend]] = {
+    JoseBackend.name: JoseBackend,
+    PyJWTBackend.name: PyJWTBackend,
+}
+
+_backends: Dict[str, JWTBackend] = {}
+_override: Optional[JWTBackend] = None
+
+
+def get_jwt_backend(name: Optional[str] = None) -> JWTBackend:
+    """
+    Return the process-wide backend, created on first use.
+
+    Args:
+        name (Optional[str]): A backend from ``BACKENDS``. Defaults to the one set with
+            ``set_jwt_backend``, or else ``JWT_BACKEND``.
+    """
+    if name is None:
+        if _override is not None:
+            return _override
+        from pydentity.core.config import get_settings
+
+        name = get_settings().JWT_BACKEND
+    backend = _backends.get(name)
+    if backend is None:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown JWT backend {name!r}; expected one of {sorted(BACKENDS)}")
+        backend = _backends[name] = BACKENDS[name]()
+    return backend
+
+
+def set_jwt_backend(backend: Optional[JWTBackend]) -> None:
+    """Replace the backend TokenService uses by default; None goes back to ``JWT_BACKEND``."""
+    global _override
+    _override = backend
@@ -0,0 +1,237 @@
+"""Latency histograms, counters and optional tracing spans for the pydentity hot paths."""
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+from pymongo import monitoring
+
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_enabled = False
+_tracer = None
+
+
+class Histogram:
+    """
+    Cumulative latency histogram in the Prometheus model.
+
+    Attributes:
+        name (str): The metric name.
+        documentation (str): The HELP text of the metric.
+        buckets (Tuple[float, ...]): Upper bounds of the buckets, in seconds.
+    """
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self._series: Dict[LabelKey, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: LabelKey = ()) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # One slot per bucket, one for +Inf, then the running sum
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labels, le=repr(bound))} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{_format_labels(labels, le="+Inf")} {cumulative}')
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    """
+    Monotonic counter in the Prometheus model.
+
+    Attributes:
+        name (str): The metric name.
+        documentation (str): The HELP text of the metric.
+    """
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._series: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, labels: LabelKey = ()) -> None:
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._series)
+        for labels, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+def _format_labels(labels: LabelKey, **extra: str) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+TOKEN_SECONDS = Histogram("pydentity_token_seconds", "Time spent encoding and decoding JWTs.")
+PASSWORD_HASH_SECONDS = Histogram("pydentity_password_hash_seconds", "Time spent hashing and verifying passwords.")
+IDENTITY_LOOKUP_SECONDS = Histogram("pydentity_identity_lookup_seconds", "Time spent looking up identities.")
+SSO_REQUEST_SECONDS = Histogram("pydentity_sso_request_seconds", "Time spent in outbound SSO provider calls.")
+MONGO_COMMAND_SECONDS = Histogram("pydentity_mongo_command_seconds", "Time spent in MongoDB commands.")
+HTTP_REQUEST_SECONDS = Histogram("pydentity_http_request_seconds", "Time spent handling HTTP requests.")
+ERRORS_TOTAL = Counter("pydentity_errors_total", "Failed operations on instrumented paths.")
+
+METRICS = [
+    TOKEN_SECONDS,
+    PASSWORD_HASH_SECONDS,
+    IDENTITY_LOOKUP_SECONDS,
+    SSO_REQUEST_SECONDS,
+    MONGO_COMMAND_SECONDS,
+    HTTP_REQUEST_SECONDS,
+    ERRORS_TOTAL,
+]
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started", "span")
+
+    def __init__(self, histogram: Histogram, labels: LabelKey):
+        self.histogram = histogram
+        self.labels = labels
+        self.span = None
+
+    def __enter__(self):
+        if _tracer is not None:
+            self.span = _tracer.start_as_current_span(self.histogram.name, attributes=dict(self.labels))
+            self.span.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.histogram.observe(time.perf_counter() - self.started, self.labels)
+        if exc_type is not None:
+            ERRORS_TOTAL.inc(labels=(("metric", self.histogram.name),) + self.labels)
+        if self.span is not None:
+            self.span.__exit__(exc_type, exc_val, exc_tb)
+        return False
+
+
+def timed(histogram: Histogram, **labels: str):
+    """
+    Time a block into ``histogram``.
+
+    When metrics are disabled this returns a shared no-op context manager, so an
+    instrumented call costs one function call and a flag check.
+
+    Args:
+        histogram (Histogram): The histogram to record into.
+        **labels (str): Label values of the observation.
+
+    Example:
+        with timed(TOKEN_SECONDS, operation="encode"):
+            token = jwt.encode(...)
+    """
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(histogram, tuple(sorted(labels.items())))
+
+
+def configure_metrics(enabled: bool, tracing: bool = False) -> None:
+    """
+    Turn metric collection and tracing spans on or off for the whole process.
+
+    Tracing uses OpenTelemetry when it is installed and is silently skipped otherwise.
+    """
+    global _enabled, _tracer
+    _enabled = enabled
+    _tracer = None
+    if enabled and tracing:
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            return
+        _tracer = trace.get_tracer("pydentity")
+
+
+def metrics_enabled() -> bool:
+    return _enabled
+
+
+def render_prometheus() -> str:
+    """Render every pydentity metric in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    for metric in METRICS:
+        metric.reset()
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    PyMongo command listener that records the duration of every command Beanie issues.
+
+    Pass an instance in ``event_listeners`` when creating the Motor client. PyMongo reports
+    the server round trip itself, so no per-command state is kept here.
+    """
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        if _enabled:
+            MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, (("command", event.command_name),))
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        if _enabled:
+            labels = (("command", event.command_name),)
+            MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, labels)
+            ERRORS_TOTAL.inc(labels=(("metric", MONGO_COMMAND_SECONDS.name),) + labels)
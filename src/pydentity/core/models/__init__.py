@@ -1,20 +1,29 @@
-from .user import User
-from .agent import Agent
-from .role import Role
-from .profile import UserProfile
-from .agent_profile import AgentProfile
-from .identity_logs import IdentityLog
-from .identity import IdentityType, SSOProvider, VerificationStatus, Identity
+from typing import TYPE_CHECKING
 
-__all__ = [
-    "Identity",
-    "User",
-    "Agent",
-    "Role",
-    "UserProfile",
-    "AgentProfile",
-    "IdentityLog",
-    "IdentityType",
-    "SSOProvider",
-    "VerificationStatus",
-]
\ No newline at end of file
+from pydentity._lazy import attach
+
+__getattr__, __dir__, __all__ = attach(__name__, {
+    "Identity": ".identity",
+    "User": ".user",
+    "Agent": ".agent",
+    "Role": ".role",
+    "UserProfile": ".profile",
+    "AgentProfile": ".agent_profile",
+    "IdentityLog": ".identity_logs",
+    "IdentityLogRollup": ".identity_log_rollup",
+    "RollupGranularity": ".identity_log_rollup",
+    "IdentityType": ".identity",
+    "SSOProvider": ".identity",
+    "VerificationStatus": ".identity",
+    "Claim": ".identity",
+})
+
+if TYPE_CHECKING:
+    from .user import User
+    from .agent import Agent
+    from .role import Role
+    from .profile import UserProfile
+    from .agent_profile import AgentProfile
+    from .identity_logs import IdentityLog
+    from .identity_log_rollup import IdentityLogRollup, RollupGranularity
+    from .identity import Claim, IdentityType, SSOProvider, VerificationStatus, Identity
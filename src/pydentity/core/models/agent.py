@@ -1,9 +1,11 @@
-from beanie import Indexed
 from pydantic import Field
-from typing import Optional
+from pymongo import ASCENDING, IndexModel
+from typing import List, Optional
 from datetime import datetime
 
-from pydentity.core.models.identity import VerificationStatus
+from pydentity.core.models.identity import Identity, VerificationStatus
+from pydentity.core.metrics import IDENTITY_LOOKUP_SECONDS, timed
+from pydentity.core.read_preference import GLOBAL_SCOPE, lookup_key, read_preference
 
 class Agent(Identity):
     """
@@ -12,7 +14,7 @@ class Agent(Identity):
     This class is tailored for agents that interact with the system programmatically. It introduces an API key for authentication and tracks the last time the agent was active. Additionally, it includes methods for agent verification, leveraging the system's verification process.
 
     Attributes:
-        api_key (Indexed[str], unique=True): A unique API key assigned to the agent for authentication purposes. The API key must be at least 32 characters long.
+        api_key (str): A unique API key assigned to the agent for authentication purposes. The API key must be at least 32 characters long. API keys stay globally unique rather than unique per tenant, since the key alone identifies the agent and therefore its tenant.
         last_active (Optional[datetime]): The timestamp of the agent's last activity in the system. This attribute is used to monitor and potentially audit agent activity.
 
     Methods:
@@ -24,20 +26,35 @@ class Agent(Identity):
     Note:
         The `verify_identity` and `initiate_verification` methods are part of the agent's verification process. The actual implementation of these methods should be adapted to meet the specific requirements of the system's verification process.
     """
-    api_key: Indexed(str, unique=True) = Field(..., min_length=32)
+    api_key: str = Field(..., min_length=32)
     last_active: Optional[datetime] = None
     verification_code: Optional[str] = None
 
+    class Settings(Identity.Settings):
+        # Beanie reads only the attributes a Settings class defines itself, so the inherited ones are repeated
+        name = "identities"
+        use_state_management = True
+        use_revision = True
+        indexes = Identity.Settings.indexes + [
+            # Sparse, because users share the collection and have no API key
+            IndexModel([("api_key", ASCENDING)], unique=True, sparse=True, name="api_key"),
+        ]
+
     @classmethod
     async def by_api_key(cls, api_key: str):
-        return await cls.find_one(cls.api_key == api_key)
+        # API keys are global, so their lookups are not scoped to a tenant
+        with timed(IDENTITY_LOOKUP_SECONDS, method="by_api_key"), read_preference("by_api_key", lookup_key("api_key", api_key, GLOBAL_SCOPE)):
+            return await cls.find_one(cls.api_key == api_key)
     
+    def lookup_keys(self) -> List[tuple]:
+        return super().lookup_keys() + [lookup_key("api_key", self.api_key, GLOBAL_SCOPE)]
+
     async def verify_identity(self) -> bool:
-        if self.verification_status == VerificationStatus.pending
+        if self.verification_status == VerificationStatus.pending:
             # Typically, you would check the verification code here
             self.verification_status = VerificationStatus.verified
             self.verification_code = None
-            await self.save()
+            await self.save_changes()
             return True
         return False
 
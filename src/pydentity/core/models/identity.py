@@ -1,9 +1,13 @@
-from beanie import Document, Indexed, Link
-from pydantic import Field
-from typing import Dict, List
+from beanie import after_event, Insert, Link, Replace, Save, SaveChanges, before_event
+from pydantic import BaseModel, Field
+from pymongo import ASCENDING, IndexModel
+from typing import Any, Dict, List
 from datetime import datetime, timezone
 from enum import Enum
 from .role import Role
+from .tenant import TenantDocument
+from pydentity.core.metrics import IDENTITY_LOOKUP_SECONDS, timed
+from pydentity.core.read_preference import lookup_key, mark_written, read_preference
 
 
 class IdentityType(str, Enum):
@@ -52,17 +56,30 @@ class VerificationStatus(str, Enum):
     pending = 'pending'
     verified = 'verified'
 
-class Identity(Document):
+class Claim(BaseModel):
+    """
+    A single claim stored as a type/value pair.
+
+    Attributes:
+        type (str): The claim type, e.g. "tenant".
+        value (str): The claim value, e.g. "acme".
+    """
+    type: str
+    value: str
+
+class Identity(TenantDocument):
     """
     Represents a generic identity in the system, serving as a base model for user accounts or any entity requiring authentication and authorization.
 
     This class encapsulates common attributes and methods required for identity management, including username uniqueness, role-based access control, and claims-based permissions.
 
     Attributes:
-        username (Indexed[str]): A unique username for the identity. Must be between 5 to 50 characters.
+        username (str): A username for the identity, unique within its tenant. Must be between 5 to 50 characters.
+        tenant_id (Optional[str]): The tenant the identity belongs to. Inherited from TenantDocument.
         identity_type (IdentityType): The type of identity (e.g., user, admin). This helps in differentiating between different kinds of identities within the system.
         roles (List[Link[Role]]): A list of roles associated with the identity. Roles are used for role-based access control.
         claims (Dict[str, List[str]]): A dictionary of claims associated with the identity. Claims are used for fine-grained access control.
+        claim_pairs (List[Claim]): The claims flattened into type/value pairs. Derived from claims whenever the identity is written, so that a multikey index can answer "which identities have claim X".
         is_active (bool): Indicates whether the identity is active. Only active identities are allowed to authenticate.
         verification_status (VerificationStatus): The verification status of the identity. Useful for email verification or two-factor authentication statuses.
         created_at (datetime): The timestamp when the identity was created. Automatically set to the current UTC time upon creation.
@@ -71,28 +88,75 @@ class Identity(Document):
     Settings:
         name (str): Specifies the collection name in MongoDB to be "identities".
         use_state_management (bool): Indicates whether state management features should be used. This can be useful for tracking changes to the document state.
+        indexes (list): Includes the unique (tenant_id, username) index, so usernames only need to be unique within a tenant.
 
     Methods:
         verify_identity: An abstract method that should be implemented by subclasses to define how an identity is verified.
         initiate_verification: An abstract method that should be implemented by subclasses to define how the verification process is initiated.
         by_username: A class method to find an identity document by its username.
-        has_permission: Checks if the identity has a specific permission, either through roles.
+        has_role_permission: Checks if the identity has a specific permission through its roles.
         has_claims: Checks if the identity has a specific claim
         add_claim: Adds a claim to the identity.
         remove_claim: Removes a claim from the identity.
     """
-    username: Indexed(str, unique=True) = Field(..., min_length=5, max_length=50)
+    username: str = Field(..., min_length=5, max_length=50)
     identity_type: IdentityType
     roles: List[Link[Role]] = []
     claims: Dict[str, List[str]] = Field(default_factory=dict)
+    claim_pairs: List[Claim] = []
     is_active: bool = True
     verification_status: VerificationStatus = VerificationStatus.unverified
-    created_at: datetime = Field(default_factory=datetime.now(timezone.utc))
-    updated_at: datetime = Field(default_factory=datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     class Settings:
         name = "identities"
+        # Mutations send only the changed fields as $set updates, and fail with
+        # RevisionIdWasChanged when the document was modified since it was read
         use_state_management = True
+        use_revision = True
+        indexes = [
+            IndexModel([("tenant_id", ASCENDING), ("username", ASCENDING)], unique=True, name="tenant_username"),
+            # Keyset pagination ordered by creation time
+            IndexModel([("tenant_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)]),
+            # Keyset pagination and exports ordered by _id
+            IndexModel([("tenant_id", ASCENDING), ("_id", ASCENDING)]),
+            # Filtered keyset pagination and exports ordered by _id
+            IndexModel([("tenant_id", ASCENDING), ("identity_type", ASCENDING), ("_id", ASCENDING)]),
+            # Claim lookups paginated by _id
+            IndexModel([("tenant_id", ASCENDING), ("claim_pairs.type", ASCENDING), ("claim_pairs.value", ASCENDING), ("_id", ASCENDING)]),
+        ]
+
+    @before_event(Insert, Replace, Save, SaveChanges)
+    def sync_claim_pairs(self):
+        """Rebuild claim_pairs from claims so the indexed layout always matches the dictionary."""
+        self.claim_pairs = [
+            Claim(type=claim_type, value=value)
+            for claim_type, values in self.claims.items()
+            for value in values
+        ]
+
+    def get_changes(self) -> Dict[str, Any]:
+        """
+        Return the fields to $set when saving changes.
+
+        Beanie only sets the remaining keys of a dictionary that lost some, which would leave
+        removed claim types stored. The whole claims dictionary is set in that case.
+        """
+        changes = super().get_changes()
+        if set(self._saved_state.get("claims") or {}) - set(self.claims):
+            changes = {path: value for path, value in changes.items() if not path.startswith("claims.")}
+            changes["claims"] = {claim_type: list(values) for claim_type, values in self.claims.items()}
+        return changes
+
+    def lookup_keys(self) -> List[tuple]:
+        """Return the keys of the lookups that can find this identity, see ``read_preference``."""
+        return [lookup_key("username", self.username, self.tenant_id)]
+
+    @after_event(Insert, Replace, Save, SaveChanges)
+    def pin_lookups_to_primary(self):
+        """Keep lookups of this identity on the primary for a short while, so they see this write."""
+        mark_written(*self.lookup_keys())
 
     async def verify_identity(self) -> bool:
         """ Verify the identity."""
@@ -113,7 +177,8 @@ class Identity(Document):
         Returns:
             The found identity document, or None if no document matches the provided username.
         """
-        return await cls.find_one(cls.username == username)
+        with timed(IDENTITY_LOOKUP_SECONDS, method="by_username"), read_preference("by_username", lookup_key("username", username)):
+            return await cls.find_one({**cls.tenant_filter(), "username": username})
 
     async def has_role_permission(self, permission: str) -> bool:
         """
@@ -127,9 +192,12 @@ class Identity(Document):
         Returns:
             bool: True if the identity has the specified permission, False otherwise.
         """
+        # Identities are loaded without their roles; fetch them on the first check
+        if any(isinstance(role, Link) for role in self.roles):
+            await self.fetch_link("roles")
         # Check role-based permissions
         for role in self.roles:
-            if permission in role.permissions:
+            if role.grants(permission):
                 return True
     
         return False
@@ -158,7 +226,7 @@ class Identity(Document):
         """
         Adds a claim to the identity.
 
-        If the claim type does not exist, it is created. If the claim value is not already present for the claim type, it is added.
+        If the claim type does not exist, it is created. If the claim value is not already present for the claim type, it is added. claim_pairs is updated along with it when the identity is saved.
 
         Parameters:
             claim_type (str): The type of the claim to add.
@@ -171,13 +239,13 @@ class Identity(Document):
             self.claims[claim_type] = []
         if claim_value not in self.claims[claim_type]:
             self.claims[claim_type].append(claim_value)
-        await self.save()
+        await self.save_changes()
 
     async def remove_claim(self, claim_type: str, claim_value: str):
         """
         Removes a claim from the identity.
 
-        If the claim value exists for the specified claim type, it is removed. If removing the claim value leaves the claim type empty, the claim type is also removed.
+        If the claim value exists for the specified claim type, it is removed. If removing the claim value leaves the claim type empty, the claim type is also removed. claim_pairs is updated along with it when the identity is saved.
 
         Parameters:
             claim_type (str): The type of the claim to remove.
@@ -190,4 +258,4 @@ class Identity(Document):
             self.claims[claim_type].remove(claim_value)
             if not self.claims[claim_type]:
                 del self.claims[claim_type]
-            await self.save()
\ No newline at end of file
+            await self.save_changes()
\ No newline at end of file
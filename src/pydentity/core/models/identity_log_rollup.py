@@ -0,0 +1,153 @@
+from collections import Counter
+from datetime import datetime
+from enum import Enum
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from beanie import Link, PydanticObjectId
+from pymongo import ASCENDING, IndexModel, UpdateOne
+
+from pydentity.core.models.identity import IdentityType
+from pydentity.core.models.tenant import TenantDocument
+from pydentity.core.tenancy import tenant_context
+
+if TYPE_CHECKING:
+    from pydentity.core.models.identity_logs import IdentityLog
+
+
+class RollupGranularity(str, Enum):
+    """
+    Time bucket sizes maintained for identity log rollups.
+
+    Attributes:
+        minute (str): One bucket per minute, per action and identity type.
+        hour (str): One bucket per hour, per action and identity type.
+        day (str): One bucket per day, per action and identity type, and per action and identity.
+    """
+    minute = 'minute'
+    hour = 'hour'
+    day = 'day'
+
+
+def bucket_start(timestamp: datetime, granularity: RollupGranularity) -> datetime:
+    """Truncate ``timestamp`` to the start of its bucket."""
+    if granularity == RollupGranularity.minute:
+        return timestamp.replace(second=0, microsecond=0)
+    if granularity == RollupGranularity.hour:
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+RollupKey = Tuple[Optional[str], RollupGranularity, datetime, str, Optional[str], Optional[PydanticObjectId]]
+
+
+class IdentityLogRollup(TenantDocument):
+    """
+    Pre-aggregated count of identity log entries in one time bucket.
+
+    Rollups are incremented as IdentityLog entries are written, so dashboards such as "logins per
+    minute by identity type" or "failed verifications per agent per day" read a handful of rollup
+    documents instead of scanning the raw ``identity_logs`` collection.
+
+    Per action and identity type, buckets exist at every granularity. Per identity, only daily
+    buckets are kept, which bounds the number of rollup documents written per log entry to four.
+    Every bucket belongs to the tenant of the entries it counts.
+
+    Attributes:
+        tenant_id (Optional[str]): The tenant of the entries counted. Inherited from TenantDocument.
+        granularity (RollupGranularity): The bucket size.
+        bucket (datetime): The start of the bucket.
+        action (str): The logged action.
+        identity_type (Optional[IdentityType]): The type of the identities counted. None if unknown.
+        identity_id (Optional[PydanticObjectId]): The identity counted, for per-identity rollups. None for per-type rollups.
+        total (int): The number of log entries in the bucket.
+
+    Settings:
+        name (str): Specifies the collection name in MongoDB to be "identity_log_rollups".
+    """
+    granularity: RollupGranularity
+    bucket: datetime
+    action: str
+    identity_type: Optional[IdentityType] = None
+    identity_id: Optional[PydanticObjectId] = None
+    total: int = 0
+
+    class Settings:
+        name = "identity_log_rollups"
+        indexes = [
+            IndexModel(
+                [
+                    ("tenant_id", ASCENDING),
+                    ("granularity", ASCENDING),
+                    ("action", ASCENDING),
+                    ("identity_type", ASCENDING),
+                    ("identity_id", ASCENDING),
+                    ("bucket", ASCENDING),
+                ],
+                unique=True,
+                name="tenant_rollup",
+            ),
+        ]
+
+    @staticmethod
+    def keys_for(
+        timestamp: datetime,
+        action: str,
+        identity_type: Optional[str],
+        identity_id: Optional[PydanticObjectId],
+        tenant_id: Optional[str] = None,
+    ) -> List[RollupKey]:
+        """Return the rollup keys one log entry increments."""
+        keys: List[RollupKey] = [
+            (tenant_id, granularity, bucket_start(timestamp, granularity), action, identity_type, None)
+            for granularity in RollupGranularity
+        ]
+        if identity_id is not None:
+            keys.append((tenant_id, RollupGranularity.day, bucket_start(timestamp, RollupGranularity.day), action, identity_type, identity_id))
+        return keys
+
+    @classmethod
+    def updates_for(cls, logs: Iterable["IdentityLog"]) -> List[UpdateOne]:
+        """
+        Build the upserts that count ``logs`` into their rollups.
+
+        Entries sharing a bucket are coalesced into a single ``$inc``.
+        """
+        counts: Counter = Counter()
+        for log in logs:
+            identity_type = log.identity_type.value if log.identity_type else None
+            counts.update(cls.keys_for(log.timestamp, log.action, identity_type, _identity_id(log.identity), log.tenant_id))
+        return [
+            UpdateOne(
+                {
+                    "tenant_id": tenant_id,
+                    "granularity": granularity.value,
+                    "bucket": bucket,
+                    "action": action,
+                    "identity_type": identity_type,
+                    "identity_id": identity_id,
+                },
+                {"$inc": {"total": count}},
+                upsert=True,
+            )
+            for (tenant_id, granularity, bucket, action, identity_type, identity_id), count in counts.items()
+        ]
+
+    @classmethod
+    async def record(cls, logs: Iterable["IdentityLog"]) -> None:
+        """Increment the rollups for ``logs`` with one unordered bulk write per tenant."""
+        by_tenant: Dict[Optional[str], List["IdentityLog"]] = {}
+        for log in logs:
+            by_tenant.setdefault(log.tenant_id, []).append(log)
+        for tenant_id, tenant_logs in by_tenant.items():
+            # Each tenant's rollups are written to the collection its tenant router picks
+            with tenant_context(tenant_id):
+                collection = cls.get_motor_collection()
+            await collection.bulk_write(cls.updates_for(tenant_logs), ordered=False)
+
+
+def _identity_id(identity) -> Optional[PydanticObjectId]:
+    if identity is None:
+        return None
+    if isinstance(identity, Link):
+        return identity.ref.id
+    return identity.id
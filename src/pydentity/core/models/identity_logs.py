@@ -1,10 +1,14 @@
 from datetime import datetime, timezone
-from beanie import Document, Link
+from typing import Optional
+from beanie import Granularity, Insert, Link, TimeSeriesConfig, after_event
 from pydantic import Field
+from pymongo import ASCENDING, IndexModel
 
-from pydentity.core.models.identity import Identity
+from pydentity.core.models.identity import Identity, IdentityType
+from pydentity.core.models.identity_log_rollup import IdentityLogRollup
+from pydentity.core.models.tenant import TenantDocument
 
-class IdentityLog(Document):
+class IdentityLog(TenantDocument):
     """
     Represents a log entry for actions performed by or on an Identity within the system.
 
@@ -13,16 +17,65 @@ class IdentityLog(Document):
     Attributes:
         identity (Link[Identity]): A reference link to the Identity object that the log entry is associated with. This allows for easy querying of all log entries related to a specific identity.
         action (str): A string describing the action that was performed. This should be a brief, descriptive phrase or keyword that can be used to categorize the log entry.
+        identity_type (Optional[IdentityType]): The type of the identity, copied from it when the entry is written so that rollups can be keyed by identity type without resolving the link.
+        tenant_id (Optional[str]): The tenant of the identity. Inherited from TenantDocument.
         timestamp (datetime): The timestamp when the action was logged. It defaults to the current UTC time when the log entry is created. This ensures that all log entries are time-stamped in a consistent timezone for accurate tracking and reporting.
         details (dict, optional): An optional dictionary that can hold additional information about the action. This can be used to store extra data that might be relevant for auditing or debugging purposes, such as IP addresses, device information, or specific changes made during the action.
 
     Class Settings:
         name (str): Specifies the collection name in MongoDB to be "identity_logs". This setting ensures that all log entries are stored in a dedicated collection, making them easier to manage and query.
+        indexes (list): An index on timestamp, with a TTL when a retention period is configured. Set by configure_storage.
+        timeseries (Optional[TimeSeriesConfig]): Set by configure_storage when the collection is stored as a time-series collection.
     """
     identity: Link[Identity]
     action: str
-    timestamp: datetime = Field(default_factory=datetime.now(timezone.utc))
+    identity_type: Optional[IdentityType] = None
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     details: dict = Field(default_factory=dict)
 
     class Settings:
-        name = "identity_logs"
\ No newline at end of file
+        name = "identity_logs"
+        indexes = [IndexModel([("timestamp", ASCENDING)])]
+        timeseries: Optional[TimeSeriesConfig] = None
+
+    @classmethod
+    def configure_storage(cls, storage: str = "standard", retention_days: Optional[int] = None) -> None:
+        """
+        Choose how the identity_logs collection is stored. Must be called before init_beanie.
+
+        In "timeseries" mode the collection is created as a MongoDB time-series collection keyed on
+        timestamp with identity_type as the meta field, which stores entries in compressed,
+        time-ordered buckets. In "standard" mode it is a regular collection with an index on timestamp.
+        Either way, when ``retention_days`` is set, MongoDB expires entries older than the retention period.
+
+        The storage mode only takes effect when the collection is created; converting an existing
+        collection, or changing the retention of an existing TTL index, has to be done with collMod.
+
+        Args:
+            storage (str): "standard" or "timeseries".
+            retention_days (Optional[int]): Days to keep entries for; None keeps them forever.
+
+        Raises:
+            ValueError: If the storage mode is unknown.
+        """
+        expire_after = retention_days * 86400 if retention_days else None
+        if storage == "timeseries":
+            cls.Settings.timeseries = TimeSeriesConfig(
+                time_field="timestamp",
+                meta_field="identity_type",
+                granularity=Granularity.seconds,
+                expire_after_seconds=expire_after,
+            )
+            # Time-series collections are clustered on the time field already
+            cls.Settings.indexes = []
+        elif storage == "standard":
+            cls.Settings.timeseries = None
+            options = {"expireAfterSeconds": expire_after} if expire_after else {}
+            cls.Settings.indexes = [IndexModel([("timestamp", ASCENDING)], **options)]
+        else:
+            raise ValueError(f"Unknown identity log storage: {storage}")
+
+    @after_event(Insert)
+    async def update_rollups(self):
+        """Count the new entry into its IdentityLogRollup buckets."""
+        await IdentityLogRollup.record([self])
\ No newline at end of file
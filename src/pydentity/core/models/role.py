@@ -1,24 +1,105 @@
-from beanie import Document, Indexed
-from typing import List, Optional
+from beanie import PydanticObjectId
+from cachetools import LRUCache
+from pydantic import PrivateAttr
+from pymongo import ASCENDING, IndexModel
+from threading import Lock
+from typing import List, Optional, Tuple
 
+from pydentity.core.models.tenant import TenantDocument
+from pydentity.core.permissions import PermissionMatcher
 
-class Role(Document):
+# Upper bound on the stored roles whose compiled matchers are kept for reuse
+ROLE_MATCHER_CACHE_SIZE = 4096
+
+# Roles are read again on every request, so matchers are shared by every copy of a stored role
+# in this process, keyed by (role id, revision). Any save gives the role a new revision
+_matchers: LRUCache = LRUCache(maxsize=ROLE_MATCHER_CACHE_SIZE)
+_matchers_lock = Lock()
+
+
+class Role(TenantDocument):
     """
     Role document model for role-based access control.
 
-    Inherits from beanie.Document to leverage MongoDB document mapping.
+    Inherits from TenantDocument to leverage MongoDB document mapping and to scope roles to a tenant.
 
     Attributes:
-        name (Indexed[str]): The unique name of the role. This field is indexed to ensure uniqueness.
+        name (str): The name of the role, unique within its tenant.
+        tenant_id (Optional[str]): The tenant the role belongs to. Inherited from TenantDocument.
         description (Optional[str]): An optional description of the role. Defaults to None.
-        permissions (List[str]): A list of permissions associated with the role. Defaults to an empty list.
+        permissions (List[str]): A list of permissions associated with the role. Defaults to an empty list. Permissions are hierarchical, colon-separated strings such as "billing:invoices:read", and a "*" segment acts as a wildcard, e.g. "users:*".
+        parent_ids (List[PydanticObjectId]): The roles this role inherits permissions from.
+        ancestor_ids (List[PydanticObjectId]): Every role this role inherits from, directly or through its parents. Maintained by PermissionService.
+        effective_permissions (List[str]): The role's own permissions merged with those of all its ancestors. Maintained by PermissionService, so permission checks never walk the role hierarchy.
 
     Settings:
         name (str): Specifies the collection name in MongoDB to be "roles".
+        indexes (list): A unique index on (tenant_id, name), and a multikey index on ancestor_ids, used to find the descendants of a role when it changes.
     """
-    name: Indexed(str, unique=True)
+    name: str
     description: Optional[str] = None
     permissions: List[str] = []
+    parent_ids: List[PydanticObjectId] = []
+    ancestor_ids: List[PydanticObjectId] = []
+    effective_permissions: List[str] = []
+
+    _matcher: Optional[PermissionMatcher] = PrivateAttr(default=None)
 
     class Settings:
-        name = "roles"
\ No newline at end of file
+        name = "roles"
+        use_state_management = True
+        use_revision = True
+        indexes = [
+            IndexModel([("tenant_id", ASCENDING), ("name", ASCENDING)], unique=True, name="tenant_name"),
+            IndexModel([("ancestor_ids", ASCENDING)]),
+        ]
+
+    @property
+    def permission_matcher(self) -> PermissionMatcher:
+        """
+        The role's effective permissions compiled into a PermissionMatcher.
+
+        The role's own permissions are always included, so a role that has not been saved through
+        PermissionService yet still grants them. The matcher is compiled on first use and kept for
+        the lifetime of the document. A role read unchanged from the database reuses the matcher
+        compiled for the same revision by an earlier request. Code that changes the permissions in
+        place must call ``invalidate_permissions`` afterwards.
+        """
+        if self._matcher is None:
+            key = self._matcher_key()
+            matcher = None
+            if key is not None:
+                with _matchers_lock:
+                    matcher = _matchers.get(key)
+            if matcher is None:
+                matcher = PermissionMatcher([*self.permissions, *self.effective_permissions])
+                if key is not None:
+                    with _matchers_lock:
+                        _matchers[key] = matcher
+            self._matcher = matcher
+        return self._matcher
+
+    def _matcher_key(self) -> Optional[Tuple[PydanticObjectId, object]]:
+        # Only a role whose permissions are as stored at its revision can share a matcher
+        saved = self._saved_state
+        if self.id is None or self.revision_id is None or saved is None:
+            return None
+        if saved.get("permissions") != self.permissions or saved.get("effective_permissions") != self.effective_permissions:
+            return None
+        return self.id, self.revision_id
+
+    def invalidate_permissions(self) -> None:
+        """Drop the compiled matcher so it is rebuilt from the permissions on the next check."""
+        self._matcher = None
+
+    def grants(self, permission: str) -> bool:
+        """
+        Checks if the role grants a permission, directly or through a wildcard.
+
+        Parameters:
+            permission (str): The permission to check for, e.g. "users:read".
+
+        Returns:
+            bool: True if the role grants the permission, False otherwise.
+        """
+        return self.permission_matcher.matches(permission)
\ No newline at end of file
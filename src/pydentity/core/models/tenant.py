@@ -0,0 +1,33 @@
+from typing import Any, Dict, Optional
+
+from beanie import Document
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pydantic import Field
+
+from pydentity.core.read_preference import apply_read_preference
+from pydentity.core.tenancy import get_current_tenant, get_tenant_router
+
+
+class TenantDocument(Document):
+    """
+    Base class for documents that belong to a tenant.
+
+    Documents are stamped with the current tenant when they are created, and every query and
+    write goes to the collection the tenant router picks for the current tenant, so tenants can
+    be moved to databases of their own without changes to the calling code. Queries run inside
+    ``read_preference`` or ``primary_reads`` use the read preference those select.
+
+    Attributes:
+        tenant_id (Optional[str]): The tenant the document belongs to. None for documents outside any tenant. Defaults to the current tenant.
+    """
+    tenant_id: Optional[str] = Field(default_factory=get_current_tenant)
+
+    @classmethod
+    def get_motor_collection(cls) -> AsyncIOMotorCollection:
+        collection = get_tenant_router().collection(super().get_motor_collection(), get_current_tenant())
+        return apply_read_preference(collection)
+
+    @classmethod
+    def tenant_filter(cls) -> Dict[str, Any]:
+        """Return the query condition restricting a lookup to the current tenant."""
+        return {"tenant_id": get_current_tenant()}
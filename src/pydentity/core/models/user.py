@@ -1,20 +1,22 @@
-from beanie import Indexed
 from pydantic import EmailStr, Field
-from typing import Optional
+from pymongo import ASCENDING, IndexModel
+from typing import List, Optional
 from datetime import datetime
 
-from pydentity.core.models.identity import SSOProvider, VerificationStatus
+from pydentity.core.models.identity import Identity, SSOProvider, VerificationStatus
+from pydentity.core.metrics import IDENTITY_LOOKUP_SECONDS, timed
+from pydentity.core.read_preference import lookup_key, read_preference
 
 
 class User(Identity):
-        """
+    """
     Represents a user in the system, extending the Identity model.
 
     This class adds specific attributes related to a user's account, such as email, password, verification status, and last login information. It also provides a class method to find a user by email.
 
     Attributes:
-        email (Indexed[EmailStr]): The user's email address. It is indexed and unique, ensuring no two users can share the same email.
-        hashed_password (str): The user's password in a securely hashed format. This ensures that plain text passwords are never stored in the database.
+        email (EmailStr): The user's email address. It is unique within the user's tenant, ensuring no two users of a tenant can share the same email.
+        hashed_password (str): The user's password in a securely hashed format. This ensures that plain text passwords are never stored in the database. Empty for users who only sign in through SSO.
         # is_verified (bool): A flag indicating whether the user's email address has been verified. Defaults to False.
         sso_provider (Optional[SSOProvider]): The SSO provider used by the user, if any. This is optional and can be None if the user does not use SSO.
         sso_id (Optional[str]): The user's ID from the SSO provider. This is optional and can be None if the user does not use SSO.
@@ -24,13 +26,34 @@ class User(Identity):
         by_email: A class method that takes an email address as input and returns a user document from the database that matches the email address. If no user is found with the provided email, None is returned.
         get_by_sso_id: A class method that takes an SSO provider and an SSO ID as input and returns a user document from the database that matches the SSO provider and SSO ID. If no user is found with the provided SSO provider and SSO ID, None is returned.
     """
-    email: Indexed(EmailStr, unique=True)
+    email: EmailStr
     hashed_password: str
     # is_verified: bool = False
     sso_provider: Optional[SSOProvider] = None
     sso_id: Optional[str] = None
     last_login: Optional[datetime] = None
 
+    class Settings(Identity.Settings):
+        # Beanie reads only the attributes a Settings class defines itself, so the inherited ones are repeated
+        name = "identities"
+        use_state_management = True
+        use_revision = True
+        indexes = Identity.Settings.indexes + [
+            IndexModel(
+                [("tenant_id", ASCENDING), ("email", ASCENDING)],
+                unique=True,
+                name="tenant_email",
+                partialFilterExpression={"email": {"$exists": True}},
+            ),
+            # Keys the atomic SSO sign-in upsert, so concurrent first logins create a single user
+            IndexModel(
+                [("tenant_id", ASCENDING), ("sso_provider", ASCENDING), ("sso_id", ASCENDING)],
+                unique=True,
+                name="tenant_sso",
+                partialFilterExpression={"sso_id": {"$type": "string"}},
+            ),
+        ]
+
     @classmethod
     async def by_email(cls, email: EmailStr):
         """
@@ -44,7 +67,8 @@ class User(Identity):
         Returns:
             An instance of the cls (User document) that matches the email address, or None if no match is found.
         """
-        return await cls.find_one(cls.email == email)
+        with timed(IDENTITY_LOOKUP_SECONDS, method="by_email"), read_preference("by_email", lookup_key("email", email)):
+            return await cls.find_one({**cls.tenant_filter(), "email": email})
 
     @classmethod
     async def get_by_sso_id(cls, provider: SSOProvider, sso_id: str):
@@ -60,21 +84,38 @@ class User(Identity):
         Returns:
             An instance of the cls (User document) that matches the SSO provider and SSO ID, or None if no match is found.
         """
-        return await cls.find_one((cls.sso_provider == provider) & (cls.sso_id == sso_id))
+        with timed(IDENTITY_LOOKUP_SECONDS, method="get_by_sso_id"), read_preference("get_by_sso_id", lookup_key("sso_id", (provider, sso_id))):
+            return await cls.find_one({**cls.tenant_filter(), "sso_provider": provider, "sso_id": sso_id})
+
+    @property
+    def email_verified(self) -> bool:
+        """Whether the email address has been verified, as exposed by the user schemas."""
+        return self.verification_status == VerificationStatus.verified
+
+    def lookup_keys(self) -> List[tuple]:
+        keys = super().lookup_keys() + [lookup_key("email", self.email, self.tenant_id)]
+        if self.sso_id is not None:
+            keys.append(lookup_key("sso_id", (self.sso_provider, self.sso_id), self.tenant_id))
+        return keys
 
     async def verify_identity(self) -> bool:
-        if self.email_verified and self.verification_status == VerificationStatus.pending:
-            self.verification_status = VerificationStatus.verified
-            await self.save()
-            return True
-        return False
+        """
+        Mark the email address as verified, once its verification has been initiated.
+
+        Returns:
+            bool: True if the status changed from pending to verified; False for addresses that are
+            already verified or whose verification was never initiated.
+        """
+        if self.verification_status != VerificationStatus.pending:
+            return False
+        self.verification_status = VerificationStatus.verified
+        await self.save_changes()
+        return True
 
     async def initiate_verification(self) -> bool:
+        # Only the status change; AuthService.request_email_verification also sends the email
         if self.verification_status == VerificationStatus.unverified:
             self.verification_status = VerificationStatus.pending
-            # Here you would typically send a verification email
-            # For this example, we'll just update the status
-            # Refactor this...
-            await self.save()
+            await self.save_changes()
             return True
-        return False
\ No newline at end of file
+        return False
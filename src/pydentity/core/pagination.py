@@ -0,0 +1,96 @@
+"""Keyset pagination helpers."""
+import base64
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING
+
+
+class KeysetOrder(str, Enum):
+    """
+    Sort keys supported by keyset pagination.
+
+    Attributes:
+        id (str): Order by ``_id``, which also follows insertion order.
+        created_at (str): Order by ``created_at``, with ``_id`` breaking ties.
+    """
+    id = "id"
+    created_at = "created_at"
+
+
+def encode_cursor(order_by: KeysetOrder, document_id: ObjectId, created_at: Optional[datetime] = None) -> str:
+    """
+    Build the opaque cursor pointing just after the last document of a page.
+
+    Args:
+        order_by (KeysetOrder): The sort key of the listing.
+        document_id (ObjectId): The ``_id`` of the last document.
+        created_at (Optional[datetime]): Its ``created_at``, required when ordering by it.
+
+    Returns:
+        str: A URL-safe cursor string.
+    """
+    position = {"id": str(document_id)}
+    if order_by == KeysetOrder.created_at:
+        position["created_at"] = created_at.isoformat()
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        decoded = {"id": ObjectId(position["id"])}
+        if "created_at" in position:
+            decoded["created_at"] = datetime.fromisoformat(position["created_at"])
+        return decoded
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+
+def keyset_query(
+    filters: Dict[str, Any],
+    order_by: KeysetOrder,
+    after: Optional[str] = None,
+) -> Tuple[Dict[str, Any], List[Tuple[str, int]]]:
+    """
+    Combine ``filters`` with the range condition that resumes after ``after``.
+
+    Each page is an index range scan starting at the cursor, so its cost does not depend on
+    how deep into the listing it is, unlike ``skip``.
+
+    Args:
+        filters (Dict[str, Any]): Equality filters of the listing.
+        order_by (KeysetOrder): The sort key of the listing.
+        after (Optional[str]): The cursor returned with the previous page.
+
+    Returns:
+        Tuple: The Mongo query and the matching sort specification.
+    """
+    query = dict(filters)
+    if order_by == KeysetOrder.created_at:
+        sort = [("created_at", ASCENDING), ("_id", ASCENDING)]
+    else:
+        sort = [("_id", ASCENDING)]
+
+    if after:
+        position = decode_cursor(after)
+        if order_by == KeysetOrder.created_at:
+            if "created_at" not in position:
+                raise ValueError("Cursor does not match the requested ordering")
+            query["$or"] = [
+                {"created_at": {"$gt": position["created_at"]}},
+                {"created_at": position["created_at"], "_id": {"$gt": position["id"]}},
+            ]
+        else:
+            query["_id"] = {"$gt": position["id"]}
+    return query, sort
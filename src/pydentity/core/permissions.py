@@ -0,0 +1,109 @@
+"""Hierarchical permission strings and their compiled matcher."""
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+SEPARATOR = ":"
+WILDCARD = "*"
+
+
+def parse_permission(permission: str) -> List[str]:
+    """
+    Split a permission into its segments.
+
+    Permissions are colon-separated paths from the most general segment to the most specific,
+    e.g. ``billing:invoices:read``. A segment consisting of ``*`` matches any single segment,
+    and a trailing ``*`` also matches any number of further segments, so ``users:*`` grants
+    ``users:read`` as well as ``users:profile:write``. A ``*`` inside a segment has no special meaning.
+
+    Args:
+        permission (str): The permission string.
+
+    Returns:
+        List[str]: The segments.
+
+    Raises:
+        ValueError: If the permission is empty or has an empty segment.
+    """
+    segments = permission.split(SEPARATOR)
+    if not all(segments):
+        raise ValueError(f"Invalid permission: {permission!r}")
+    return segments
+
+
+class _Node:
+    __slots__ = ("children", "terminal", "subtree")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # A grant ends exactly here
+        self.terminal = False
+        # A grant ends here with a trailing wildcard, covering every longer permission
+        self.subtree = False
+
+
+class PermissionMatcher:
+    """
+    A set of granted permissions compiled into a trie of their segments.
+
+    Checking a permission walks the trie one segment at a time, following at most the literal
+    segment and the ``*`` branch at each level, so its cost depends on the depth of the permission
+    rather than on the number of grants. Grants without wildcards are also kept in a set and
+    checked first with a single hash lookup.
+
+    Attributes:
+        grants (FrozenSet[str]): The permissions the matcher was compiled from.
+    """
+
+    __slots__ = ("grants", "_exact", "_root")
+
+    def __init__(self, grants: Iterable[str] = ()):
+        self.grants: FrozenSet[str] = frozenset(grants)
+        self._exact = frozenset(grant for grant in self.grants if WILDCARD not in grant)
+        self._root: Optional[_Node] = None
+        wildcards = self.grants - self._exact
+        if wildcards:
+            self._root = _Node()
+            for grant in wildcards:
+                self._insert(parse_permission(grant))
+
+    def _insert(self, segments: List[str]) -> None:
+        node = self._root
+        if segments[-1] == WILDCARD:
+            for segment in segments[:-1]:
+                node = node.children.setdefault(segment, _Node())
+            node.subtree = True
+            return
+        for segment in segments:
+            node = node.children.setdefault(segment, _Node())
+        node.terminal = True
+
+    def matches(self, permission: str) -> bool:
+        """
+        Return whether the grants cover ``permission``.
+
+        Args:
+            permission (str): A concrete permission, e.g. ``users:read``.
+
+        Returns:
+            bool: True if a grant equals the permission or covers it through a wildcard.
+        """
+        if permission in self._exact:
+            return True
+        if self._root is None:
+            return False
+        return self._match(self._root, permission.split(SEPARATOR), 0)
+
+    def _match(self, node: _Node, segments: List[str], depth: int) -> bool:
+        if depth == len(segments):
+            return node.terminal
+        if node.subtree:
+            return True
+        child = node.children.get(segments[depth])
+        if child is not None and self._match(child, segments, depth + 1):
+            return True
+        wildcard = node.children.get(WILDCARD)
+        return wildcard is not None and self._match(wildcard, segments, depth + 1)
+
+    __contains__ = matches
+
+    def __len__(self) -> int:
+        return len(self.grants)
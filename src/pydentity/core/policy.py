@@ -0,0 +1,229 @@
+"""Claim policy expressions and their compiler."""
+import operator
+import re
+from typing import Callable, FrozenSet, List, Mapping, Optional, Sequence, Set, Tuple
+
+Claims = Mapping[str, Sequence[str]]
+Check = Callable[[Claims], bool]
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?(?![\w.:-]))
+      | (?P<string>"[^"]*"|'[^']*')
+      | (?P<name>[A-Za-z_][\w.:-]*)
+      | (?P<op>==|!=|<=|>=|<|>)
+      | (?P<punctuation>[(){},])
+    )""", re.VERBOSE)
+
+KEYWORDS = frozenset({"and", "or", "not", "in"})
+
+_COMPARISONS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+class PolicySyntaxError(ValueError):
+    """Raised when a policy expression cannot be parsed."""
+
+
+def _number(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str, int]]:
+    tokens = []
+    position = 0
+    end = len(expression.rstrip())
+    while position < end:
+        match = _TOKEN.match(expression, position)
+        if match is None or match.end() == position:
+            position += len(expression[position:]) - len(expression[position:].lstrip())
+            raise PolicySyntaxError(f"Unexpected character at position {position} in {expression!r}")
+        kind = match.lastgroup
+        text, start = match.group(kind), match.start(kind)
+        if kind == "punctuation" or (kind == "name" and text in KEYWORDS):
+            kind = text
+        elif kind == "string":
+            kind, text = "value", text[1:-1]
+        tokens.append((kind, text, start))
+        position = match.end()
+    tokens.append(("end", "", end))
+    return tokens
+
+
+class _Parser:
+    """Recursive descent over the grammar in ``Policy``'s docstring, building checks as it goes."""
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tokens = _tokenize(expression)
+        self.index = 0
+        self.claims: Set[str] = set()
+
+    def _peek(self) -> str:
+        return self.tokens[self.index][0]
+
+    def _take(self, *kinds: str) -> str:
+        kind, text, position = self.tokens[self.index]
+        if kind not in kinds:
+            found = repr(text) if kind != "end" else "end of expression"
+            expected = " or ".join(kind if kind != "end" else "end of expression" for kind in kinds)
+            raise PolicySyntaxError(f"Expected {expected} but found {found} at position {position} in {self.expression!r}")
+        self.index += 1
+        return text
+
+    def parse(self) -> Check:
+        check = self._or()
+        self._take("end")
+        return check
+
+    def _or(self) -> Check:
+        check = self._and()
+        while self._peek() == "or":
+            self.index += 1
+            check = _any_of(check, self._and())
+        return check
+
+    def _and(self) -> Check:
+        check = self._not()
+        while self._peek() == "and":
+            self.index += 1
+            check = _all_of(check, self._not())
+        return check
+
+    def _not(self) -> Check:
+        if self._peek() == "not":
+            self.index += 1
+            return _negate(self._not())
+        return self._atom()
+
+    def _atom(self) -> Check:
+        if self._peek() == "(":
+            self.index += 1
+            check = self._or()
+            self._take(")")
+            return check
+        claim = self._take("name")
+        self.claims.add(claim)
+        kind = self._peek()
+        if kind == "in":
+            self.index += 1
+            return _intersects(claim, self._set())
+        if kind == "not" and self.tokens[self.index + 1][0] == "in":
+            self.index += 2
+            return _negate(_intersects(claim, self._set()))
+        symbol = self.tokens[self.index][1] if kind == "op" else None
+        if symbol in ("==", "!="):
+            self.index += 1
+            check = _intersects(claim, frozenset((self._value(),)))
+            return check if symbol == "==" else _negate(check)
+        if symbol in _COMPARISONS:
+            self.index += 1
+            return _compares(claim, _COMPARISONS[symbol], float(self._take("number")))
+        return _present(claim)
+
+    def _set(self) -> FrozenSet[str]:
+        self._take("{")
+        values = [self._value()]
+        while self._peek() == ",":
+            self.index += 1
+            values.append(self._value())
+        self._take("}")
+        return frozenset(values)
+
+    def _value(self) -> str:
+        return self._take("name", "value", "number")
+
+
+def _any_of(first: Check, second: Check) -> Check:
+    return lambda claims: first(claims) or second(claims)
+
+
+def _all_of(first: Check, second: Check) -> Check:
+    return lambda claims: first(claims) and second(claims)
+
+
+def _negate(check: Check) -> Check:
+    return lambda claims: not check(claims)
+
+
+def _present(claim: str) -> Check:
+    return lambda claims: bool(claims.get(claim))
+
+
+def _intersects(claim: str, values: FrozenSet[str]) -> Check:
+    isdisjoint = values.isdisjoint
+
+    def check(claims: Claims) -> bool:
+        held = claims.get(claim)
+        return held is not None and not isdisjoint(held)
+    return check
+
+
+def _compares(claim: str, compare: Callable[[float, float], bool], threshold: float) -> Check:
+    def check(claims: Claims) -> bool:
+        for value in claims.get(claim, ()):
+            number = _number(value)
+            if number is not None and compare(number, threshold):
+                return True
+        return False
+    return check
+
+
+class Policy:
+    """
+    A claim policy expression compiled into nested closures.
+
+    The expression is parsed once, when the policy is created; evaluating it only calls the
+    closures, which look claims up in the identity's claim dictionary and test them against
+    frozensets and numbers prepared at compile time.
+
+    Grammar::
+
+        expression := term ("or" term)*
+        term       := factor ("and" factor)*
+        factor     := "not" factor | "(" expression ")" | test
+        test       := claim                              the identity holds the claim
+                    | claim "in" "{" value ("," value)* "}"
+                    | claim "not" "in" "{" value ("," value)* "}"
+                    | claim ("==" | "!=") value
+                    | claim ("<" | "<=" | ">" | ">=") number
+
+    Claims hold several values, so a test passes when any of the claim's values satisfies it:
+    ``dept in {eng, ops}`` when one of the values is ``eng`` or ``ops``, ``clearance >= 3``
+    when one of the values is a number of at least 3. ``!=`` and ``not in`` are the negations,
+    true when no value matches. Values are bare words, numbers or quoted strings.
+
+    Attributes:
+        expression (str): The source expression.
+        claims (FrozenSet[str]): The claim types the expression refers to.
+
+    Example:
+        policy = Policy("(dept in {eng, ops}) and clearance >= 3 and not suspended")
+        policy.allows(identity)
+    """
+
+    __slots__ = ("expression", "claims", "_check")
+
+    def __init__(self, expression: str):
+        parser = _Parser(expression)
+        self._check = parser.parse()
+        self.expression = expression
+        self.claims: FrozenSet[str] = frozenset(parser.claims)
+
+    def __call__(self, claims: Claims) -> bool:
+        """Evaluate the policy against a claim dictionary."""
+        return self._check(claims)
+
+    def allows(self, identity) -> bool:
+        """Evaluate the policy against an identity's claims."""
+        return self._check(identity.claims)
+
+    def __repr__(self) -> str:
+        return f"Policy({self.expression!r})"
@@ -0,0 +1,196 @@
+"""Per-operation read preferences with read-your-writes pinning."""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from threading import Lock
+from typing import Any, Dict, Hashable, Iterator, Optional, Tuple
+
+from cachetools import TTLCache
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+    _ServerMode,
+)
+
+from pydentity.core.config import get_settings
+from pydentity.core.tenancy import get_current_tenant
+
+MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+PRIMARY = Primary()
+
+# Tenant of lookup keys for fields that are unique across tenants, such as API keys
+GLOBAL_SCOPE = ""
+
+_current: ContextVar[Optional[_ServerMode]] = ContextVar("pydentity_read_preference", default=None)
+_force_primary: ContextVar[bool] = ContextVar("pydentity_force_primary", default=False)
+_request_writes: ContextVar[Optional["RequestWrites"]] = ContextVar("pydentity_request_writes", default=None)
+_collections: Dict[Tuple[int, str, str, int], AsyncIOMotorCollection] = {}
+
+
+@lru_cache(maxsize=None)
+def _mode(name: str, max_staleness: int) -> _ServerMode:
+    try:
+        mode = MODES[name]
+    except KeyError:
+        raise ValueError(f"Unknown read preference: {name}") from None
+    return mode() if mode is Primary else mode(max_staleness=max_staleness)
+
+
+def configured_read_preference(operation: str) -> _ServerMode:
+    """
+    Return the read preference configured for an operation.
+
+    Args:
+        operation (str): The operation name, e.g. "by_username".
+
+    Raises:
+        ValueError: If the configured mode is unknown.
+    """
+    settings = get_settings()
+    name = settings.READ_PREFERENCE_OVERRIDES.get(operation, settings.READ_PREFERENCE)
+    return _mode(name, settings.READ_MAX_STALENESS_SECONDS)
+
+
+class RecentWrites:
+    """
+    Remembers lookup keys of recently written identities for a short window.
+
+    Lookups of those keys are sent to the primary so a flow like sign-up followed by login
+    sees its own write even when lookups otherwise read from lagging secondaries. The window
+    is kept in the memory of the process that made the write, so it only holds when the
+    follow-up request reaches that same process. With several workers or servers, install
+    ``ReadYourWritesMiddleware``, which pins the client instead.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 100_000):
+        self._keys: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = Lock()
+
+    def add(self, key: Hashable) -> None:
+        with self._lock:
+            self._keys[key] = True
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._keys
+
+
+class RequestWrites:
+    """Records whether the request being handled wrote an identity, see ``track_request_writes``."""
+
+    __slots__ = ("wrote",)
+
+    def __init__(self):
+        self.wrote = False
+
+
+@lru_cache()
+def get_recent_writes() -> RecentWrites:
+    """Return the process-wide RecentWrites tracker."""
+    return RecentWrites(ttl=get_settings().READ_YOUR_WRITES_SECONDS)
+
+
+def lookup_key(field: str, value: Any, tenant_id: Optional[str] = None) -> Tuple:
+    """
+    Build the key identifying a lookup of an identity by one of its fields.
+
+    Args:
+        field (str): The field looked up, e.g. "email".
+        value (Any): The value looked up.
+        tenant_id (Optional[str]): The tenant the lookup is scoped to. Defaults to the current tenant.
+    """
+    return (tenant_id if tenant_id is not None else get_current_tenant(), field, value)
+
+
+def mark_written(*keys: Hashable) -> None:
+    """Keep lookups by these keys on the primary for ``READ_YOUR_WRITES_SECONDS``."""
+    recent = get_recent_writes()
+    for key in keys:
+        if key is not None:
+            recent.add(key)
+    writes = _request_writes.get()
+    if writes is not None:
+        writes.wrote = True
+
+
+@contextmanager
+def track_request_writes() -> Iterator[RequestWrites]:
+    """
+    Record whether code run in the block writes an identity.
+
+    Example:
+        with track_request_writes() as writes:
+            await handle(request)
+        if writes.wrote:
+            ...
+    """
+    writes = RequestWrites()
+    token = _request_writes.set(writes)
+    try:
+        yield writes
+    finally:
+        _request_writes.reset(token)
+
+
+@contextmanager
+def read_preference(operation: str, key: Optional[Hashable] = None) -> Iterator[None]:
+    """
+    Apply the read preference configured for ``operation`` to the queries run in the block.
+
+    The primary is used instead when the block runs inside ``primary_reads`` or ``key`` was
+    recently passed to ``mark_written``.
+
+    Example:
+        with read_preference("by_email", key=lookup_key("email", email)):
+            user = await User.find_one(...)
+    """
+    if _force_primary.get() or (key is not None and key in get_recent_writes()):
+        mode = PRIMARY
+    else:
+        mode = configured_read_preference(operation)
+    token = _current.set(mode)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def primary_reads() -> Iterator[None]:
+    """Send every read in the block to the primary, whatever the configured preferences."""
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+
+def current_read_preference() -> Optional[_ServerMode]:
+    """Return the read preference in effect, or None outside ``read_preference`` and ``primary_reads``."""
+    if _force_primary.get():
+        return PRIMARY
+    return _current.get()
+
+
+def apply_read_preference(collection: AsyncIOMotorCollection) -> AsyncIOMotorCollection:
+    """Return ``collection`` with the read preference in effect, or unchanged if there is none."""
+    mode = current_read_preference()
+    if mode is None or mode == collection.read_preference:
+        return collection
+    # Read preferences are not hashable, so the cache is keyed by their mode and staleness bound
+    key = (id(collection.database.client), collection.full_name, mode.mongos_mode, mode.max_staleness)
+    routed = _collections.get(key)
+    if routed is None:
+        routed = _collections[key] = collection.with_options(read_preference=mode)
+    return routed
@@ -0,0 +1,201 @@
+"""Deadlines, retries, hedging and circuit breaking for outbound provider calls."""
+import asyncio
+import random
+import time
+from threading import Lock
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Optional
+
+from pydentity.core.config import Settings, get_settings
+from pydentity.core.metrics import SSO_REQUEST_SECONDS, timed
+
+if TYPE_CHECKING:
+    # httpx is slow to import and only needed once a provider is called
+    import httpx
+
+
+class ProviderUnavailable(Exception):
+    """Raised when a provider call cannot be completed: its circuit is open, it ran out of time or every attempt failed."""
+
+
+def is_failure(response: "httpx.Response") -> bool:
+    """Return whether a response means the provider is struggling, as opposed to rejecting the request."""
+    return response.status_code >= 500 or response.status_code == 429
+
+
+class CircuitBreaker:
+    """
+    Fails calls to a provider fast while it is unhealthy.
+
+    After ``failure_threshold`` consecutive failed calls the circuit opens and calls are refused
+    without being sent. Once ``reset_seconds`` have passed a single probe call is let through:
+    its success closes the circuit again, its failure keeps it open for another period.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return self.CLOSED
+            if self._probing or self._clock() - self._opened_at >= self.reset_seconds:
+                return self.HALF_OPEN
+            return self.OPEN
+
+    def allow(self) -> bool:
+        """Return whether a call may be sent. A True while the circuit is half open reserves the probe."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or self._clock() - self._opened_at < self.reset_seconds:
+                return False
+            self._probing = True
+            return True
+
+    def release(self) -> None:
+        """Give back a probe reserved by ``allow`` whose call ended without an outcome."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                self._probing = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = Lock()
+
+
+def get_circuit_breaker(provider: str, settings: Optional[Settings] = None) -> CircuitBreaker:
+    """Return the process-wide circuit breaker of a provider, shared by every client calling it."""
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            settings = settings or get_settings()
+            breaker = _breakers[provider] = CircuitBreaker(settings.SSO_BREAKER_FAILURES, settings.SSO_BREAKER_RESET_SECONDS)
+        return breaker
+
+
+def reset_circuit_breakers() -> None:
+    """Forget every provider's circuit state."""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+class ProviderClient:
+    """
+    Sends the requests of one provider within a deadline, behind its circuit breaker.
+
+    Every call is bounded by the provider's deadline (``SSO_DEADLINE_SECONDS``, overridable per
+    provider), retries and hedges included, so a slow provider cannot hold a request for longer
+    than that. GETs are idempotent: they are retried with jittered exponential backoff on
+    network errors and 5xx/429 replies, and when ``SSO_HEDGE_DELAY_SECONDS`` is set a second copy
+    is sent if the first has not answered in time, the first good answer winning. POSTs are sent
+    once, since provider token exchanges consume their authorization code.
+
+    Calls that still fail, run out of time or are refused by the open circuit raise
+    ProviderUnavailable. Replies such as 400 are returned to the caller: they reject the request,
+    not the provider's health.
+
+    Example:
+        facebook = ProviderClient(http_client, "facebook")
+        response = await facebook.get("https://graph.facebook.com/me", endpoint="me", params=params)
+    """
+
+    def __init__(self, http_client: "httpx.AsyncClient", provider: str, settings: Optional[Settings] = None):
+        settings = settings or get_settings()
+        self.http_client = http_client
+        self.provider = provider
+        self.deadline = settings.SSO_DEADLINE_OVERRIDES.get(provider, settings.SSO_DEADLINE_SECONDS)
+        self.retries = settings.SSO_RETRIES
+        self.backoff = settings.SSO_RETRY_BACKOFF_SECONDS
+        self.hedge_delay = settings.SSO_HEDGE_DELAY_SECONDS
+        self.breaker = get_circuit_breaker(provider, settings)
+
+    async def get(self, url: str, *, endpoint: str, **kwargs) -> "httpx.Response":
+        """Send a GET, retried and hedged. Keyword arguments are passed to ``httpx.AsyncClient.request``."""
+        send = lambda: self._send("GET", url, endpoint, kwargs)
+        return await self._call(endpoint, lambda: self._hedged(send), attempts=1 + self.retries)
+
+    async def post(self, url: str, *, endpoint: str, **kwargs) -> "httpx.Response":
+        """Send a POST once. Keyword arguments are passed to ``httpx.AsyncClient.request``."""
+        return await self._call(endpoint, lambda: self._send("POST", url, endpoint, kwargs), attempts=1)
+
+    async def _call(self, endpoint: str, attempt: Callable[[], Awaitable["httpx.Response"]], attempts: int) -> "httpx.Response":
+        if not self.breaker.allow():
+            raise ProviderUnavailable(f"{self.provider} is unavailable; its circuit is open")
+        try:
+            response = await asyncio.wait_for(self._attempts(endpoint, attempt, attempts), self.deadline)
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            raise ProviderUnavailable(f"{self.provider} {endpoint} did not answer within {self.deadline}s") from None
+        except ProviderUnavailable:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled by our caller or failed on our side; this says nothing about the provider
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return response
+
+    async def _attempts(self, endpoint: str, attempt: Callable[[], Awaitable["httpx.Response"]], attempts: int) -> "httpx.Response":
+        import httpx
+
+        for number in range(attempts):
+            if number:
+                await asyncio.sleep(self.backoff * 2 ** (number - 1) * random.uniform(0.5, 1.5))
+            try:
+                response = await attempt()
+            except httpx.TransportError as e:
+                error = f"{e!r}"
+                continue
+            if not is_failure(response):
+                return response
+            error = f"HTTP {response.status_code}"
+        raise ProviderUnavailable(f"{self.provider} {endpoint} failed after {attempts} attempt(s): {error}")
+
+    async def _hedged(self, send: Callable[[], Awaitable["httpx.Response"]]) -> "httpx.Response":
+        if self.hedge_delay is None:
+            return await send()
+        tasks = [asyncio.ensure_future(send())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay)
+            if not done:
+                tasks.append(asyncio.ensure_future(send()))
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and not is_failure(task.result()):
+                        return task.result()
+                if not pending:
+                    # Every copy failed; report the last one
+                    return task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _send(self, method: str, url: str, endpoint: str, kwargs: dict) -> "httpx.Response":
+        with timed(SSO_REQUEST_SECONDS, provider=self.provider, endpoint=endpoint):
+            return await self.http_client.request(method, url, **kwargs)
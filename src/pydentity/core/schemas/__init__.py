@@ -1,11 +1,33 @@
-from .identity import IdentityBase, UserIndentity, AgentIdentity
-from .user import UserBase, UserCreate, UserUpdate, UserInDB, UserOut
-from .token import Token, TokenPayload, TokenData
-from .config import PyIdentityConfig
+from typing import TYPE_CHECKING
 
-__all__ = [
-    "IdentityBase", "UserIndentity", "AgentIdentity",
-    "UserBase", "UserCreate", "UserUpdate", "UserInDB", "UserOut",
-    "Token", "TokenPayload", "TokenData",
-    "PyIdentityConfig"
-]
\ No newline at end of file
+from pydentity._lazy import attach
+
+__getattr__, __dir__, __all__ = attach(__name__, {
+    "IdentityBase": ".identity",
+    "UserIdentity": ".identity",
+    "UserIndentity": ".identity",
+    "AgentIdentity": ".identity",
+    "IdentitySummary": ".identity",
+    "IdentityPage": ".identity",
+    "UserBase": ".user",
+    "UserCreate": ".user",
+    "UserUpdate": ".user",
+    "UserInDB": ".user",
+    "UserOut": ".user",
+    "AgentBase": ".agent",
+    "AgentCreate": ".agent",
+    "AgentUpdate": ".agent",
+    "AgentInDB": ".agent",
+    "AgentOut": ".agent",
+    "Token": ".token",
+    "TokenPayload": ".token",
+    "TokenData": ".token",
+    "PyIdentityConfig": ".config",
+})
+
+if TYPE_CHECKING:
+    from .identity import IdentityBase, UserIdentity, UserIndentity, AgentIdentity, IdentitySummary, IdentityPage
+    from .user import UserBase, UserCreate, UserUpdate, UserInDB, UserOut
+    from .agent import AgentBase, AgentCreate, AgentUpdate, AgentInDB, AgentOut
+    from .token import Token, TokenPayload, TokenData
+    from .config import PyIdentityConfig
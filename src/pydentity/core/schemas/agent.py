@@ -4,6 +4,7 @@ from pydantic import BaseModel, Field
 
 from pydentity.core.schemas.identity import IdentityBase
 from pydentity.core.schemas.roles import RoleInDB
+from pydentity.core.serialization import ObjectIdStr
 
 
 class AgentBase(IdentityBase):
@@ -52,7 +53,7 @@ class AgentInDB(AgentBase):
     Class Config:
         orm_mode (bool): Enables ORM mode for compatibility with ORMs like SQLAlchemy. This allows for the use of Pydantic models with ORMs directly.
     """
-    id: str
+    id: ObjectIdStr
     roles: List[RoleInDB] = []
     claims: Dict[str, List[str]] = {}
     created_at: datetime
@@ -75,7 +76,7 @@ class AgentOut(AgentBase):
     Class Config:
         orm_mode (bool): Enables ORM mode for compatibility with ORMs like SQLAlchemy, similar to AgentInDB.
     """
-    id: str
+    id: ObjectIdStr
     roles: List[RoleInDB] = []
     created_at: datetime
 
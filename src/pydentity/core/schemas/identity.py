@@ -1,9 +1,10 @@
 from enum import Enum
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from  pydentity.core.models import IdentityType
 from pydentity.core.models.identity import VerificationStatus
+from pydentity.core.serialization import ObjectIdStr
 
 
 
@@ -14,38 +15,72 @@ class IdentityBase(BaseModel):
 
     Attributes:
         username (str): The username of the identity. Must be between 5 to 50 characters.
-        IdentityType (IdentityType): The type of identity, either user or agent.
+        identity_type (IdentityType): The type of identity, either user or agent.
         is_active (bool): Flag indicating if the identity is active. Defaults to True.
     """
 
     username: str = Field(..., min_length=5, max_length=50)
-    IdentityType: IdentityType
+    identity_type: IdentityType
     is_active: bool = True
     verification_status: VerificationStatus = VerificationStatus.unverified
 
-class UserIndentity(IdentityBase):
+class UserIdentity(IdentityBase):
     """
     User identity model.
 
-    Inherits from IdentityBase with IdentityType set to user.
+    Inherits from IdentityBase with identity_type set to user.
     """
 
-    IdentityType = IdentityType.user
+    identity_type: IdentityType = IdentityType.user
 
-class SSOUserIndentity(IdentityBase):
+class SSOUserIdentity(IdentityBase):
     """
     User identity model.
 
-    Inherits from IdentityBase with IdentityType set to sso user.
+    Inherits from IdentityBase with identity_type set to sso user.
     """
 
-    IdentityType = IdentityType.sso_user
+    identity_type: IdentityType = IdentityType.sso_user
+
+# Earlier, misspelled names
+UserIndentity = UserIdentity
+SSOUserIndentity = SSOUserIdentity
 
 class AgentIdentity(IdentityBase):
     """
     Agent identity model.
 
-    Inherits from IdentityBase with IdentityType set to agent.
+    Inherits from IdentityBase with identity_type set to agent.
+    """
+    identity_type: IdentityType = IdentityType.agent
+
+
+class IdentitySummary(BaseModel):
     """
-    IdentityType = IdentityType.agent
+    Listing model for an identity of any type.
 
+    Attributes:
+        id (str): The unique identifier for the identity.
+        username (str): The username of the identity.
+        identity_type (IdentityType): The type of identity.
+        is_active (bool): Flag indicating if the identity is active.
+        verification_status (VerificationStatus): The verification status of the identity.
+        created_at (datetime): The timestamp when the identity was created.
+    """
+    id: ObjectIdStr
+    username: str
+    identity_type: IdentityType
+    is_active: bool
+    verification_status: VerificationStatus
+    created_at: datetime
+
+class IdentityPage(BaseModel):
+    """
+    One page of a keyset-paginated identity listing.
+
+    Attributes:
+        items (List[IdentitySummary]): The identities in the page.
+        next_cursor (Optional[str]): The cursor to pass as ``after`` for the next page. None on the last page.
+    """
+    items: List[IdentitySummary]
+    next_cursor: Optional[str] = None
@@ -1,6 +1,7 @@
 """Role schemas."""
 from typing import List, Optional
 from pydantic import BaseModel
+from pydentity.core.serialization import ObjectIdStr
 
 class RoleBase(BaseModel):
     """
@@ -48,7 +49,7 @@ class RoleInDB(RoleBase):
     Class Config:
         orm_mode (bool): Enables ORM mode for compatibility with ORMs like SQLAlchemy. This allows for the use of Pydantic models with ORMs directly, facilitating the interaction between the database and the application.
     """
-    id: str
+    id: ObjectIdStr
     permissions: List[str] = []
 
     class Config:
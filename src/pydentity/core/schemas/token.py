@@ -19,9 +19,11 @@ class TokenPayload(BaseModel):
     Attributes:
         sub (Optional[str]): The subject of the token which usually contains the user identifier. Defaults to None.
         exp (Optional[int]): The expiration time of the token as a UNIX timestamp. Defaults to None.
+        tid (Optional[str]): The tenant of the subject. None for identities outside any tenant.
     """
     sub: Optional[str] = None
     exp: Optional[int] = None
+    tid: Optional[str] = None
 
 class TokenData(BaseModel):
     """
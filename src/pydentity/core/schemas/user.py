@@ -4,6 +4,7 @@ from datetime import datetime
 
 from pydentity.core.models.identity import SSOProvider
 from pydentity.core.schemas.roles import RoleInDB
+from pydentity.core.serialization import ObjectIdStr
 from .identity import UserIdentity
 
 class UserBase(UserIdentity):
@@ -62,7 +63,7 @@ class UserInDB(UserBase):
         from_attributes (bool): Indicates that ORM mode should be enabled, allowing for ORM objects to be used.
     """
 
-    id: str
+    id: ObjectIdStr
     hashed_password: str
     roles: List[RoleInDB] = []
     claims: Dict[str, List[str]] = {}
@@ -90,7 +91,7 @@ class UserOut(UserBase):
         from_attributes (bool): Indicates that ORM mode should be enabled, allowing for ORM objects to be used.
     """
 
-    id: str
+    id: ObjectIdStr
     roles: List[RoleInDB] = []
     claims: Dict[str, List[str]] = {}
     created_at: datetime
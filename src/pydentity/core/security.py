@@ -0,0 +1,158 @@
+"""Password hashing module."""
+import logging
+import math
+import time
+from functools import lru_cache
+from typing import Dict, Optional
+
+from passlib.context import CryptContext
+
+from pydentity.core.config import Settings, get_settings
+
+
+logger = logging.getLogger(__name__)
+
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 16
+ARGON2_MIN_TIME_COST = 1
+ARGON2_MAX_TIME_COST = 10
+
+_CALIBRATION_PASSWORD = "pydentity-calibration"
+
+
+def _measure_ms(context: CryptContext, samples: int) -> float:
+    """Return the best-of-``samples`` time in milliseconds for a single hash."""
+    best = float("inf")
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash(_CALIBRATION_PASSWORD)
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best
+
+
+def calibrate_bcrypt_rounds(
+    target_ms: float,
+    min_rounds: int = BCRYPT_MIN_ROUNDS,
+    max_rounds: int = BCRYPT_MAX_ROUNDS,
+    samples: int = 3,
+) -> int:
+    """
+    Pick the bcrypt work factor whose hashing time is closest to ``target_ms`` on this machine.
+
+    bcrypt cost is logarithmic, so each extra round doubles the hashing time. The time of
+    ``min_rounds`` is measured once and extrapolated, and the work factor closest to the
+    target in log scale is chosen. It never drops below ``min_rounds``, so a fast machine
+    cannot weaken stored hashes.
+
+    Args:
+        target_ms (float): The desired time for one hash, in milliseconds.
+        min_rounds (int): The lowest work factor that may be returned.
+        max_rounds (int): The highest work factor that may be returned.
+        samples (int): The number of timed hashes; the fastest one is used.
+
+    Returns:
+        int: The calibrated bcrypt work factor.
+    """
+    context = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=min_rounds)
+    elapsed = _measure_ms(context, samples)
+    rounds = min_rounds
+    while rounds < max_rounds and elapsed * 2 <= target_ms * math.sqrt(2):
+        elapsed *= 2
+        rounds += 1
+    return rounds
+
+
+def calibrate_argon2_time_cost(
+    target_ms: float,
+    memory_cost: int,
+    parallelism: int,
+    min_time_cost: int = ARGON2_MIN_TIME_COST,
+    max_time_cost: int = ARGON2_MAX_TIME_COST,
+    samples: int = 3,
+) -> int:
+    """
+    Pick the argon2 time cost whose hashing time is closest to ``target_ms`` on this machine.
+
+    Memory cost and parallelism are kept fixed; argon2 time grows linearly with the time cost.
+
+    Args:
+        target_ms (float): The desired time for one hash, in milliseconds.
+        memory_cost (int): The argon2 memory cost, in KiB.
+        parallelism (int): The argon2 parallelism degree.
+        min_time_cost (int): The lowest time cost that may be returned.
+        max_time_cost (int): The highest time cost that may be returned.
+        samples (int): The number of timed hashes; the fastest one is used.
+
+    Returns:
+        int: The calibrated argon2 time cost.
+    """
+    context = CryptContext(
+        schemes=["argon2"],
+        argon2__rounds=min_time_cost,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism,
+    )
+    per_round = _measure_ms(context, samples) / min_time_cost
+    time_cost = round(target_ms / per_round) if per_round else max_time_cost
+    return max(min_time_cost, min(max_time_cost, time_cost))
+
+
+def hashing_policy(settings: Settings) -> Dict[str, object]:
+    """
+    Build the CryptContext keyword arguments for the configured hashing schemes.
+
+    Explicit work factors from the settings win; otherwise, when ``PASSWORD_HASH_TARGET_MS``
+    is set, the work factors are calibrated on the current machine and only used for new
+    hashes. Calibration differs between machines, so it must not decide which stored hashes
+    are outdated: workers on faster and slower hosts would keep rehashing each other's work.
+
+    Stored hashes are reported by ``needs_update`` and rehashed on the next successful login
+    only when they fall below a floor: the configured work factor, which is the same across
+    the fleet, or the scheme's minimum when the work factor is calibrated. Hashes above the
+    floor are never weakened.
+
+    Args:
+        settings (Settings): The application settings.
+
+    Returns:
+        Dict[str, object]: Keyword arguments for ``CryptContext``.
+    """
+    schemes = list(settings.PASSWORD_HASH_SCHEMES)
+    policy: Dict[str, object] = {"schemes": schemes, "deprecated": "auto"}
+    target_ms = settings.PASSWORD_HASH_TARGET_MS
+
+    if "bcrypt" in schemes:
+        rounds: Optional[int] = settings.BCRYPT_ROUNDS
+        if rounds is None and target_ms:
+            rounds = calibrate_bcrypt_rounds(target_ms)
+            logger.info(f"Calibrated bcrypt rounds to {rounds} for a {target_ms}ms target")
+        if rounds is not None:
+            policy.update(
+                bcrypt__default_rounds=rounds,
+                bcrypt__min_rounds=rounds if settings.BCRYPT_ROUNDS is not None else BCRYPT_MIN_ROUNDS,
+            )
+
+    if "argon2" in schemes:
+        time_cost: Optional[int] = settings.ARGON2_TIME_COST
+        if time_cost is None and target_ms:
+            time_cost = calibrate_argon2_time_cost(
+                target_ms, settings.ARGON2_MEMORY_COST, settings.ARGON2_PARALLELISM
+            )
+            logger.info(f"Calibrated argon2 time cost to {time_cost} for a {target_ms}ms target")
+        policy.update(
+            argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+            argon2__parallelism=settings.ARGON2_PARALLELISM,
+        )
+        if time_cost is not None:
+            policy.update(
+                argon2__default_rounds=time_cost,
+                argon2__min_rounds=time_cost if settings.ARGON2_TIME_COST is not None else ARGON2_MIN_TIME_COST,
+            )
+
+    return policy
+
+
+@lru_cache()
+def get_password_context() -> CryptContext:
+    """Return the process-wide password hashing context, calibrating it on first use."""
+    return CryptContext(**hashing_policy(get_settings()))
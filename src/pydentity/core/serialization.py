@@ -0,0 +1,159 @@
+"""Fast JSON encoding of response schemas."""
+from functools import lru_cache, partial
+from types import UnionType
+from typing import Any, Callable, Generic, Iterable, List, Mapping, Optional, Tuple, Type, TypeVar, Union, get_args, get_origin
+
+from beanie import Link
+from bson import ObjectId
+from pydantic import BaseModel, BeforeValidator, TypeAdapter
+from pydantic.fields import FieldInfo
+from starlette.responses import JSONResponse
+from typing_extensions import Annotated
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+S = TypeVar("S", bound=BaseModel)
+
+_MISSING = object()
+
+
+def _object_id_to_str(value: Any) -> Any:
+    return str(value) if isinstance(value, ObjectId) else value
+
+
+# A string field that also accepts the ObjectId of a document, so schemas validate straight from documents
+ObjectIdStr = Annotated[str, BeforeValidator(_object_id_to_str)]
+
+
+def _is_object_id_str(field: FieldInfo) -> bool:
+    return any(isinstance(m, BeforeValidator) and m.func is _object_id_to_str for m in field.metadata)
+
+
+def _without_none(annotation: Any) -> Any:
+    """Return ``X`` for ``Optional[X]``, and any other annotation as it is."""
+    if get_origin(annotation) in (Union, UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _holds_model(annotation: Any) -> bool:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return True
+    return any(_holds_model(arg) for arg in get_args(annotation))
+
+
+def _model_in(annotation: Any) -> Tuple[Optional[Type[BaseModel]], bool]:
+    """
+    Return the schema an annotation holds, alone or as a list, optional or not, and whether it is a list.
+
+    Raises:
+        TypeError: If the annotation holds a schema in any other way, e.g. as dictionary values.
+    """
+    unwrapped = _without_none(annotation)
+    if isinstance(unwrapped, type) and issubclass(unwrapped, BaseModel):
+        return unwrapped, False
+    if get_origin(unwrapped) in (list, List):
+        (item,) = get_args(unwrapped) or (Any,)
+        item = _without_none(item)
+        if isinstance(item, type) and issubclass(item, BaseModel):
+            return item, True
+    if _holds_model(unwrapped):
+        raise TypeError(f"Cannot serialize the nested schema in {annotation!r}; only schemas alone or in lists are supported")
+    return None, False
+
+
+class Serializer(Generic[S]):
+    """
+    Encodes documents as JSON through a response schema, compiled once per schema.
+
+    Documents read from the database were validated when they were loaded, so they are not
+    validated again: the serializer copies the schema's fields from each document into schema
+    instances built with ``model_construct``, nested schemas such as roles included, and dumps
+    them to JSON bytes in one pass through pydantic-core. This skips the per-item validation
+    (email addresses in particular are costly to check), the intermediate dicts and the second
+    JSON encoder of the ``response_model`` path. Only the schema's fields are read, so fields
+    left out of the schema, such as password hashes, never reach the output.
+
+    Linked documents must be fetched before they are serialized. Nested schemas can be held alone
+    or in lists, optional or not; schemas nested any other way are rejected when the serializer
+    is compiled rather than copied as they are.
+
+    Example:
+        body = get_serializer(UserOut).dump_many(users)
+        return FastJSONResponse(body)
+    """
+
+    def __init__(self, schema: Type[S]):
+        self.schema = schema
+        self._one = TypeAdapter(schema)
+        self._many = TypeAdapter(List[schema])
+        self._fields: List[Tuple[str, FieldInfo, Callable[[Any], Any]]] = [
+            (name, field, self._converter(field)) for name, field in schema.model_fields.items()
+        ]
+
+    @staticmethod
+    def _converter(field: FieldInfo) -> Callable[[Any], Any]:
+        if _is_object_id_str(field):
+            return _object_id_to_str
+        model, many = _model_in(field.annotation)
+        if model is None:
+            return lambda value: value
+        nested = get_serializer(model)
+        construct = lambda value: None if value is None else nested.construct(value)
+        if many:
+            return lambda values: None if values is None else [construct(value) for value in values]
+        return construct
+
+    def construct(self, obj: Any) -> S:
+        """Copy the schema's fields from ``obj``, a document or a mapping, into a schema instance without validating them."""
+        if isinstance(obj, self.schema):
+            return obj
+        if isinstance(obj, Link):
+            raise ValueError(f"Fetch linked documents before serializing them as {self.schema.__name__}")
+        get = obj.get if isinstance(obj, Mapping) else partial(getattr, obj)
+        values = {}
+        for name, field, convert in self._fields:
+            value = get(name, _MISSING)
+            if value is _MISSING:
+                if field.is_required():
+                    raise ValueError(f"{type(obj).__name__} has no {name!r} for {self.schema.__name__}")
+                continue
+            values[name] = convert(value)
+        return self.schema.model_construct(**values)
+
+    def dump(self, obj: Any) -> bytes:
+        """Encode one document as JSON."""
+        return self._one.dump_json(self.construct(obj))
+
+    def dump_many(self, objs: Iterable[Any]) -> bytes:
+        """Encode documents as a JSON array."""
+        construct = self.construct
+        return self._many.dump_json([construct(obj) for obj in objs])
+
+
+@lru_cache(maxsize=None)
+def get_serializer(schema: Type[S]) -> Serializer[S]:
+    """Return the process-wide serializer of a schema, compiling it on first use."""
+    return Serializer(schema)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response that sends pre-encoded bytes as they are and encodes anything else with orjson.
+
+    Falls back to the standard library encoder when orjson is not installed.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            return bytes(content)
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return super().render(content)
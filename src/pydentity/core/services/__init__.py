@@ -1,8 +1,31 @@
 # src/pyidentity/core/services/__init__.py
 
-from .auth_service import AuthService
-from .identity_service import IdentityService
-from .permission_service import PermissionService
-from .token_service import TokenService
+from typing import TYPE_CHECKING
 
-__all__ = ["AuthService", "IdentityService", "PermissionService", "TokenService"]
\ No newline at end of file
+from pydentity._lazy import attach
+
+__getattr__, __dir__, __all__ = attach(__name__, {
+    "ActivityTracker": ".activity_tracker",
+    "get_activity_tracker": ".activity_tracker",
+    "AuthService": ".auth_service",
+    "ClaimsService": ".claims_service",
+    "EmailQueue": ".email_service",
+    "get_email_queue": ".email_service",
+    "IdentityService": ".identity_service",
+    "PermissionService": ".permission_service",
+    "RoleCycleError": ".permission_service",
+    "TokenService": ".token_service",
+    "IdentityLogService": ".identity_log_service",
+    "IdentityLogArchiver": ".identity_log_archiver",
+})
+
+if TYPE_CHECKING:
+    from .activity_tracker import ActivityTracker, get_activity_tracker
+    from .auth_service import AuthService
+    from .claims_service import ClaimsService
+    from .email_service import EmailQueue, get_email_queue
+    from .identity_service import IdentityService
+    from .permission_service import PermissionService, RoleCycleError
+    from .token_service import TokenService
+    from .identity_log_service import IdentityLogService
+    from .identity_log_archiver import IdentityLogArchiver
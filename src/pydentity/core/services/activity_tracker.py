@@ -0,0 +1,171 @@
+"""Write-behind tracking of identity activity timestamps."""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple, Type
+
+from pymongo import UpdateOne
+
+from pydentity.core.config import Settings, get_settings
+from pydentity.core.models import Identity
+from pydentity.core.tenancy import tenant_context
+
+
+logger = logging.getLogger(__name__)
+
+# Pending timestamps, per document model and tenant, per document id, per field
+_Pending = Dict[Tuple[Type[Identity], Optional[str]], Dict[Any, Dict[str, datetime]]]
+
+
+class ActivityTracker:
+    """
+    Records when identities were last seen and writes the timestamps in the background.
+
+    Activity fields such as ``User.last_login`` and ``Agent.last_active`` change on nearly every
+    request, but only their latest value matters. Instead of one write per request, the tracker
+    keeps the latest timestamp per identity and field in memory and writes all of them every
+    ``ACTIVITY_FLUSH_SECONDS`` (or once ``ACTIVITY_MAX_PENDING`` are waiting) with one unordered
+    ``bulk_write`` per collection. Updates use ``$max``, so a stale flush from another process
+    never moves a timestamp backwards.
+
+    Timestamps recorded since the last flush are lost if the process dies, so their durability
+    is bounded by the flush interval. ``stop()`` flushes what is pending.
+
+    Until ``start()`` is called nothing is written in the background: at most
+    ``ACTIVITY_MAX_PENDING`` identities are kept for an explicit ``flush()``, and activity of
+    further identities is dropped, so a tracker that was never started cannot grow without bound.
+
+    Attributes:
+        written (int): The number of documents updated by flushes.
+        dropped (int): The number of records dropped because the tracker was not started.
+    """
+
+    def __init__(self, settings: Optional[Settings] = None):
+        self.settings = settings or get_settings()
+        self.interval = self.settings.ACTIVITY_FLUSH_SECONDS
+        self.max_pending = self.settings.ACTIVITY_MAX_PENDING
+        self.written = 0
+        self.dropped = 0
+        self._pending: _Pending = {}
+        self._count = 0
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    @property
+    def pending(self) -> int:
+        """The number of documents with timestamps waiting to be written."""
+        return self._count
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        """Start flushing in the background on the running event loop."""
+        if self._task is not None:
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, flush: bool = True) -> None:
+        """
+        Stop the background flushes.
+
+        Args:
+            flush (bool): Write the pending timestamps first.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if flush:
+            await self.flush()
+
+    def record(self, identity: Identity, field: str, when: Optional[datetime] = None) -> None:
+        """
+        Record activity of an identity without writing it yet.
+
+        The identity's attribute is updated right away, so the caller sees the new value.
+
+        Args:
+            identity (Identity): A saved identity.
+            field (str): The timestamp field, e.g. "last_login".
+            when (Optional[datetime]): The time of the activity. Defaults to now.
+        """
+        when = when or datetime.now(timezone.utc)
+        setattr(identity, field, when)
+        group = (type(identity), identity.tenant_id)
+        documents = self._pending.get(group)
+        fields = documents.get(identity.id) if documents is not None else None
+        if fields is None:
+            if self._task is None and self._count >= self.max_pending:
+                if not self.dropped:
+                    logger.warning("ActivityTracker.start() was not called; dropping activity until the pending timestamps are flushed")
+                self.dropped += 1
+                return
+            if documents is None:
+                documents = self._pending[group] = {}
+            fields = documents[identity.id] = {}
+            self._count += 1
+            if self._count >= self.max_pending and self._wake is not None:
+                self._wake.set()
+        current = fields.get(field)
+        if current is None or when > current:
+            fields[field] = when
+
+    async def flush(self) -> int:
+        """
+        Write the pending timestamps now.
+
+        Returns:
+            int: The number of documents updated. Updates that fail stay pending for the next flush.
+        """
+        pending, self._pending, self._count = self._pending, {}, 0
+        groups = list(pending.items())
+        written = 0
+        for position, ((model, tenant_id), documents) in enumerate(groups):
+            requests = [UpdateOne({"_id": document_id}, {"$max": fields}) for document_id, fields in documents.items()]
+            try:
+                with tenant_context(tenant_id):
+                    collection = model.get_motor_collection()
+                result = await collection.bulk_write(requests, ordered=False)
+            except asyncio.CancelledError:
+                # Interrupted by stop(); keep what was not written for its final flush
+                for group in groups[position:]:
+                    self._restore(*group)
+                raise
+            except Exception:
+                logger.exception(f"Failed to write {len(requests)} activity update(s) for {model.__name__}; retrying on the next flush")
+                self._restore((model, tenant_id), documents)
+                continue
+            written += result.modified_count
+        self.written += written
+        return written
+
+    def _restore(self, group: Tuple[Type[Identity], Optional[str]], documents: Dict[Any, Dict[str, datetime]]) -> None:
+        bucket = self._pending.setdefault(group, {})
+        for document_id, fields in documents.items():
+            current = bucket.get(document_id)
+            if current is None:
+                bucket[document_id] = fields
+                self._count += 1
+                continue
+            for field, when in fields.items():
+                if field not in current or when > current[field]:
+                    current[field] = when
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+
+@lru_cache()
+def get_activity_tracker() -> ActivityTracker:
+    """Return the process-wide activity tracker. Call ``start()`` on it at application startup."""
+    return ActivityTracker()
@@ -1,41 +1,97 @@
 """Authentication service module."""
-from datetime import datetime, timezone
+import asyncio
 import logging
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError
+from beanie.exceptions import RevisionIdWasChanged
 from pydentity.core.models import User, Agent, Identity
-from pydentity.core.models.identity import SSOProvider
-from pydentity.core.services.token_service import TokenService
+from pydentity.core.models.identity import SSOProvider, VerificationStatus
+from pydentity.core.services.activity_tracker import get_activity_tracker
+from pydentity.core.services.email_service import build_message, get_email_queue
+from pydentity.core.services.token_service import InvalidActionToken, TokenPurpose, TokenService
+from pydentity.core.services.login_throttle import get_login_throttle
 from pydentity.core.config import get_settings
-from passlib.context import CryptContext
+from pydentity.core.jwt_backends import InvalidToken
+from pydentity.core.security import get_password_context
+from pydentity.core.metrics import IDENTITY_LOOKUP_SECONDS, PASSWORD_HASH_SECONDS, timed
+from pydentity.core.read_preference import GLOBAL_SCOPE, lookup_key, read_preference
+from pydentity.core.resilience import ProviderUnavailable
+from pydentity.core.tenancy import TENANT_CLAIM, get_current_tenant, tenant_context
+
+if TYPE_CHECKING:
+    from pydentity.core.services.sso_service import SSOService
 
 
 logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 class AuthService:
-    def __init__(self, token_service: TokenService = Depends()):
+    def __init__(self, token_service: TokenService = Depends(), sso_service: Optional["SSOService"] = None):
         self.token_service = token_service
         self.settings = get_settings()
+        self.pwd_context = get_password_context()
+        self.login_throttle = get_login_throttle()
+        self._sso_service = sso_service
+
+    @property
+    def sso_service(self) -> "SSOService":
+        """The SSO service used by ``authenticate_sso``. Defaults to the process-wide one, created on first use."""
+        if self._sso_service is None:
+            # Imported here: the provider SDKs are slow to import and most requests never need them
+            from pydentity.core.services.sso_service import get_sso_service
+            self._sso_service = get_sso_service()
+        return self._sso_service
 
     def verify_password(self, plain_password, hashed_password):
-        return pwd_context.verify(plain_password, hashed_password)
+        with timed(PASSWORD_HASH_SECONDS, operation="verify"):
+            return self.pwd_context.verify(plain_password, hashed_password)
 
     def get_password_hash(self, password):
-        return pwd_context.hash(password)
+        with timed(PASSWORD_HASH_SECONDS, operation="hash"):
+            return self.pwd_context.hash(password)
 
-    async def authenticate_user(self, username: str, password: str):
-        user = await User.find_one(User.username == username)
-        if not user or not self.verify_password(password, user.hashed_password):
+    async def authenticate_user(self, username: str, password: str, source: Optional[str] = None):
+        # Usernames are only unique within a tenant, so failures are counted per tenant as well
+        tenant_id = get_current_tenant()
+        throttle_key = f"{tenant_id}/{username}" if tenant_id is not None else username
+        # Locked-out usernames and sources are rejected before any database or bcrypt work
+        self.login_throttle.check(throttle_key, source)
+        with timed(IDENTITY_LOOKUP_SECONDS, method="authenticate_user"), read_preference("authenticate_user", lookup_key("username", username)):
+            user = await User.find_one({**User.tenant_filter(), "username": username})
+        if not user or not user.hashed_password:
+            # SSO-only users have no password. Spend the same hashing time as a real verify so
+            # neither they nor unknown usernames can be told apart
+            with timed(PASSWORD_HASH_SECONDS, operation="dummy_verify"):
+                self.pwd_context.dummy_verify()
+            self.login_throttle.record_failure(throttle_key, source)
+            return None
+        with timed(PASSWORD_HASH_SECONDS, operation="verify"):
+            verified, new_hash = self.pwd_context.verify_and_update(password, user.hashed_password)
+        if not verified:
+            self.login_throttle.record_failure(throttle_key, source)
             return None
+        self.login_throttle.record_success(throttle_key, source)
+        if new_hash:
+            # The stored hash uses outdated parameters; upgrade it while we have the plain password
+            user.hashed_password = new_hash
+            try:
+                await user.save_changes()
+            except RevisionIdWasChanged:
+                # Another write got there first: a concurrent login's upgrade, or a password reset
+                # that must not be overwritten. The password was verified either way, and the
+                # upgrade is retried on the next login
+                logger.info(f"Skipped the password hash upgrade of user {user.id}: it changed concurrently")
+        # Written in the background with other logins, not by an extra save on the login path
+        get_activity_tracker().record(user, "last_login")
         return user
 
     async def authenticate_agent(self, api_key: str):
-        agent = await Agent.find_one(Agent.api_key == api_key)
+        with timed(IDENTITY_LOOKUP_SECONDS, method="authenticate_agent"), read_preference("by_api_key", lookup_key("api_key", api_key, GLOBAL_SCOPE)):
+            agent = await Agent.find_one(Agent.api_key == api_key)
+        if agent is not None:
+            get_activity_tracker().record(agent, "last_active")
         return agent
 
     async def get_current_identity(self, token: str = Depends(oauth2_scheme)):
@@ -49,13 +105,112 @@ class AuthService:
             username: str = payload.get("sub")
             if username is None:
                 raise credentials_exception
-        except JWTError:
+        except InvalidToken:
             raise credentials_exception
-        identity = await Identity.find_one(Identity.username == username)
+        # Looked up in the tenant the token was issued for; the caller decides how long that tenant stays current
+        with tenant_context(payload.get(TENANT_CLAIM)), timed(IDENTITY_LOOKUP_SECONDS, method="get_current_identity"), read_preference("get_current_identity", lookup_key("username", username)):
+            identity = await Identity.find_one({**Identity.tenant_filter(), "username": username})
         if identity is None:
             raise credentials_exception
         return identity
 
+    """ Password reset and email verification """
+    async def request_password_reset(self, email: str) -> None:
+        """
+        Email a password reset token to the user with this address, if there is one.
+
+        Nothing is written to the database. The response is the same whether or not the address
+        is known, so it cannot be used to find out which addresses have accounts.
+        """
+        user = await User.by_email(email)
+        if user is None or not user.hashed_password:
+            return
+        token = self.token_service.create_action_token(user, TokenPurpose.password_reset)
+        try:
+            get_email_queue().enqueue(build_message(
+                to=user.email,
+                subject="Reset your password",
+                body=f"Hello {user.username},\n\nUse this token to choose a new password:\n\n{token}\n\n"
+                     f"It expires in {self.settings.PASSWORD_RESET_TOKEN_EXPIRE_HOURS} hours.",
+            ))
+        except (RuntimeError, asyncio.QueueFull) as e:
+            # Failing the request would only happen for known addresses and so reveal them;
+            # the user can ask again
+            logger.warning(f"Dropped the password reset email for user {user.id}: {e!r}")
+
+    async def request_email_verification(self, user: User) -> bool:
+        """
+        Mark a user's email address as pending and email them a verification token.
+
+        Users whose verification is already pending can ask again, e.g. when the first email got
+        lost. The email is queued before the pending status is saved, so a user is never left
+        pending without a token on the way.
+
+        Returns:
+            bool: True if the email was queued, False if the address is already verified.
+
+        Raises:
+            HTTPException: 503 if the email queue is not running or is full. Nothing is saved.
+        """
+        if user.verification_status == VerificationStatus.verified:
+            return False
+        previous_status = user.verification_status
+        # The token is bound to the pending status, so whichever token is redeemed first spends them all
+        user.verification_status = VerificationStatus.pending
+        token = self.token_service.create_action_token(user, TokenPurpose.email_verification)
+        try:
+            get_email_queue().enqueue(build_message(
+                to=user.email,
+                subject="Verify your email address",
+                body=f"Hello {user.username},\n\nUse this token to verify your email address:\n\n{token}\n",
+            ))
+        except (RuntimeError, asyncio.QueueFull) as e:
+            user.verification_status = previous_status
+            logger.warning(f"Could not queue the verification email for user {user.id}: {e!r}")
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Email delivery is unavailable, try again later")
+        await user.save_changes()
+        return True
+
+    async def reset_password(self, token: str, new_password: str) -> User:
+        """
+        Set a new password using a password reset token.
+
+        Changing the password hash spends the token along with any other reset token issued before.
+
+        Raises:
+            HTTPException: 400 if the token is invalid, expired or already used.
+        """
+        try:
+            user = await self.token_service.verify_action_token(token, TokenPurpose.password_reset)
+        except InvalidActionToken as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        user.hashed_password = self.get_password_hash(new_password)
+        await self._redeem(user)
+        return user
+
+    async def confirm_email(self, token: str) -> User:
+        """
+        Mark a user's email address as verified using an email verification token.
+
+        Raises:
+            HTTPException: 400 if the token is invalid, expired or already used.
+        """
+        try:
+            user = await self.token_service.verify_action_token(token, TokenPurpose.email_verification)
+        except InvalidActionToken as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        user.verification_status = VerificationStatus.verified
+        await self._redeem(user)
+        return user
+
+    @staticmethod
+    async def _redeem(user: User) -> None:
+        # The revision check makes concurrent redemptions of the same token fail, not both succeed
+        try:
+            await user.save_changes()
+        except RevisionIdWasChanged:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token has already been used")
+
     """ Single Sign-On (SSO) Service """
     async def authenticate_sso(self, provider: SSOProvider, token: str, authorization_code: Optional[str] = None) -> User:
         """
@@ -93,9 +248,15 @@ class AuthService:
 
             return user
 
+        except HTTPException:
+            # Already describes the failure, e.g. a token the provider rejected
+            raise
         except ValueError as e:
             logger.error(f"SSO Authentication error: {str(e)}")
             raise HTTPException(status_code=400, detail=str(e))
+        except ProviderUnavailable as e:
+            logger.warning(f"SSO provider unavailable: {str(e)}")
+            raise HTTPException(status_code=503, detail=f"{provider.value} sign-in is temporarily unavailable")
         except Exception as e:
             logger.exception(f"Unexpected error during SSO authentication: {str(e)}")
             raise HTTPException(status_code=500, detail="An unexpected error occurred during authentication")
@@ -108,16 +269,9 @@ class AuthService:
             user (User): The authenticated user.
             provider (SSOProvider): The SSO provider used for authentication.
         """
-        # Update last login timestamp
-        user.last_login = datetime.now(timezone.utc)
-        
-        # Check if email verification is required
-        if self.settings.REQUIRE_EMAIL_VERIFICATION and not user.email_verified:
-            user.email_verified = True  # SSO providers typically verify emails
-        
+        # The sign-in upsert already recorded the login and the verified email, so nothing is saved here
+
         # Log the successful authentication
         logger.info(f"User {user.username} authenticated via {provider}")
         
         # You might want to create or update a login history entry here
-        
-        await user.save()
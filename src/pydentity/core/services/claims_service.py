@@ -0,0 +1,92 @@
+"""Claims service module."""
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from pydentity.core.models import Identity
+from pydentity.core.pagination import KeysetOrder, encode_cursor, keyset_query
+
+
+class ClaimsService:
+    """
+    Looks up identities by claim.
+
+    Queries are restricted to the current tenant and go through ``Identity.claim_pairs`` and its
+    multikey index on (tenant_id, type, value, _id), so they never scan the collection and pages
+    are index range scans.
+    """
+
+    @staticmethod
+    def claim_filter(claim_type: str, claim_value: Optional[str] = None) -> Dict[str, Any]:
+        """Return the query matching identities of the current tenant that hold a claim type, or a specific type and value."""
+        if claim_value is None:
+            return {**Identity.tenant_filter(), "claim_pairs.type": claim_type}
+        return {**Identity.tenant_filter(), "claim_pairs": {"$elemMatch": {"type": claim_type, "value": claim_value}}}
+
+    async def find_by_claim(
+        self,
+        claim_type: str,
+        claim_value: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 50,
+    ) -> Tuple[List[Identity], Optional[str]]:
+        """
+        List the identities holding a claim, one page at a time.
+
+        Example:
+            Identities with tenant=acme:
+            identities, cursor = await service.find_by_claim("tenant", "acme")
+
+        Args:
+            claim_type (str): The claim type.
+            claim_value (Optional[str]): The claim value. Any value of the type matches if omitted.
+            after (Optional[str]): The cursor returned with the previous page; None for the first page.
+            limit (int): The maximum number of identities in the page.
+
+        Returns:
+            Tuple[List[Identity], Optional[str]]: The page and the cursor of the next page, or None on the last page.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        query, sort = keyset_query(self.claim_filter(claim_type, claim_value), KeysetOrder.id, after)
+        identities = await Identity.find(query).sort(sort).limit(limit + 1).to_list()
+        if len(identities) <= limit:
+            return identities, None
+        identities = identities[:limit]
+        return identities, encode_cursor(KeysetOrder.id, identities[-1].id)
+
+    async def count_by_claim(self, claim_type: str, claim_value: Optional[str] = None) -> int:
+        """Count the identities holding a claim type, or a specific type and value."""
+        return await Identity.get_motor_collection().count_documents(self.claim_filter(claim_type, claim_value))
+
+    async def backfill_claim_pairs(self, batch_size: int = 1000) -> int:
+        """
+        Populate ``claim_pairs`` for identities written before it existed.
+
+        Identities keep it in sync on every write afterwards, so this only needs to run once.
+
+        Returns:
+            int: The number of identities updated.
+        """
+        collection = Identity.get_motor_collection()
+        cursor = collection.find(
+            {"claims": {"$exists": True, "$ne": {}}, "claim_pairs": {"$exists": False}},
+            projection={"claims": 1},
+            batch_size=batch_size,
+        )
+        updated = 0
+        batch = []
+        async for document in cursor:
+            pairs = [
+                {"type": claim_type, "value": value}
+                for claim_type, values in document["claims"].items()
+                for value in values
+            ]
+            batch.append(UpdateOne({"_id": document["_id"]}, {"$set": {"claim_pairs": pairs}}))
+            if len(batch) >= batch_size:
+                updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+                batch = []
+        if batch:
+            updated += (await collection.bulk_write(batch, ordered=False)).modified_count
+        return updated
@@ -0,0 +1,260 @@
+"""Outbound email queue module."""
+import asyncio
+import logging
+import random
+import smtplib
+from dataclasses import dataclass
+from email.message import EmailMessage
+from email.utils import formataddr
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+from pydentity.core.config import Settings, get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+def is_transient(error: Exception) -> bool:
+    """Return whether a failed send may succeed if retried: 4xx replies, dropped connections and network errors."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    # SMTPException derives from OSError, so protocol errors have to be ruled out first
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def build_message(to: str, subject: str, body: str, html: Optional[str] = None, settings: Optional[Settings] = None) -> EmailMessage:
+    """
+    Build a message from the configured sender.
+
+    Args:
+        to (str): The recipient address.
+        subject (str): The subject line.
+        body (str): The plain text body.
+        html (Optional[str]): An HTML alternative of the body.
+        settings (Optional[Settings]): Settings to read the sender from. Defaults to ``get_settings()``.
+    """
+    settings = settings or get_settings()
+    message = EmailMessage()
+    message["From"] = formataddr((settings.EMAILS_FROM_NAME or "", settings.EMAILS_FROM_EMAIL or ""))
+    message["To"] = to
+    message["Subject"] = subject
+    message.set_content(body)
+    if html is not None:
+        message.add_alternative(html, subtype="html")
+    return message
+
+
+class SMTPConnection:
+    """
+    One SMTP connection, opened on first use and reused for every message sent through it.
+
+    Methods block and are run in a worker thread by EmailQueue.
+
+    Raises:
+        ValueError: If ``SMTP_HOST`` is not set.
+    """
+
+    def __init__(self, settings: Settings):
+        if not settings.SMTP_HOST:
+            raise ValueError("SMTP_HOST is not set, so email cannot be sent")
+        self.settings = settings
+        self._smtp: Optional[smtplib.SMTP] = None
+
+    def _connect(self) -> smtplib.SMTP:
+        settings = self.settings
+        smtp = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT or 0, timeout=settings.SMTP_TIMEOUT_SECONDS)
+        try:
+            if settings.SMTP_TLS:
+                smtp.starttls()
+            if settings.SMTP_USER:
+                smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD or "")
+        except Exception:
+            smtp.close()
+            raise
+        return smtp
+
+    def send(self, message: EmailMessage) -> None:
+        if self._smtp is None:
+            self._smtp = self._connect()
+        try:
+            self._smtp.send_message(message)
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+            # The server rejected this message; the connection is still usable
+            raise
+        except Exception:
+            # The connection is unusable; the next send opens a new one
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._smtp is None:
+            return
+        smtp, self._smtp = self._smtp, None
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+
+@dataclass
+class _Outgoing:
+    message: EmailMessage
+    attempts: int = 0
+
+
+class EmailQueue:
+    """
+    Sends email from a bounded in-process queue so request handlers never wait on SMTP.
+
+    A pool of worker tasks drains the queue. Each worker owns one SMTP connection that stays
+    open between messages and is closed after ``SMTP_IDLE_SECONDS`` without work, so the
+    connection setup (TCP, STARTTLS, AUTH) is paid once per burst rather than once per
+    message. A worker takes up to ``EMAIL_QUEUE_BATCH_SIZE`` queued messages at a time and
+    sends them over its connection in a single thread hop.
+
+    Messages that fail with a transient error (connection loss, 4xx replies) are retried with
+    exponential backoff and jitter, up to ``EMAIL_QUEUE_MAX_ATTEMPTS`` attempts. Permanent
+    failures (5xx replies) are logged and dropped.
+
+    Attributes:
+        sent (int): The number of messages delivered.
+        failed (int): The number of messages given up on.
+    """
+
+    def __init__(
+        self,
+        settings: Optional[Settings] = None,
+        connection_factory: Optional[Callable[[Settings], SMTPConnection]] = None,
+    ):
+        self.settings = settings or get_settings()
+        self.connection_factory = connection_factory or SMTPConnection
+        self.workers = self.settings.EMAIL_QUEUE_WORKERS
+        self.batch_size = self.settings.EMAIL_QUEUE_BATCH_SIZE
+        self.max_attempts = self.settings.EMAIL_QUEUE_MAX_ATTEMPTS
+        self.backoff = self.settings.EMAIL_QUEUE_RETRY_BACKOFF_SECONDS
+        self.idle_seconds = self.settings.SMTP_IDLE_SECONDS
+        self.sent = 0
+        self.failed = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retries: set = set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """
+        Start the worker tasks on the running event loop.
+
+        Raises:
+            ValueError: If the connection factory rejects the settings, e.g. ``SMTP_HOST`` is not set.
+        """
+        if self._tasks:
+            return
+        # Connections are created up front so that a misconfigured queue fails here, not in its workers
+        connections = [self.connection_factory(self.settings) for _ in range(self.workers)]
+        self._queue = asyncio.Queue(maxsize=self.settings.EMAIL_QUEUE_MAX_SIZE)
+        self._tasks = [asyncio.create_task(self._work(connection)) for connection in connections]
+
+    async def stop(self, drain: bool = True) -> None:
+        """
+        Stop the workers.
+
+        Args:
+            drain (bool): Deliver the messages already queued first. Retries still waiting on their backoff are dropped.
+        """
+        if not self._tasks:
+            return
+        if drain:
+            await self._queue.join()
+        for task in self._tasks + list(self._retries):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retries, return_exceptions=True)
+        self._tasks = []
+        self._retries.clear()
+        # Messages enqueued from now on are refused instead of waiting in a queue nobody drains
+        self._queue = None
+
+    def enqueue(self, message: EmailMessage) -> None:
+        """
+        Queue a message for delivery and return immediately.
+
+        Raises:
+            RuntimeError: If the queue has not been started, or has been stopped.
+            asyncio.QueueFull: If ``EMAIL_QUEUE_MAX_SIZE`` messages are already waiting.
+        """
+        if self._queue is None:
+            raise RuntimeError("The email queue is not running; EmailQueue.start() must be called before enqueueing messages")
+        self._queue.put_nowait(_Outgoing(message))
+
+    async def join(self) -> None:
+        """Wait until every queued message has been delivered or given up on, including retries."""
+        while True:
+            await self._queue.join()
+            if not self._retries:
+                return
+            await asyncio.gather(*list(self._retries), return_exceptions=True)
+
+    async def _work(self, connection: SMTPConnection) -> None:
+        try:
+            while True:
+                try:
+                    first = await asyncio.wait_for(self._queue.get(), timeout=self.idle_seconds)
+                except asyncio.TimeoutError:
+                    await asyncio.to_thread(connection.close)
+                    continue
+                batch = [first]
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                try:
+                    errors = await asyncio.to_thread(self._send_batch, connection, batch)
+                    for outgoing, error in zip(batch, errors):
+                        if error is None:
+                            self.sent += 1
+                        else:
+                            self._failed(outgoing, error)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+        finally:
+            await asyncio.to_thread(connection.close)
+
+    @staticmethod
+    def _send_batch(connection: SMTPConnection, batch: List[_Outgoing]) -> List[Optional[Exception]]:
+        errors: List[Optional[Exception]] = []
+        for outgoing in batch:
+            outgoing.attempts += 1
+            try:
+                connection.send(outgoing.message)
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+        return errors
+
+    def _failed(self, outgoing: _Outgoing, error: Exception) -> None:
+        recipient = outgoing.message["To"]
+        if not is_transient(error) or outgoing.attempts >= self.max_attempts:
+            self.failed += 1
+            logger.error(f"Giving up on email to {recipient} after {outgoing.attempts} attempt(s): {error!r}")
+            return
+        delay = self.backoff * 2 ** (outgoing.attempts - 1) * random.uniform(0.5, 1.5)
+        logger.warning(f"Email to {recipient} failed ({error!r}); retrying in {delay:.1f}s")
+        task = asyncio.get_running_loop().create_task(self._retry(outgoing, delay))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _retry(self, outgoing: _Outgoing, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self._queue.put(outgoing)
+
+
+@lru_cache()
+def get_email_queue() -> EmailQueue:
+    """Return the process-wide email queue. Call ``start()`` on it at application startup."""
+    return EmailQueue()
@@ -0,0 +1,259 @@
+"""Identity log archiver module."""
+import gzip
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+from uuid import uuid4
+
+from bson import json_util
+from pymongo.errors import BulkWriteError
+
+from pydentity.core.config import get_settings
+from pydentity.core.models import IdentityLog
+
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "identity_logs"
+SEGMENT_SUFFIX = ".jsonl.gz"
+SEGMENT_TIME_FORMAT = "%Y%m%dT%H%M%S%fZ"
+DUPLICATE_KEY_ERROR = 11000
+
+# Relaxed extended JSON keeps ObjectIds and datetimes typed, so segments re-ingest losslessly
+_JSON_OPTIONS = json_util.RELAXED_JSON_OPTIONS
+
+
+def _format_time(value: datetime) -> str:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime(SEGMENT_TIME_FORMAT)
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.strptime(value, SEGMENT_TIME_FORMAT)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo is not None else value
+
+
+def segment_range(path: Union[str, Path]) -> Tuple[datetime, datetime]:
+    """
+    Return the timestamps of the first and last entries in a segment, read from its file name.
+
+    Raises:
+        ValueError: If the file name is not that of an archive segment.
+    """
+    name = Path(path).name
+    if not (name.startswith(SEGMENT_PREFIX + "-") and name.endswith(SEGMENT_SUFFIX)):
+        raise ValueError(f"Not an identity log segment: {name}")
+    # Strip the suffix along with any ".<n>" counter added to tell apart segments with the same range
+    first, _, last = name.split(".", 1)[0][len(SEGMENT_PREFIX) + 1:].partition("--")
+    return _parse_time(first), _parse_time(last)
+
+
+class IdentityLogArchiver:
+    """
+    Moves aged identity log entries out of MongoDB into gzip-compressed JSONL segment files.
+
+    Entries are read oldest first from a server-side cursor in batches and streamed into
+    segments of at most ``segment_size`` entries, so memory use does not depend on how many
+    entries are archived. A segment is written under a temporary name and renamed once it is
+    complete; the entries it holds are deleted only after that. An interrupted run therefore
+    never loses entries, and at worst leaves entries both archived and in the collection, which
+    re-ingesting tolerates.
+
+    Segment names carry the timestamps of their first and last entries, so the segments covering
+    a time range can be found and re-ingested without opening them.
+
+    Args:
+        archive_dir (Optional[Union[str, Path]]): Where segments are written. Defaults to ``IDENTITY_LOG_ARCHIVE_DIR``.
+        batch_size (Optional[int]): Entries read, deleted or inserted per round trip. Defaults to ``IDENTITY_LOG_ARCHIVE_BATCH_SIZE``.
+        segment_size (int): The maximum number of entries per segment.
+        retention_days (Optional[int]): Entries older than this are not re-ingested, since the
+            collection's TTL would expire them right away. Defaults to ``IDENTITY_LOG_RETENTION_DAYS``.
+    """
+
+    def __init__(
+        self,
+        archive_dir: Optional[Union[str, Path]] = None,
+        batch_size: Optional[int] = None,
+        segment_size: int = 100_000,
+        retention_days: Optional[int] = None,
+    ):
+        settings = get_settings()
+        self.archive_dir = Path(archive_dir or settings.IDENTITY_LOG_ARCHIVE_DIR)
+        self.batch_size = batch_size or settings.IDENTITY_LOG_ARCHIVE_BATCH_SIZE
+        self.segment_size = segment_size
+        self.retention_days = retention_days if retention_days is not None else settings.IDENTITY_LOG_RETENTION_DAYS
+
+    def _retention_cutoff(self) -> Optional[datetime]:
+        """Return the timestamp before which the collection's TTL expires entries, if it has one."""
+        if not self.retention_days:
+            return None
+        return datetime.utcnow() - timedelta(days=self.retention_days)
+
+    async def archive(self, older_than: datetime, delete: bool = True) -> List[Path]:
+        """
+        Archive every entry logged before ``older_than``.
+
+        Run it with a cut-off earlier than ``IDENTITY_LOG_RETENTION_DAYS`` so entries are archived
+        before the TTL expires them. Time-series collections only support deletes from MongoDB 7;
+        on older servers pass ``delete=False`` and let the retention period remove the entries.
+
+        Args:
+            older_than (datetime): Archive entries with a timestamp before this.
+            delete (bool): Delete the entries from the collection once their segment is written.
+
+        Returns:
+            List[Path]: The segments written, oldest first.
+        """
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        collection = IdentityLog.get_motor_collection()
+        cursor = collection.find(
+            {"timestamp": {"$lt": older_than}}, sort=[("timestamp", 1), ("_id", 1)], batch_size=self.batch_size
+        )
+        segments: List[Path] = []
+        ids: list = []
+        first: Optional[datetime] = None
+        last: Optional[datetime] = None
+        tmp_path: Optional[Path] = None
+        stream = None
+        try:
+            async for document in cursor:
+                if stream is None:
+                    # Unique per segment, so concurrent runs never write into each other's files
+                    tmp_path = self.archive_dir / f".{SEGMENT_PREFIX}-{uuid4().hex}.partial"
+                    stream = gzip.open(tmp_path, "xb")
+                    first = document["timestamp"]
+                stream.write(json_util.dumps(document, json_options=_JSON_OPTIONS).encode())
+                stream.write(b"\n")
+                ids.append(document["_id"])
+                last = document["timestamp"]
+                if len(ids) >= self.segment_size:
+                    segments.append(self._seal(stream, tmp_path, first, last))
+                    stream = None
+                    if delete:
+                        await self._delete(ids)
+                    ids = []
+            if stream is not None:
+                segments.append(self._seal(stream, tmp_path, first, last))
+                stream = None
+                if delete:
+                    await self._delete(ids)
+        finally:
+            if stream is not None:
+                stream.close()
+                tmp_path.unlink(missing_ok=True)
+        return segments
+
+    def _seal(self, stream, tmp_path: Path, first: datetime, last: datetime) -> Path:
+        stream.close()
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        stem = f"{SEGMENT_PREFIX}-{_format_time(first)}--{_format_time(last)}"
+        path = self.archive_dir / f"{stem}{SEGMENT_SUFFIX}"
+        # A segment with the same first and last timestamps as an earlier one gets a counter
+        n = 1
+        while path.exists():
+            path = self.archive_dir / f"{stem}.{n}{SEGMENT_SUFFIX}"
+            n += 1
+        os.replace(tmp_path, path)
+        return path
+
+    async def _delete(self, ids: list) -> None:
+        collection = IdentityLog.get_motor_collection()
+        for start in range(0, len(ids), self.batch_size):
+            await collection.delete_many({"_id": {"$in": ids[start:start + self.batch_size]}})
+
+    def segments(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Path]:
+        """
+        List the segments holding entries between ``start`` and ``end``, oldest first.
+
+        Args:
+            start (Optional[datetime]): The start of the range, inclusive. Unbounded if omitted.
+            end (Optional[datetime]): The end of the range, exclusive. Unbounded if omitted.
+        """
+        start = _parse_time(_format_time(start)) if start else None
+        end = _parse_time(_format_time(end)) if end else None
+        found = []
+        for path in self.archive_dir.glob(f"{SEGMENT_PREFIX}-*{SEGMENT_SUFFIX}"):
+            first, last = segment_range(path)
+            if (start is None or last >= start) and (end is None or first < end):
+                found.append((first, path))
+        return [path for _, path in sorted(found)]
+
+    async def reingest(self, path: Union[str, Path]) -> int:
+        """
+        Load the entries of a segment back into the identity_logs collection.
+
+        Entries keep their original ``_id``, and entries that are already present are skipped, so
+        re-ingesting a segment twice is harmless. Presence is checked before inserting, because
+        time-series collections have no unique ``_id`` index to reject duplicates. Entries past
+        the retention period are skipped and counted in a warning. Rollups are not incremented
+        again: they are never archived and already count these entries.
+
+        Args:
+            path (Union[str, Path]): The segment file.
+
+        Returns:
+            int: The number of entries inserted.
+        """
+        cutoff = self._retention_cutoff()
+        inserted = 0
+        expired = 0
+        batch: list = []
+        with gzip.open(path, "rb") as stream:
+            for line in stream:
+                if not line.strip():
+                    continue
+                document = json_util.loads(line, json_options=_JSON_OPTIONS)
+                if cutoff is not None and _naive_utc(document["timestamp"]) < cutoff:
+                    expired += 1
+                    continue
+                batch.append(document)
+                if len(batch) >= self.batch_size:
+                    inserted += await self._insert(batch)
+                    batch = []
+        if batch:
+            inserted += await self._insert(batch)
+        if expired:
+            logger.warning(f"Skipped {expired} entries of {Path(path).name} older than the {self.retention_days} day retention period")
+        return inserted
+
+    async def reingest_range(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> int:
+        """Re-ingest every segment holding entries between ``start`` and ``end``; return the number inserted."""
+        cutoff = self._retention_cutoff()
+        inserted = 0
+        for path in self.segments(start, end):
+            if cutoff is not None and segment_range(path)[1] < cutoff:
+                logger.warning(f"Skipped {path.name}: every entry is older than the {self.retention_days} day retention period")
+                continue
+            inserted += await self.reingest(path)
+        return inserted
+
+    @staticmethod
+    async def _insert(documents: list) -> int:
+        collection = IdentityLog.get_motor_collection()
+        # The time range lets time-series collections look in the matching buckets only
+        timestamps = [document["timestamp"] for document in documents]
+        present = {
+            document["_id"]
+            async for document in collection.find(
+                {"timestamp": {"$gte": min(timestamps), "$lte": max(timestamps)}, "_id": {"$in": [d["_id"] for d in documents]}},
+                projection={"_id": 1},
+            )
+        }
+        documents = [document for document in documents if document["_id"] not in present]
+        if not documents:
+            return 0
+        try:
+            result = await collection.insert_many(documents, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            # Entries inserted by a concurrent run since the check, on collections with a unique _id
+            if any(error.get("code") != DUPLICATE_KEY_ERROR for error in e.details.get("writeErrors", [])):
+                raise
+            return e.details.get("nInserted", 0)
@@ -0,0 +1,128 @@
+"""Identity log service module."""
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from beanie import PydanticObjectId
+
+from pydentity.core.models import Identity, IdentityLog
+from pydentity.core.models.identity import IdentityType
+from pydentity.core.models.identity_log_rollup import IdentityLogRollup, RollupGranularity
+
+
+class IdentityLogService:
+    """Writes identity log entries and answers aggregate queries from their pre-aggregated rollups."""
+
+    async def log(self, identity: Identity, action: str, details: Optional[dict] = None) -> IdentityLog:
+        """
+        Record an action for an identity.
+
+        Inserting the entry also increments its rollups.
+
+        Args:
+            identity (Identity): The identity the action was performed by or on.
+            action (str): A short keyword for the action, e.g. "login_failed".
+            details (Optional[dict]): Additional information about the action.
+
+        Returns:
+            IdentityLog: The inserted log entry.
+        """
+        entry = IdentityLog(
+            identity=identity,
+            action=action,
+            identity_type=identity.identity_type,
+            tenant_id=identity.tenant_id,
+            details=details or {},
+        )
+        await entry.insert()
+        return entry
+
+    async def log_many(self, entries: Iterable[IdentityLog]) -> None:
+        """
+        Insert a batch of log entries.
+
+        ``insert_many`` skips document events, so rollups for the whole batch are
+        incremented here with a single bulk write.
+        """
+        entries = list(entries)
+        if not entries:
+            return
+        await IdentityLog.insert_many(entries)
+        await IdentityLogRollup.record(entries)
+
+    async def counts(
+        self,
+        action: str,
+        start: datetime,
+        end: datetime,
+        granularity: RollupGranularity = RollupGranularity.minute,
+        identity_type: Optional[IdentityType] = None,
+    ) -> List[IdentityLogRollup]:
+        """
+        Return per-bucket counts of an action, split by identity type.
+
+        Example:
+            Logins per minute by identity type over the last hour:
+            await service.counts("login", now - timedelta(hours=1), now)
+
+        Args:
+            action (str): The action to count.
+            start (datetime): The start of the range, inclusive.
+            end (datetime): The end of the range, exclusive.
+            granularity (RollupGranularity): The bucket size.
+            identity_type (Optional[IdentityType]): Only count identities of this type; all types if omitted.
+
+        Returns:
+            List[IdentityLogRollup]: One rollup per bucket and identity type of the current tenant, ordered by bucket.
+        """
+        query = {
+            **IdentityLogRollup.tenant_filter(),
+            "granularity": granularity.value,
+            "action": action,
+            "identity_id": None,
+            "bucket": {"$gte": start, "$lt": end},
+        }
+        if identity_type is not None:
+            query["identity_type"] = identity_type.value
+        return await IdentityLogRollup.find(query).sort("+bucket").to_list()
+
+    async def identity_counts(
+        self,
+        identity_id: PydanticObjectId,
+        action: str,
+        start: datetime,
+        end: datetime,
+    ) -> List[IdentityLogRollup]:
+        """Return the daily counts of an action for one identity of the current tenant, ordered by day."""
+        query = {
+            **IdentityLogRollup.tenant_filter(),
+            "granularity": RollupGranularity.day.value,
+            "action": action,
+            "identity_id": identity_id,
+            "bucket": {"$gte": start, "$lt": end},
+        }
+        return await IdentityLogRollup.find(query).sort("+bucket").to_list()
+
+    async def top_identities(
+        self,
+        action: str,
+        day: datetime,
+        identity_type: Optional[IdentityType] = None,
+        limit: int = 10,
+    ) -> List[IdentityLogRollup]:
+        """
+        Return the identities of the current tenant with the most occurrences of an action on a given day.
+
+        Example:
+            Agents with the most failed verifications today:
+            await service.top_identities("verification_failed", today, IdentityType.agent)
+        """
+        query = {
+            **IdentityLogRollup.tenant_filter(),
+            "granularity": RollupGranularity.day.value,
+            "action": action,
+            "identity_id": {"$ne": None},
+            "bucket": day.replace(hour=0, minute=0, second=0, microsecond=0),
+        }
+        if identity_type is not None:
+            query["identity_type"] = identity_type.value
+        return await IdentityLogRollup.find(query).sort("-total").limit(limit).to_list()
@@ -1,10 +1,33 @@
 """Identity Service Module."""
 
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from bson import DBRef, ObjectId
 from pydentity.core.models import Identity, User, Agent, Role
+from pydentity.core.models.identity import IdentityType, VerificationStatus
+from pydentity.core.pagination import KeysetOrder, encode_cursor, keyset_query
 from pydentity.core.schemas import UserCreate, AgentCreate
 from .auth_service import AuthService
 from fastapi import Depends
 
+# Secrets never leave the database through a listing or an export, nor does the revision used
+# for optimistic locking, which is stored as BSON binary
+EXPORT_EXCLUDED_FIELDS = {"hashed_password": 0, "api_key": 0, "verification_code": 0, "revision_id": 0}
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def _json_default(value: Any):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, DBRef):
+        return str(value.id)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
 class IdentityService:
     def __init__(self, auth_service: AuthService = Depends()):
         self.auth_service = auth_service
@@ -30,14 +53,110 @@ class IdentityService:
         return agent
 
     async def get_identity(self, username: str):
-        return await Identity.find_one(Identity.username == username)
+        return await Identity.by_username(username)
+
+    @staticmethod
+    def _identity_filters(
+        identity_type: Optional[IdentityType] = None,
+        is_active: Optional[bool] = None,
+        verification_status: Optional[VerificationStatus] = None,
+    ) -> Dict[str, Any]:
+        filters: Dict[str, Any] = Identity.tenant_filter()
+        if identity_type is not None:
+            filters["identity_type"] = identity_type.value
+        if is_active is not None:
+            filters["is_active"] = is_active
+        if verification_status is not None:
+            filters["verification_status"] = verification_status.value
+        return filters
+
+    async def list_identities(
+        self,
+        after: Optional[str] = None,
+        limit: int = 50,
+        order_by: KeysetOrder = KeysetOrder.id,
+        identity_type: Optional[IdentityType] = None,
+        is_active: Optional[bool] = None,
+        verification_status: Optional[VerificationStatus] = None,
+    ) -> Tuple[List[Identity], Optional[str]]:
+        """
+        List identities one page at a time using keyset pagination.
+
+        Args:
+            after (Optional[str]): The cursor returned with the previous page; None for the first page.
+            limit (int): The maximum number of identities in the page.
+            order_by (KeysetOrder): Order by ``_id`` or by ``created_at``.
+            identity_type (Optional[IdentityType]): Only list identities of this type.
+            is_active (Optional[bool]): Only list active or inactive identities.
+            verification_status (Optional[VerificationStatus]): Only list identities with this status.
+
+        Returns:
+            Tuple[List[Identity], Optional[str]]: The page and the cursor of the next page, or None on the last page.
+
+        Raises:
+            ValueError: If the cursor is malformed or was issued for another ordering.
+        """
+        filters = self._identity_filters(identity_type, is_active, verification_status)
+        query, sort = keyset_query(filters, order_by, after)
+        # Fetch one extra document to learn whether another page follows
+        identities = await Identity.find(query).sort(sort).limit(limit + 1).to_list()
+        if len(identities) <= limit:
+            return identities, None
+        identities = identities[:limit]
+        last = identities[-1]
+        return identities, encode_cursor(order_by, last.id, last.created_at)
+
+    def export_identities(
+        self,
+        identity_type: Optional[IdentityType] = None,
+        is_active: Optional[bool] = None,
+        verification_status: Optional[VerificationStatus] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream identities as newline-delimited JSON.
+
+        Raw documents are read from a server-side cursor in ``batch_size`` batches and
+        encoded without building models, so memory use is constant regardless of the
+        collection size. Lines are grouped into chunks of about 64 KiB to keep the
+        number of writes low.
+
+        Args:
+            identity_type (Optional[IdentityType]): Only export identities of this type.
+            is_active (Optional[bool]): Only export active or inactive identities.
+            verification_status (Optional[VerificationStatus]): Only export identities with this status.
+            batch_size (int): The number of documents fetched per round trip.
+
+        Returns:
+            AsyncIterator[bytes]: Chunks of NDJSON, each ending with a newline.
+        """
+        # The tenant's filter and collection are resolved now: a streaming response is read
+        # after the request's dependencies, and with them its tenant, have been torn down
+        filters = self._identity_filters(identity_type, is_active, verification_status)
+        cursor = Identity.get_motor_collection().find(
+            filters, projection=EXPORT_EXCLUDED_FIELDS, sort=[("_id", 1)], batch_size=batch_size
+        )
+        return self._export_chunks(cursor)
+
+    @staticmethod
+    async def _export_chunks(cursor) -> AsyncIterator[bytes]:
+        chunk = bytearray()
+        async for document in cursor:
+            document["id"] = document.pop("_id")
+            chunk += json.dumps(document, default=_json_default, separators=(",", ":")).encode()
+            chunk += b"\n"
+            if len(chunk) >= EXPORT_CHUNK_BYTES:
+                yield bytes(chunk)
+                chunk.clear()
+        if chunk:
+            yield bytes(chunk)
 
     async def add_role_to_identity(self, identity: Identity, role: Role):
         if role not in identity.roles:
             identity.roles.append(role)
-            await identity.save()
+            await identity.save_changes()
 
     async def remove_role_from_identity(self, identity: Identity, role: Role):
         if role in identity.roles:
             identity.roles.remove(role)
-            await identity.save()
+            await identity.save_changes()
@@ -0,0 +1,157 @@
+"""Login throttling module."""
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Callable, Deque, Optional
+
+from fastapi import HTTPException, status
+
+from pydentity.core.config import get_settings
+
+# How many of the least recently used windows are looked at to find one that may be evicted
+_EVICTION_SCAN = 32
+
+
+class _FailureWindow:
+    """Sliding window of failure timestamps for one key, plus its lockout deadline."""
+    __slots__ = ("failures", "locked_until")
+
+    def __init__(self):
+        self.failures: Deque[float] = deque()
+        self.locked_until = 0.0
+
+
+class _KeyedWindows:
+    """Failure windows keyed by username or source, evicting the least recently used unlocked key when full."""
+
+    def __init__(self, max_failures: int, max_keys: int):
+        self.max_failures = max_failures
+        self.max_keys = max_keys
+        self._windows: "OrderedDict[str, _FailureWindow]" = OrderedDict()
+
+    def locked_for(self, key: str, now: float) -> float:
+        window = self._windows.get(key)
+        if window is None or window.locked_until <= now:
+            return 0.0
+        return window.locked_until - now
+
+    def record_failure(self, key: str, now: float, window_seconds: float, lockout_seconds: float) -> None:
+        window = self._windows.get(key)
+        if window is None:
+            if len(self._windows) >= self.max_keys and not self._evict(now):
+                # Every window looked at is locked. Keeping the lockouts matters more than
+                # counting a new key, which the per-source limit still covers
+                return
+            window = self._windows[key] = _FailureWindow()
+        else:
+            self._windows.move_to_end(key)
+
+        failures = window.failures
+        cutoff = now - window_seconds
+        while failures and failures[0] <= cutoff:
+            failures.popleft()
+        failures.append(now)
+        if len(failures) >= self.max_failures:
+            window.locked_until = now + lockout_seconds
+            failures.clear()
+
+    def clear(self, key: str) -> None:
+        self._windows.pop(key, None)
+
+    def _evict(self, now: float) -> bool:
+        """Evict the least recently used window that is not locked; return whether one was found."""
+        windows = self._windows
+        for _ in range(min(_EVICTION_SCAN, len(windows))):
+            key, window = next(iter(windows.items()))
+            if window.locked_until <= now:
+                del windows[key]
+                return True
+            # Locked windows stay; moving them to the end keeps the next scan from starting on them
+            windows.move_to_end(key)
+        return False
+
+
+class LoginThrottle:
+    """
+    Rejects logins for usernames and sources with too many recent failures, before any database or bcrypt work.
+
+    Failures are counted per username and per source (e.g. client IP) over a sliding window.
+    Reaching the limit locks the key out for a fixed period. Tracked keys are bounded, with
+    the least recently used key evicted first, so spraying random usernames cannot grow
+    memory without limit. Keys that are locked out are never evicted, so flooding the throttle
+    with new keys cannot lift a lockout. State is kept per process.
+
+    Attributes:
+        window_seconds (float): Length of the sliding failure window.
+        lockout_seconds (float): How long a key stays locked once it reaches its limit.
+    """
+
+    def __init__(
+        self,
+        max_failures_per_username: int,
+        max_failures_per_source: int,
+        window_seconds: float,
+        lockout_seconds: float,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.window_seconds = window_seconds
+        self.lockout_seconds = lockout_seconds
+        self._usernames = _KeyedWindows(max_failures_per_username, max_keys)
+        self._sources = _KeyedWindows(max_failures_per_source, max_keys)
+        self._clock = clock
+
+    def retry_after(self, username: str, source: Optional[str] = None) -> float:
+        """
+        Return how many seconds remain before a login for this username and source may be attempted.
+
+        Args:
+            username (str): The username being logged in to.
+            source (Optional[str]): The origin of the attempt, such as the client IP.
+
+        Returns:
+            float: The remaining lockout in seconds, or 0 if the attempt may proceed.
+        """
+        now = self._clock()
+        remaining = self._usernames.locked_for(username, now)
+        if source is not None:
+            remaining = max(remaining, self._sources.locked_for(source, now))
+        return remaining
+
+    def check(self, username: str, source: Optional[str] = None) -> None:
+        """
+        Raise if the username or source is locked out.
+
+        Raises:
+            HTTPException: 429 with a Retry-After header while the lockout lasts.
+        """
+        remaining = self.retry_after(username, source)
+        if remaining > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many failed login attempts",
+                headers={"Retry-After": str(int(remaining) + 1)},
+            )
+
+    def record_failure(self, username: str, source: Optional[str] = None) -> None:
+        now = self._clock()
+        self._usernames.record_failure(username, now, self.window_seconds, self.lockout_seconds)
+        if source is not None:
+            self._sources.record_failure(source, now, self.window_seconds, self.lockout_seconds)
+
+    def record_success(self, username: str, source: Optional[str] = None) -> None:
+        # A source is not cleared on success: one valid account must not reset a spraying client
+        self._usernames.clear(username)
+
+
+@lru_cache()
+def get_login_throttle() -> LoginThrottle:
+    """Return the process-wide login throttle configured from settings."""
+    settings = get_settings()
+    return LoginThrottle(
+        max_failures_per_username=settings.LOGIN_MAX_FAILURES_PER_USERNAME,
+        max_failures_per_source=settings.LOGIN_MAX_FAILURES_PER_SOURCE,
+        window_seconds=settings.LOGIN_FAILURE_WINDOW_SECONDS,
+        lockout_seconds=settings.LOGIN_LOCKOUT_SECONDS,
+        max_keys=settings.LOGIN_THROTTLE_MAX_KEYS,
+    )
@@ -1,22 +1,165 @@
-# src/pyidentity/core/services/permission_service.py
+# src/pydentity/core/services/permission_service.py
+
+from typing import Dict, Iterable, List, Optional
+from uuid import uuid4
+
+from beanie import PydanticObjectId
+from beanie.exceptions import RevisionIdWasChanged
+from bson import Binary
+from pymongo import UpdateOne
+
+from pydentity.core.models import Identity, Role
+from pydentity.core.permissions import parse_permission
+
+# Upper bound on recomputing a role's descendants when they change concurrently
+ROLE_SAVE_ATTEMPTS = 3
+
+
+class RoleCycleError(ValueError):
+    """Raised when a change to a role's parents would make the role inherit from itself."""
 
-from pyidentity.core.models import Identity, Role
 
 class PermissionService:
-    async def create_role(self, name: str, permissions: list[str], description: str = None):
-        role = Role(name=name, permissions=permissions, description=description)
+    """
+    Manages roles, their permissions and their inheritance.
+
+    Each role stores the transitive closure of its parents (``ancestor_ids``) and the permissions
+    it ends up with (``effective_permissions``). Every edit made here recomputes both for the
+    edited role and for its descendants only, so permission checks read a single precomputed list.
+    """
+
+    async def create_role(self, name: str, permissions: list[str], description: str = None, parents: Optional[List[Role]] = None):
+        for permission in permissions:
+            parse_permission(permission)
+        role = Role(
+            name=name,
+            permissions=permissions,
+            description=description,
+            parent_ids=[parent.id for parent in parents or []],
+        )
+        self._apply_inheritance(role, {parent.id: parent for parent in parents or []})
         await role.insert()
         return role
 
     async def add_permission_to_role(self, role: Role, permission: str):
+        parse_permission(permission)
         if permission not in role.permissions:
             role.permissions.append(permission)
-            await role.save()
+            await self._save_with_descendants(role)
 
     async def remove_permission_from_role(self, role: Role, permission: str):
         if permission in role.permissions:
             role.permissions.remove(permission)
-            await role.save()
+            await self._save_with_descendants(role)
+
+    async def set_role_parents(self, role: Role, parents: List[Role]):
+        """
+        Replace the roles a role inherits from.
+
+        Args:
+            role (Role): The role to change.
+            parents (List[Role]): Its new parents.
+
+        Raises:
+            RoleCycleError: If a parent is the role itself or one of its descendants.
+        """
+        await self._set_parent_ids(role, [parent.id for parent in parents])
+
+    async def add_parent_to_role(self, role: Role, parent: Role):
+        if parent.id not in role.parent_ids:
+            await self._set_parent_ids(role, role.parent_ids + [parent.id])
+
+    async def remove_parent_from_role(self, role: Role, parent: Role):
+        if parent.id in role.parent_ids:
+            await self._set_parent_ids(role, [i for i in role.parent_ids if i != parent.id])
 
     async def check_permission(self, identity: Identity, permission: str):
-        return await identity.has_permission(permission)
+        return await identity.has_role_permission(permission)
+
+    async def _set_parent_ids(self, role: Role, parent_ids: List[PydanticObjectId]):
+        # Read the parents from the database so the cycle check sees their current ancestors
+        parents = await Role.find({"_id": {"$in": parent_ids}}).to_list()
+        for parent in parents:
+            if parent.id == role.id or role.id in parent.ancestor_ids:
+                raise RoleCycleError(f"Role {role.name!r} cannot inherit from {parent.name!r}: it would inherit from itself")
+        if role.id in parent_ids:
+            raise RoleCycleError(f"Role {role.name!r} cannot inherit from itself")
+        role.parent_ids = list(dict.fromkeys(parent_ids))
+        await self._save_with_descendants(role, {parent.id: parent for parent in parents})
+
+    @staticmethod
+    def _apply_inheritance(role: Role, parents: Dict[PydanticObjectId, Role]) -> None:
+        ancestor_ids = dict.fromkeys(role.parent_ids)
+        permissions = set(role.permissions)
+        for parent_id in role.parent_ids:
+            parent = parents.get(parent_id)
+            if parent is None:
+                # The parent was deleted; it no longer contributes anything
+                continue
+            ancestor_ids.update(dict.fromkeys(parent.ancestor_ids))
+            permissions.update(parent.effective_permissions)
+        role.ancestor_ids = list(ancestor_ids)
+        role.effective_permissions = sorted(permissions)
+        role.invalidate_permissions()
+
+    async def _save_with_descendants(self, role: Role, parents: Optional[Dict[PydanticObjectId, Role]] = None):
+        """
+        Recompute the inheritance of ``role`` and of every role that inherits from it, then save them.
+
+        Descendants are found through the ``ancestor_ids`` index and processed parents first, so
+        each closure is built from its parents' already recomputed ones. Roles outside that set
+        are only read.
+
+        Each descendant is only written if it still has the revision it was read with. When one
+        was changed concurrently, the descendants are read and recomputed again, up to
+        ``ROLE_SAVE_ATTEMPTS`` times.
+
+        Raises:
+            RevisionIdWasChanged: If ``role`` was changed since it was read, or descendants kept
+                changing concurrently.
+        """
+        for attempt in range(ROLE_SAVE_ATTEMPTS):
+            descendants = await Role.find({"ancestor_ids": role.id}).to_list()
+            affected: Dict[PydanticObjectId, Role] = {role.id: role, **{d.id: d for d in descendants}}
+            # Parents passed in were read just before the first attempt; later attempts read them again
+            known: Dict[PydanticObjectId, Role] = {**((parents or {}) if attempt == 0 else {}), **affected}
+            missing = {i for r in affected.values() for i in r.parent_ids} - known.keys()
+            if missing:
+                known.update({r.id: r for r in await Role.find({"_id": {"$in": list(missing)}}).to_list()})
+
+            for current in self._parents_first(affected):
+                self._apply_inheritance(current, known)
+
+            await role.save_changes()
+            if not descendants:
+                return
+            # The revision filter keeps a concurrent change to a descendant from being overwritten
+            # with a closure computed from its old state. A new revision makes stale copies of the
+            # descendants fail to save instead of overwriting the recomputed closures
+            result = await Role.get_motor_collection().bulk_write([
+                UpdateOne(
+                    {"_id": descendant.id, "revision_id": Binary.from_uuid(descendant.revision_id)},
+                    {"$set": {
+                        "ancestor_ids": descendant.ancestor_ids,
+                        "effective_permissions": descendant.effective_permissions,
+                        "revision_id": Binary.from_uuid(uuid4()),
+                    }},
+                )
+                for descendant in descendants
+            ], ordered=False)
+            if result.matched_count == len(descendants):
+                return
+        raise RevisionIdWasChanged(f"Descendants of role {role.name!r} kept changing while their permissions were recomputed")
+
+    @staticmethod
+    def _parents_first(roles: Dict[PydanticObjectId, Role]) -> Iterable[Role]:
+        pending = {role_id: {p for p in role.parent_ids if p in roles} for role_id, role in roles.items()}
+        while pending:
+            ready = [role_id for role_id, waiting in pending.items() if not waiting]
+            if not ready:
+                raise RoleCycleError("Role hierarchy contains a cycle")
+            for role_id in ready:
+                del pending[role_id]
+                yield roles[role_id]
+            for waiting in pending.values():
+                waiting.difference_update(ready)
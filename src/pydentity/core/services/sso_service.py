@@ -1,22 +1,119 @@
-# src/pyidentity/core/services/sso_service.py
+# src/pydentity/core/services/sso_service.py
 
+import asyncio
+import hashlib
 import jwt
-from jwt.algorithms import RSAAlgorithm
-import httpx
+import secrets
+from beanie.odm.utils.dump import get_dict
+from beanie.odm.utils.parsing import parse_obj
+from cachetools import TTLCache
+from datetime import datetime, timezone
 from fastapi import HTTPException
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
-from typing import Optional, Dict
+from functools import lru_cache
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from threading import Lock
+from typing import TYPE_CHECKING, Iterator, Optional, Dict
 import time
 
-from pydentity.models import User, SSOProvider, IdentityType
+from pydentity.core.models import User, SSOProvider, IdentityType, VerificationStatus
 from pydentity.core.config import get_settings
+from pydentity.core.read_preference import mark_written
+from pydentity.core.singleflight import SingleFlight
+from pydentity.core.tenancy import get_current_tenant
 from pydentity.utils.validators import validate_username
+from pydentity.core.metrics import IDENTITY_LOOKUP_SECONDS, SSO_REQUEST_SECONDS, timed
+
+if TYPE_CHECKING:
+    import httpx
+
+# Upper bound on upsert retries after username or concurrent sign-in conflicts
+SSO_UPSERT_ATTEMPTS = 5
+
+_sign_ins = SingleFlight()
+
+
+def _conflicting_field(error: DuplicateKeyError) -> Optional[str]:
+    """Return the user field whose unique index an upsert violated: "email", "username" or "sso_id"."""
+    pattern = (error.details or {}).get("keyPattern") or {}
+    message = str(error)
+    for field, index in (("email", "tenant_email"), ("username", "tenant_username"), ("sso_id", "tenant_sso")):
+        if field in pattern or f"index: {index} " in message:
+            return field
+    return None
+
+
+class VerifiedTokenCache:
+    """
+    Remembers a provider's verdict on access tokens for a short while.
+
+    Repeat sign-ins with a token that was verified recently, such as silent re-authentication
+    from the mobile apps, are answered from memory instead of calling the provider again.
+    Tokens the provider rejected can be remembered too, for a separate and usually shorter
+    time, so a client retrying a dead token does not turn into outbound traffic.
+
+    Entries are keyed by a SHA-256 digest of the token, so the tokens themselves, which are
+    credentials, are never kept.
+    """
+
+    def __init__(self, ttl: float, maxsize: int, negative_ttl: float = 0):
+        self._verified: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._rejected: Optional[TTLCache] = TTLCache(maxsize=maxsize, ttl=negative_ttl) if negative_ttl > 0 else None
+        self._lock = Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict]:
+        """Return what the provider said about a recently verified token, or None."""
+        with self._lock:
+            info = self._verified.get(self._key(token))
+        return dict(info) if info is not None else None
+
+    def rejected(self, token: str) -> bool:
+        """Return whether the provider recently rejected the token."""
+        if self._rejected is None:
+            return False
+        with self._lock:
+            return self._key(token) in self._rejected
+
+    def accept(self, token: str, info: Dict) -> None:
+        with self._lock:
+            self._verified[self._key(token)] = dict(info)
+
+    def reject(self, token: str) -> None:
+        if self._rejected is None:
+            return
+        with self._lock:
+            self._rejected[self._key(token)] = True
+
+
+@lru_cache()
+def get_facebook_token_cache() -> VerifiedTokenCache:
+    """Return the process-wide cache of Facebook access token verdicts."""
+    settings = get_settings()
+    return VerifiedTokenCache(
+        ttl=settings.FACEBOOK_TOKEN_CACHE_SECONDS,
+        maxsize=settings.FACEBOOK_TOKEN_CACHE_SIZE,
+        negative_ttl=settings.FACEBOOK_TOKEN_NEGATIVE_CACHE_SECONDS,
+    )
+
 
 class SSOService:
-    def __init__(self):
+    def __init__(self, http_client: Optional["httpx.AsyncClient"] = None):
+        # Provider SDKs are imported on first use; google.auth and httpx are slow to import
+        import httpx
+        from pydentity.core.resilience import ProviderClient, get_circuit_breaker
+
         self.settings = get_settings()
-        self.http_client = httpx.AsyncClient()
+        self.http_client = http_client or httpx.AsyncClient()
+        # Outbound calls go through clients enforcing each provider's deadline and circuit breaker
+        self.apple = ProviderClient(self.http_client, "apple", self.settings)
+        self.facebook = ProviderClient(self.http_client, "facebook", self.settings)
+        # Google tokens are verified by the google-auth SDK, which fetches certificates with its own client
+        self.google_deadline = self.settings.SSO_DEADLINE_OVERRIDES.get("google", self.settings.SSO_DEADLINE_SECONDS)
+        self.google_breaker = get_circuit_breaker("google", self.settings)
 
     async def __aenter__(self):
         return self
@@ -36,8 +133,8 @@ class SSOService:
 
     async def authenticate_google(self, token: str) -> User:
         try:
-            idinfo = id_token.verify_oauth2_token(token, google_requests.Request(), self.settings.GOOGLE_CLIENT_ID)
-            
+            idinfo = await self._verify_google_token(token)
+
             if idinfo['iss'] not in ['accounts.google.com', 'https://accounts.google.com']:
                 raise ValueError('Wrong issuer.')
             
@@ -93,45 +190,138 @@ class SSOService:
             raise HTTPException(status_code=400, detail=f"Invalid Facebook token: {str(e)}")
 
     async def _get_or_create_sso_user(self, provider: SSOProvider, sso_id: str, email: str, name: Optional[str] = None) -> User:
-        user = await User.get_by_sso_id(provider, sso_id)
-        if not user:
-            user = await User.get_by_email(email)
-            if user:
-                # Link existing user to SSO provider
-                user.sso_provider = provider
-                user.sso_id = sso_id
-            else:
-                # Create new user
-                username = await self._generate_unique_username(email, name)
-                user = User(
-                    username=username,
-                    email=email,
-                    identity_type=IdentityType.sso_user,
-                    sso_provider=provider,
-                    sso_id=sso_id,
-                    email_verified=True,
-                    full_name=name
-                )
-            await user.save()
+        """
+        Return the user signing in with an SSO identity, creating or linking it on first sign-in.
+
+        Concurrent sign-ins of the same SSO identity in this process share one lookup, but each
+        gets a user of its own, parsed from the shared document with its saved state, so callers
+        can change and ``save_changes()`` it without affecting each other.
+        """
+        key = (get_current_tenant(), provider, sso_id)
+        document = await _sign_ins.do(key, lambda: self._upsert_sso_user(provider, sso_id, email, name))
+        user = parse_obj(User, document)
+        mark_written(*user.lookup_keys())
         return user
 
-    async def _generate_unique_username(self, email: str, name: Optional[str] = None) -> str:
-        base_username = name.split()[0].lower() if name else email.split('@')[0]
-        base_username = ''.join(c for c in base_username if c.isalnum() or c == '_')
-        
-        username = base_username
-        suffix = 1
-        while not validate_username(username) or await User.get_by_username(username):
-            username = f"{base_username}{suffix}"
-            suffix += 1
-        
-        return username
+    async def _upsert_sso_user(self, provider: SSOProvider, sso_id: str, email: str, name: Optional[str] = None) -> dict:
+        """
+        Find or create the user of an SSO identity in one atomic upsert keyed on (provider, sso_id).
+
+        A returning user costs a single round trip that also records the login. The unique
+        indexes settle the rare conflicts: an existing account with the same email is linked to
+        the SSO identity, a taken username is retried with a random suffix, and a concurrent
+        first sign-in from another process makes the retry match the user it created.
+
+        Returns:
+            dict: The user's document, as stored after the upsert.
+        """
+        collection = User.get_motor_collection()
+        now = datetime.now(timezone.utc)
+        match = {**User.tenant_filter(), "sso_provider": provider.value, "sso_id": sso_id}
+        usernames = self._username_candidates(email, name)
+        for _ in range(SSO_UPSERT_ATTEMPTS):
+            on_insert = get_dict(User(
+                username=next(usernames),
+                email=email,
+                hashed_password="",
+                identity_type=IdentityType.sso_user,
+                sso_provider=provider,
+                sso_id=sso_id,
+                # The provider has verified the address
+                verification_status=VerificationStatus.verified,
+                created_at=now,
+                updated_at=now,
+            ), to_db=True, exclude={"last_login"})
+            try:
+                with timed(IDENTITY_LOOKUP_SECONDS, method="sso_upsert"):
+                    document = await collection.find_one_and_update(
+                        match,
+                        {"$set": {"last_login": now}, "$setOnInsert": on_insert},
+                        upsert=True,
+                        return_document=ReturnDocument.AFTER,
+                    )
+            except DuplicateKeyError as e:
+                if _conflicting_field(e) != "email":
+                    # The username is taken, or another process created this SSO user first
+                    # and the retry finds it
+                    continue
+                document = await self._link_sso_user(provider, sso_id, email, now)
+                if document is None:
+                    # The account was deleted since the conflict; try creating the user again
+                    continue
+            return document
+        raise ValueError(f"Could not sign in {provider.value} user after {SSO_UPSERT_ATTEMPTS} attempts")
+
+    async def _link_sso_user(self, provider: SSOProvider, sso_id: str, email: str, now: datetime) -> Optional[dict]:
+        with timed(IDENTITY_LOOKUP_SECONDS, method="sso_link"):
+            return await User.get_motor_collection().find_one_and_update(
+                {**User.tenant_filter(), "email": email},
+                {"$set": {"sso_provider": provider.value, "sso_id": sso_id, "last_login": now, "updated_at": now}},
+                return_document=ReturnDocument.AFTER,
+            )
+
+    @staticmethod
+    def _username_candidates(email: str, name: Optional[str] = None) -> Iterator[str]:
+        """Yield usernames to try: one derived from the name or email, then that with random suffixes."""
+        base = name.split()[0].lower() if name and name.split() else email.split('@')[0]
+        base = ''.join(c for c in base if c.isalnum() or c == '_')[:24]
+        if not base[:1].isalpha():
+            base = f"user{base}"[:24]
+        if len(base) >= 5 and validate_username(base):
+            yield base
+        while True:
+            # Random rather than sequential suffixes, so no query is needed to find a free one
+            yield f"{base}{secrets.randbelow(10 ** 6):06d}"
+
+    async def _verify_google_token(self, token: str) -> Dict:
+        """
+        Verify a Google ID token within the provider's deadline, behind its circuit breaker.
+
+        The SDK fetches Google's certificates with a blocking HTTP call, so verification runs in a
+        worker thread. A thread that outlives the deadline is abandoned, not interrupted.
+
+        Raises:
+            ValueError: If Google rejects the token.
+            ProviderUnavailable: If Google's certificates cannot be fetched in time or the circuit is open.
+        """
+        from google.auth import exceptions as google_exceptions
+        from google.auth.transport import requests as google_requests
+        from google.oauth2 import id_token
+        from pydentity.core.resilience import ProviderUnavailable
+
+        if not self.google_breaker.allow():
+            raise ProviderUnavailable("google is unavailable; its circuit is open")
+        try:
+            with timed(SSO_REQUEST_SECONDS, provider="google", endpoint="verify_oauth2_token"):
+                idinfo = await asyncio.wait_for(
+                    asyncio.to_thread(id_token.verify_oauth2_token, token, google_requests.Request(), self.settings.GOOGLE_CLIENT_ID),
+                    self.google_deadline,
+                )
+        except asyncio.TimeoutError:
+            self.google_breaker.record_failure()
+            raise ProviderUnavailable(f"google verify_oauth2_token did not answer within {self.google_deadline}s") from None
+        except google_exceptions.TransportError as e:
+            self.google_breaker.record_failure()
+            raise ProviderUnavailable(f"google verify_oauth2_token failed: {e!r}") from e
+        except ValueError:
+            # A rejected token says nothing about Google's health
+            self.google_breaker.record_success()
+            raise
+        except BaseException:
+            self.google_breaker.release()
+            raise
+        self.google_breaker.record_success()
+        return idinfo
 
     async def _get_apple_public_keys(self) -> Dict:
-        response = await self.http_client.get('https://appleid.apple.com/auth/keys')
+        response = await self.apple.get('https://appleid.apple.com/auth/keys', endpoint="keys")
+        if response.status_code != 200:
+            raise ValueError("Failed to fetch Apple public keys")
         return response.json()['keys']
 
     async def _verify_apple_token(self, token: str, keys: Dict) -> Dict:
+        from jwt.algorithms import RSAAlgorithm
+
         header = jwt.get_unverified_header(token)
         key = next(key for key in keys if key['kid'] == header['kid'])
         public_key = RSAAlgorithm.from_jwk(key)
@@ -146,8 +336,9 @@ class SSOService:
     async def _exchange_apple_auth_code(self, authorization_code: str) -> dict:
         client_secret = self._generate_apple_client_secret()
         
-        response = await self.http_client.post(
+        response = await self.apple.post(
             'https://appleid.apple.com/auth/token',
+            endpoint="token",
             data={
                 'client_id': self.settings.APPLE_CLIENT_ID,
                 'client_secret': client_secret,
@@ -195,15 +386,34 @@ class SSOService:
         )
 
     async def _verify_facebook_token(self, access_token: str) -> Dict:
-        response = await self.http_client.get(
+        cache = get_facebook_token_cache()
+        user_info = cache.get(access_token)
+        if user_info is not None:
+            return user_info
+        if cache.rejected(access_token):
+            raise ValueError("Invalid Facebook access token")
+
+        response = await self.facebook.get(
             'https://graph.facebook.com/me',
+            endpoint="me",
             params={
                 'fields': 'id,name,email',
                 'access_token': access_token
             }
         )
         
+        if response.status_code in (400, 401):
+            # Facebook rejected the token itself; other failures say nothing about it and are not cached
+            cache.reject(access_token)
         if response.status_code != 200:
             raise ValueError("Invalid Facebook access token")
-        
-        return response.json()
\ No newline at end of file
+
+        user_info = response.json()
+        cache.accept(access_token, user_info)
+        return user_info
+
+
+@lru_cache()
+def get_sso_service() -> SSOService:
+    """Return the process-wide SSO service, sharing one HTTP client between sign-ins."""
+    return SSOService()
@@ -1,20 +1,170 @@
 
 # src/pyidentity/core/services/token_service.py
 
-from jose import JWTError, jwt
-from datetime import datetime, timedelta
-from pyidentity.core.config import get_settings
+import base64
+import hashlib
+import hmac
+import time
+from enum import Enum
+from functools import lru_cache
+from datetime import timedelta
+from beanie import PydanticObjectId
+from pydentity.core.config import get_settings
+from pydentity.core.jwt_backends import InvalidToken, get_jwt_backend
+from pydentity.core.metrics import TOKEN_SECONDS, timed
+from pydentity.core.read_preference import primary_reads
+from pydentity.core.tenancy import TENANT_CLAIM, tenant_context
+
+
+class TokenPurpose(str, Enum):
+    """
+    Purposes of single-use action tokens.
+
+    Attributes:
+        password_reset (str): Lets the holder set a new password. Spent once the password changes.
+        email_verification (str): Confirms the holder controls the email address. Spent once the identity is verified or the address changes.
+    """
+    password_reset = 'password_reset'
+    email_verification = 'email_verification'
+
+
+class InvalidActionToken(ValueError):
+    """Raised when an action token is malformed, expired, issued for another purpose, or already spent."""
+
+# Action tokens are signed with secrets derived from SECRET_KEY, whatever ALGORITHM access tokens use
+ACTION_TOKEN_ALGORITHM = "HS256"
+
+
+@lru_cache(maxsize=None)
+def _derive_purpose_key(secret_key: str, purpose: str) -> str:
+    return hmac.new(secret_key.encode(), f"pydentity:{purpose}".encode(), hashlib.sha256).hexdigest()
+
 
 class TokenService:
+    """
+    Issues and verifies access tokens and single-use action tokens.
+
+    Tokens are signed by the JWT backend from ``get_jwt_backend()`` (``JWT_BACKEND`` unless one
+    was installed with ``set_jwt_backend``); assign ``backend`` to use another for one service.
+    HS* algorithms use ``SECRET_KEY``, the others ``JWT_PRIVATE_KEY`` and ``JWT_PUBLIC_KEY``.
+    """
+
     def __init__(self):
         self.settings = get_settings()
+        self.backend = get_jwt_backend()
+        self._algorithm = self.settings.ALGORITHM
+        self._algorithms = (self._algorithm,)
+        self._lifetime = self.settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        if self._algorithm.startswith("HS"):
+            self._signing_key = self._verifying_key = self.settings.SECRET_KEY
+        else:
+            self._signing_key = self.settings.JWT_PRIVATE_KEY
+            self._verifying_key = self.settings.JWT_PUBLIC_KEY or self._signing_key
 
     def create_access_token(self, data: dict):
-        to_encode = data.copy()
-        expire = datetime.utcnow() + timedelta(minutes=self.settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, self.settings.SECRET_KEY, algorithm=self.settings.ALGORITHM)
-        return encoded_jwt
+        # A new dict, so the caller's data is never modified
+        claims = {**data, "exp": int(time.time()) + self._lifetime}
+        with timed(TOKEN_SECONDS, operation="encode"):
+            return self.backend.encode(claims, self._signing_key, self._algorithm)
+
+    def create_identity_token(self, identity) -> str:
+        """Issue an access token for an identity, carrying its tenant so requests are scoped to it."""
+        data = {"sub": identity.username}
+        if identity.tenant_id is not None:
+            data[TENANT_CLAIM] = identity.tenant_id
+        return self.create_access_token(data)
 
     def decode_token(self, token: str):
-        return jwt.decode(token, self.settings.SECRET_KEY, algorithms=[self.settings.ALGORITHM])
+        """
+        Verify an access token and return its claims.
+
+        Raises:
+            InvalidToken: If the token is malformed, expired or not signed by this service.
+        """
+        with timed(TOKEN_SECONDS, operation="decode"):
+            return self.backend.decode(token, self._verifying_key, self._algorithms)
+
+    """ Action tokens """
+    def _purpose_key(self, purpose: TokenPurpose) -> str:
+        # A key per purpose, so no token can be replayed for another purpose or as an access token
+        return _derive_purpose_key(self.settings.SECRET_KEY, purpose.value)
+
+    def _expires_in(self, purpose: TokenPurpose) -> timedelta:
+        if purpose == TokenPurpose.password_reset:
+            return timedelta(hours=self.settings.PASSWORD_RESET_TOKEN_EXPIRE_HOURS)
+        return timedelta(hours=self.settings.EMAIL_VERIFICATION_TOKEN_EXPIRE_HOURS)
+
+    def fingerprint(self, identity, purpose: TokenPurpose) -> str:
+        """
+        Digest of the identity state an action token is bound to.
+
+        Password reset tokens are bound to the password hash and email verification tokens to
+        the email address and verification status. Redeeming a token changes that state, which
+        spends the token and every other token issued for the same purpose.
+        """
+        if purpose == TokenPurpose.password_reset:
+            state = getattr(identity, "hashed_password", "") or ""
+        else:
+            state = f"{getattr(identity, 'email', '')}|{identity.verification_status.value}"
+        digest = hmac.new(self._purpose_key(purpose).encode(), state.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest[:16]).decode().rstrip("=")
+
+    def create_action_token(self, identity, purpose: TokenPurpose) -> str:
+        """
+        Issue a single-use token for an action such as a password reset.
+
+        Nothing is stored: the token carries the identity, its tenant, the purpose, an expiry and
+        the fingerprint of the state it is bound to, signed with a key derived for the purpose.
+
+        Args:
+            identity (Identity): The identity the action is for.
+            purpose (TokenPurpose): What the token may be used for.
+
+        Returns:
+            str: The signed token.
+        """
+        claims = {
+            "sub": str(identity.id),
+            "pur": purpose.value,
+            "fp": self.fingerprint(identity, purpose),
+            # Seconds since the epoch, like access tokens, so no timezone is involved
+            "exp": int(time.time() + self._expires_in(purpose).total_seconds()),
+        }
+        if identity.tenant_id is not None:
+            claims[TENANT_CLAIM] = identity.tenant_id
+        with timed(TOKEN_SECONDS, operation="encode_action"):
+            return self.backend.encode(claims, self._purpose_key(purpose), ACTION_TOKEN_ALGORITHM)
+
+    async def verify_action_token(self, token: str, purpose: TokenPurpose, model=None):
+        """
+        Check an action token and return the identity it was issued for.
+
+        The only database access is one read by ``_id``, made on the primary so a token that was
+        just spent cannot be replayed against a lagging secondary.
+
+        Args:
+            token (str): The token.
+            purpose (TokenPurpose): The purpose the token must have been issued for.
+            model (Optional[Type[Identity]]): The identity class to load. Defaults to User.
+
+        Returns:
+            Identity: The identity, in the tenant the token was issued for.
+
+        Raises:
+            InvalidActionToken: If the token is malformed, expired, issued for another purpose, or already spent.
+        """
+        if model is None:
+            from pydentity.core.models.user import User as model
+        try:
+            with timed(TOKEN_SECONDS, operation="decode_action"):
+                claims = self.backend.decode(token, self._purpose_key(purpose), (ACTION_TOKEN_ALGORITHM,))
+            identity_id = PydanticObjectId(claims["sub"])
+        except (InvalidToken, KeyError, TypeError, ValueError):
+            raise InvalidActionToken("Invalid or expired token")
+        if claims.get("pur") != purpose.value:
+            raise InvalidActionToken("Invalid or expired token")
+        with tenant_context(claims.get(TENANT_CLAIM)), primary_reads():
+            identity = await model.find_one({**model.tenant_filter(), "_id": identity_id})
+        if identity is None or not hmac.compare_digest(self.fingerprint(identity, purpose), claims.get("fp", "")):
+            raise InvalidActionToken("Invalid or expired token")
+        return identity
@@ -0,0 +1,54 @@
+"""Coalescing of concurrent identical calls."""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; callers arriving while it runs share its result.
+
+    A burst of identical requests, such as several tabs completing the same SSO sign-in, then
+    costs one database round trip instead of one per request. Nothing is cached: a call made
+    after the shared one has finished starts a new one.
+
+    The call runs in a task of its own, so a caller that is cancelled does not cancel it for
+    the others. The task copies the context of the caller that started it, including the
+    current tenant.
+
+    Example:
+        flights = SingleFlight()
+        user = await flights.do(("google", sub), lambda: upsert_user(sub))
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await ``call()``, or the call already running for ``key``.
+
+        Args:
+            key (Hashable): Identifies calls that are interchangeable.
+            call (Callable[[], Awaitable[T]]): Starts the call when none is running for ``key``.
+
+        Returns:
+            T: The result of the shared call. Its exception is raised to every caller.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved in case every caller was cancelled before it was raised
+            task.exception()
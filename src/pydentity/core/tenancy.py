@@ -0,0 +1,154 @@
+"""Tenant context and tenant-to-database routing."""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Mapping, Optional, Tuple
+
+from fastapi import Request
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+# Name of the access token claim carrying the tenant of the identity
+TENANT_CLAIM = "tid"
+
+# Header naming the tenant of requests made before there is an access token, such as logins
+TENANT_HEADER = "X-Tenant-ID"
+
+_current_tenant: ContextVar[Optional[str]] = ContextVar("pydentity_tenant", default=None)
+
+
+def get_current_tenant() -> Optional[str]:
+    """Return the tenant of the current request or task, or None outside any tenant."""
+    return _current_tenant.get()
+
+
+def set_current_tenant(tenant_id: Optional[str]):
+    """
+    Set the tenant for the rest of the current request or task.
+
+    Returns:
+        The token to pass to ``reset_current_tenant`` to restore the previous tenant.
+    """
+    return _current_tenant.set(tenant_id)
+
+
+def reset_current_tenant(token) -> None:
+    """Restore the tenant that was current before the matching ``set_current_tenant``."""
+    _current_tenant.reset(token)
+
+
+@contextmanager
+def tenant_context(tenant_id: Optional[str]) -> Iterator[None]:
+    """
+    Run a block of code on behalf of a tenant.
+
+    Example:
+        with tenant_context("acme"):
+            user = await User.by_email("alice@acme.test")
+    """
+    token = _current_tenant.set(tenant_id)
+    try:
+        yield
+    finally:
+        _current_tenant.reset(token)
+
+
+class TenantRouter:
+    """
+    Decides where the documents of a tenant live.
+
+    The default router keeps every tenant in the database the models were initialised with,
+    separated only by ``tenant_id``. Subclasses override ``database_for`` to move tenants to
+    databases of their own, e.g. to isolate a tenant with a heavy load or to place it on
+    another shard.
+    """
+
+    def __init__(self):
+        self._collections: Dict[Tuple[str, str], AsyncIOMotorCollection] = {}
+
+    def database_for(self, tenant_id: Optional[str]) -> Optional[str]:
+        """
+        Return the name of the database holding the tenant's documents.
+
+        Args:
+            tenant_id (Optional[str]): The tenant, or None outside any tenant.
+
+        Returns:
+            Optional[str]: A database name, or None to use the default database.
+        """
+        return None
+
+    def collection(self, default: AsyncIOMotorCollection, tenant_id: Optional[str]) -> AsyncIOMotorCollection:
+        """Return the collection standing in for ``default`` for the given tenant."""
+        database = self.database_for(tenant_id)
+        if database is None or database == default.database.name:
+            return default
+        key = (database, default.name)
+        collection = self._collections.get(key)
+        if collection is None:
+            collection = self._collections[key] = default.database.client[database][default.name]
+        return collection
+
+
+class MappingTenantRouter(TenantRouter):
+    """
+    Routes the tenants listed in a mapping to their own databases and keeps the others shared.
+
+    Example:
+        set_tenant_router(MappingTenantRouter({"acme": "pydentity_acme"}))
+    """
+
+    def __init__(self, databases: Mapping[str, str]):
+        super().__init__()
+        self.databases = dict(databases)
+
+    def database_for(self, tenant_id: Optional[str]) -> Optional[str]:
+        return self.databases.get(tenant_id) if tenant_id is not None else None
+
+
+_router: TenantRouter = TenantRouter()
+
+
+def get_tenant_router() -> TenantRouter:
+    """Return the router used by tenant-scoped documents."""
+    return _router
+
+
+def set_tenant_router(router: TenantRouter) -> None:
+    """Replace the router used by tenant-scoped documents."""
+    global _router
+    _router = router
+
+
+class TenantResolver:
+    """
+    Decides which tenant a request without an access token is for, such as a login.
+
+    The default resolver reads the ``X-Tenant-ID`` header and treats requests without it as
+    outside any tenant. Subclasses override ``resolve`` to take the tenant from elsewhere,
+    e.g. the host name of tenants served on subdomains.
+    """
+
+    def resolve(self, request: Request) -> Optional[str]:
+        """
+        Return the tenant the request is for.
+
+        Args:
+            request (Request): The incoming request.
+
+        Returns:
+            Optional[str]: The tenant, or None outside any tenant.
+        """
+        return request.headers.get(TENANT_HEADER) or None
+
+
+_resolver: TenantResolver = TenantResolver()
+
+
+def get_tenant_resolver() -> TenantResolver:
+    """Return the resolver used for requests without an access token."""
+    return _resolver
+
+
+def set_tenant_resolver(resolver: TenantResolver) -> None:
+    """Replace the resolver used for requests without an access token."""
+    global _resolver
+    _resolver = resolver
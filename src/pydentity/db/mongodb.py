@@ -0,0 +1,81 @@
+"""MongoDB connection and Beanie initialization."""
+from typing import Optional
+
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from pydentity.core.config import get_settings
+from pydentity.core.metrics import MongoCommandMetrics
+from pydentity.core.models import Agent, AgentProfile, Identity, IdentityLog, IdentityLogRollup, Role, User, UserProfile
+from pydentity.core.models.tenant import TenantDocument
+from pydentity.core.tenancy import get_tenant_router
+
+
+DOCUMENT_MODELS = [Identity, User, Agent, Role, UserProfile, AgentProfile, IdentityLog, IdentityLogRollup]
+
+
+def create_client(url: Optional[str] = None, **kwargs) -> AsyncIOMotorClient:
+    """
+    Create a Motor client for pydentity.
+
+    The client reports every command to ``MongoCommandMetrics`` so Beanie query latency
+    shows up in the metrics endpoint; the listener does nothing while metrics are disabled.
+
+    Args:
+        url (Optional[str]): The MongoDB connection string. Defaults to ``MONGODB_URL``.
+        **kwargs: Extra keyword arguments for ``AsyncIOMotorClient``.
+
+    Returns:
+        AsyncIOMotorClient: The configured client.
+    """
+    settings = get_settings()
+    listeners = list(kwargs.pop("event_listeners", [])) + [MongoCommandMetrics()]
+    return AsyncIOMotorClient(url or settings.MONGODB_URL, event_listeners=listeners, **kwargs)
+
+
+async def init_db(client: Optional[AsyncIOMotorClient] = None, db_name: Optional[str] = None) -> AsyncIOMotorClient:
+    """
+    Initialize Beanie with the pydentity document models.
+
+    The identity_logs storage mode and retention are applied from ``IDENTITY_LOG_STORAGE``
+    and ``IDENTITY_LOG_RETENTION_DAYS`` before the collections are created.
+
+    Args:
+        client (Optional[AsyncIOMotorClient]): An existing client. A new one is created with ``create_client`` if omitted.
+        db_name (Optional[str]): The database name. Defaults to ``MONGODB_DB_NAME``.
+
+    Returns:
+        AsyncIOMotorClient: The client the models are bound to.
+    """
+    settings = get_settings()
+    IdentityLog.configure_storage(settings.IDENTITY_LOG_STORAGE, settings.IDENTITY_LOG_RETENTION_DAYS)
+    client = client or create_client()
+    await init_beanie(database=client[db_name or settings.MONGODB_DB_NAME], document_models=DOCUMENT_MODELS)
+    return client
+
+
+async def ensure_tenant_indexes(tenant_id: str) -> None:
+    """
+    Create the indexes of the tenant-scoped collections in the database the router assigns to a tenant.
+
+    Beanie only creates indexes in the default database, so call this once after routing a tenant to
+    a database of its own. The index definitions are copied from the default collections.
+
+    Args:
+        tenant_id (str): The tenant.
+    """
+    router = get_tenant_router()
+    done = set()
+    for model in DOCUMENT_MODELS:
+        if not issubclass(model, TenantDocument):
+            continue
+        default = model.get_settings().motor_collection
+        target = router.collection(default, tenant_id)
+        if target is default or target.full_name in done:
+            continue
+        done.add(target.full_name)
+        for name, spec in (await default.index_information()).items():
+            if name == "_id_":
+                continue
+            options = {k: v for k, v in spec.items() if k not in ("key", "v", "ns")}
+            await target.create_index(spec["key"], name=name, **options)
@@ -0,0 +1,140 @@
+"""ASGI middleware for pydentity."""
+import time
+from contextlib import nullcontext
+from typing import Optional
+
+from starlette.requests import cookie_parser
+
+from pydentity.core.config import get_settings
+from pydentity.core.metrics import HTTP_REQUEST_SECONDS, configure_metrics, metrics_enabled, render_prometheus
+from pydentity.core.read_preference import primary_reads, track_request_writes
+
+
+PROMETHEUS_CONTENT_TYPE = b"text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsMiddleware:
+    """
+    Serves pydentity metrics in the Prometheus text format and times every HTTP request.
+
+    Adding the middleware turns metric collection on for the process (unless disabled), so
+    the instrumented token, password, lookup, SSO and Mongo paths start recording. Without
+    it, every instrumentation point is a no-op.
+
+    Args:
+        app: The ASGI application to wrap.
+        path (Optional[str]): The path the metrics are served on. Defaults to ``METRICS_PATH``.
+        enabled (Optional[bool]): Whether to collect metrics. Defaults to ``METRICS_ENABLED``.
+        tracing (Optional[bool]): Whether to also open OpenTelemetry spans when it is installed. Defaults to ``TRACING_ENABLED``.
+
+    Example:
+        app.add_middleware(MetricsMiddleware)
+    """
+
+    def __init__(self, app, path: Optional[str] = None, enabled: Optional[bool] = None, tracing: Optional[bool] = None):
+        settings = get_settings()
+        self.app = app
+        self.path = path if path is not None else settings.METRICS_PATH
+        configure_metrics(
+            settings.METRICS_ENABLED if enabled is None else enabled,
+            settings.TRACING_ENABLED if tracing is None else tracing,
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["path"] == self.path and scope["method"] == "GET":
+            body = render_prometheus().encode()
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", PROMETHEUS_CONTENT_TYPE), (b"content-length", str(len(body)).encode())],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        if not metrics_enabled():
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Label by the matched route template rather than the raw path to bound cardinality
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                (
+                    ("method", scope["method"]),
+                    ("route", getattr(route, "path", "unmatched")),
+                    ("status", str(status_code)),
+                ),
+            )
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pins clients that just wrote an identity to the primary, whichever worker serves them next.
+
+    The read-your-writes window of ``RecentWrites`` lives in the memory of the process that made
+    the write, so with several workers a follow-up request, such as the login after a sign-up,
+    can land on another worker and read a secondary that has not seen the write yet. This
+    middleware puts the pin in the client instead: a response to a request that wrote an identity
+    sets a cookie holding the time the window ends, and every read of a request carrying an
+    unexpired cookie goes to the primary. Only needed when lookups use non-primary read preferences.
+
+    Args:
+        app: The ASGI application to wrap.
+        cookie_name (Optional[str]): The cookie carrying the pin. Defaults to ``READ_YOUR_WRITES_COOKIE``.
+        window_seconds (Optional[int]): How long a client stays pinned. Defaults to ``READ_YOUR_WRITES_SECONDS``.
+
+    Example:
+        app.add_middleware(ReadYourWritesMiddleware)
+    """
+
+    def __init__(self, app, cookie_name: Optional[str] = None, window_seconds: Optional[int] = None):
+        settings = get_settings()
+        self.app = app
+        self.cookie_name = cookie_name or settings.READ_YOUR_WRITES_COOKIE
+        self.window_seconds = window_seconds if window_seconds is not None else settings.READ_YOUR_WRITES_SECONDS
+
+    def _pinned(self, scope, now: float) -> bool:
+        for name, value in scope.get("headers", ()):
+            if name == b"cookie":
+                until = cookie_parser(value.decode("latin-1")).get(self.cookie_name)
+                try:
+                    # Values further out than one window are not ours and are ignored
+                    return now < int(until) <= now + self.window_seconds
+                except (TypeError, ValueError):
+                    return False
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        now = time.time()
+        with track_request_writes() as writes:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start" and writes.wrote:
+                    cookie = (
+                        f"{self.cookie_name}={int(now) + self.window_seconds}; Max-Age={self.window_seconds}; "
+                        f"Path=/; HttpOnly; SameSite=Lax"
+                    )
+                    message = {**message, "headers": [*message.get("headers", ()), (b"set-cookie", cookie.encode("latin-1"))]}
+                await send(message)
+
+            with primary_reads() if self._pinned(scope, now) else nullcontext():
+                await self.app(scope, receive, send_wrapper)
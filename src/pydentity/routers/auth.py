@@ -0,0 +1,65 @@
+"""Login routes."""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.security import OAuth2PasswordRequestForm
+
+from pydentity.core.deps import get_auth_service, get_request_tenant
+from pydentity.core.schemas.auth import PasswordReset, SSOLogin, Token
+from pydentity.core.services import AuthService
+from pydentity.core.tenancy import tenant_context
+
+
+router = APIRouter(tags=["auth"])
+
+
+def client_source(request: Request) -> Optional[str]:
+    """
+    Return the address a request came from, as counted by the login throttle's per-source limit.
+
+    Behind a proxy this is the proxy's address unless the server trusts its forwarding headers,
+    e.g. uvicorn with ``--proxy-headers`` and ``--forwarded-allow-ips``.
+    """
+    return request.client.host if request.client is not None else None
+
+
+@router.post("/token", response_model=Token)
+async def login(
+    form: OAuth2PasswordRequestForm = Depends(),
+    source: Optional[str] = Depends(client_source),
+    tenant_id: Optional[str] = Depends(get_request_tenant),
+    auth_service: AuthService = Depends(get_auth_service),
+):
+    """Exchange a username and password for an access token (OAuth2 password flow)."""
+    with tenant_context(tenant_id):
+        user = await auth_service.authenticate_user(form.username, form.password, source=source)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return Token(access_token=auth_service.token_service.create_identity_token(user), token_type="bearer")
+
+
+@router.post("/sso", response_model=Token)
+async def login_sso(
+    sso_login: SSOLogin,
+    tenant_id: Optional[str] = Depends(get_request_tenant),
+    auth_service: AuthService = Depends(get_auth_service),
+):
+    """Exchange a token from an SSO provider for an access token."""
+    with tenant_context(tenant_id):
+        user = await auth_service.authenticate_sso(sso_login.provider, sso_login.token, sso_login.authorization_code)
+    return Token(access_token=auth_service.token_service.create_identity_token(user), token_type="bearer")
+
+
+@router.post("/password-reset", status_code=status.HTTP_202_ACCEPTED, response_class=Response)
+async def request_password_reset(
+    password_reset: PasswordReset,
+    tenant_id: Optional[str] = Depends(get_request_tenant),
+    auth_service: AuthService = Depends(get_auth_service),
+):
+    """Email a password reset token; the response is the same whether or not the address is known."""
+    with tenant_context(tenant_id):
+        await auth_service.request_password_reset(password_reset.email)
@@ -0,0 +1,74 @@
+"""Identity listing and export routes."""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from pydentity.core.deps import get_current_identity, get_identity_service
+from pydentity.core.models import Identity
+from pydentity.core.models.identity import IdentityType, VerificationStatus
+from pydentity.core.pagination import KeysetOrder
+from pydentity.core.schemas.identity import IdentityPage
+from pydentity.core.serialization import FastJSONResponse, get_serializer
+from pydentity.core.services import IdentityService
+
+
+IDENTITIES_READ = "identities:read"
+IDENTITIES_EXPORT = "identities:export"
+
+router = APIRouter(prefix="/identities", tags=["identities"])
+
+
+async def _ensure_permission(identity: Identity, permission: str):
+    if not await identity.has_role_permission(permission):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Permission denied: {permission}")
+
+
+@router.get("", response_model=IdentityPage)
+async def list_identities(
+    after: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+    order_by: KeysetOrder = KeysetOrder.id,
+    identity_type: Optional[IdentityType] = None,
+    is_active: Optional[bool] = None,
+    verification_status: Optional[VerificationStatus] = None,
+    identity_service: IdentityService = Depends(get_identity_service),
+    current_identity: Identity = Depends(get_current_identity),
+):
+    """List identities using keyset pagination; follow ``next_cursor`` until it is null."""
+    await _ensure_permission(current_identity, IDENTITIES_READ)
+    try:
+        identities, next_cursor = await identity_service.list_identities(
+            after=after,
+            limit=limit,
+            order_by=order_by,
+            identity_type=identity_type,
+            is_active=is_active,
+            verification_status=verification_status,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    # Encoded straight from the documents; response_model still documents the page in OpenAPI
+    body = get_serializer(IdentityPage).dump({"items": identities, "next_cursor": next_cursor})
+    return FastJSONResponse(body)
+
+
+@router.get("/export")
+async def export_identities(
+    identity_type: Optional[IdentityType] = None,
+    is_active: Optional[bool] = None,
+    verification_status: Optional[VerificationStatus] = None,
+    identity_service: IdentityService = Depends(get_identity_service),
+    current_identity: Identity = Depends(get_current_identity),
+):
+    """Stream every matching identity as newline-delimited JSON."""
+    await _ensure_permission(current_identity, IDENTITIES_EXPORT)
+    return StreamingResponse(
+        identity_service.export_identities(
+            identity_type=identity_type,
+            is_active=is_active,
+            verification_status=verification_status,
+        ),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="identities.ndjson"'},
+    )
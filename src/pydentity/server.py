@@ -0,0 +1,291 @@
+"""Pre-fork production server for applications using pydentity."""
+import asyncio
+import gc
+import importlib
+import logging
+import os
+import signal
+import socket
+from typing import Any, Dict, Optional
+
+from pydentity.core.config import Settings, get_settings
+
+
+logger = logging.getLogger(__name__)
+
+# Exit status of a worker that could not start; the supervisor then stops instead of forking again
+WORKER_BOOT_FAILED = 3
+
+# Imported in the parent so every worker shares their code and module state copy-on-write
+PRELOAD_MODULES = (
+    "pydentity.core.models",
+    "pydentity.core.schemas",
+    "pydentity.core.services",
+    "pydentity.core.serialization",
+    "pydentity.db",
+    "pydentity.middleware",
+    "pydentity.routers.auth",
+    "pydentity.routers.user",
+    "pydentity.utils.decorators",
+    "pydentity.utils.validators",
+)
+
+
+def load_app(target: str) -> Any:
+    """
+    Import an ASGI application from a ``"module:attribute"`` string.
+
+    Args:
+        target (str): The application, e.g. "myservice.main:app".
+
+    Returns:
+        Any: The application.
+    """
+    module_name, _, attribute = target.partition(":")
+    if not module_name or not attribute:
+        raise ValueError(f"Expected the application as 'module:attribute', got {target!r}")
+    value: Any = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        value = getattr(value, part)
+    return value
+
+
+def preload(app: Any) -> None:
+    """
+    Build the read-only state every worker needs, before the workers are forked.
+
+    Imports the pydentity modules, loads the settings, calibrates the password hashing context,
+    compiles the response serializers and the OpenAPI schema, then moves every object created so
+    far out of the garbage collector's reach with ``gc.freeze()``, so collections in the workers
+    do not touch, and thereby copy, the shared pages.
+
+    Nothing that holds sockets, threads or an event loop may be created here: Motor clients,
+    HTTP clients and background tasks belong in the application's startup, which runs in each
+    worker.
+
+    Args:
+        app (Any): The ASGI application.
+    """
+    for module in PRELOAD_MODULES:
+        importlib.import_module(module)
+
+    from pydentity.core.schemas.identity import IdentityPage
+    from pydentity.core.security import get_password_context
+    from pydentity.core.serialization import get_serializer
+    from pydentity.utils.validators import _email_adapter
+
+    get_settings()
+    get_password_context()
+    get_serializer(IdentityPage)
+    # Loads the email validator and its IDNA tables
+    _email_adapter().validate_python("warm-up@example.com")
+    openapi = getattr(app, "openapi", None)
+    if callable(openapi):
+        openapi()
+
+    gc.collect()
+    gc.freeze()
+
+
+async def warm_up_worker() -> None:
+    """
+    Warm up a worker after the application has started and before it accepts connections.
+
+    Loads the password hashing backend with one dummy verification and, when the application
+    initialized Beanie, opens a database connection, so the first requests a worker serves do
+    not pay for either.
+    """
+    from beanie.exceptions import CollectionWasNotInitialized
+
+    from pydentity.core.models import Identity
+    from pydentity.core.security import get_password_context
+
+    await asyncio.to_thread(get_password_context().dummy_verify)
+    try:
+        collection = Identity.get_motor_collection()
+    except CollectionWasNotInitialized:
+        return
+    await collection.database.command("ping")
+
+
+async def start_background_services() -> None:
+    """
+    Start pydentity's background workers on the running event loop: the email queue and the
+    activity tracker.
+
+    ``serve`` calls this in each worker once the application has started. Applications run
+    another way call it from their lifespan, and ``stop_background_services`` when it ends.
+    """
+    from pydentity.core.services.activity_tracker import get_activity_tracker
+    from pydentity.core.services.email_service import get_email_queue
+
+    try:
+        get_email_queue().start()
+    except ValueError as e:
+        # Without SMTP, account emails are refused when requested rather than queued and lost
+        logger.warning(f"Email delivery is disabled: {e}")
+    get_activity_tracker().start()
+
+
+async def stop_background_services() -> None:
+    """Stop the workers started by ``start_background_services``, delivering and writing what is pending."""
+    from pydentity.core.services.activity_tracker import get_activity_tracker
+    from pydentity.core.services.email_service import get_email_queue
+
+    await asyncio.gather(get_email_queue().stop(), get_activity_tracker().stop())
+
+
+def bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Open the listening socket the workers share."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app: Any, sock: socket.socket, uvicorn_options: Dict[str, Any]) -> bool:
+    """Serve on the shared socket until told to stop; return whether the worker ever started accepting."""
+    import uvicorn
+
+    class WarmServer(uvicorn.Server):
+        async def startup(self, sockets=None) -> None:
+            # Start listening only once the application has started and the worker is warm
+            start_application = self.lifespan.startup
+            stop_application = self.lifespan.shutdown
+
+            async def start_and_warm_up() -> None:
+                await start_application()
+                if not self.lifespan.should_exit:
+                    await start_background_services()
+                    await warm_up_worker()
+
+            async def stop_services_first() -> None:
+                # Connections are closed by now; finish background work while the application's
+                # resources, e.g. its database client, are still open
+                await stop_background_services()
+                await stop_application()
+
+            self.lifespan.startup = start_and_warm_up
+            self.lifespan.shutdown = stop_services_first
+            await super().startup(sockets)
+
+    config = uvicorn.Config(app, **uvicorn_options)
+    server = WarmServer(config)
+    config.setup_event_loop()
+    asyncio.run(server.serve(sockets=[sock]))
+    return server.started
+
+
+class Supervisor:
+    """
+    Forks the workers, replaces those that die and stops them on SIGINT or SIGTERM.
+
+    Args:
+        app (Any): The preloaded ASGI application.
+        sock (socket.socket): The shared listening socket.
+        workers (int): The number of worker processes to keep running.
+        uvicorn_options (Dict[str, Any]): Keyword arguments for ``uvicorn.Config``.
+    """
+
+    def __init__(self, app: Any, sock: socket.socket, workers: int, uvicorn_options: Dict[str, Any]):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.uvicorn_options = uvicorn_options
+        self.children: Dict[int, int] = {}
+        self.stopping = False
+        self.boot_failed = False
+
+    def run(self) -> None:
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+        for slot in range(self.workers):
+            self._spawn(slot)
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            slot = self.children.pop(pid, None)
+            if slot is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if code == WORKER_BOOT_FAILED:
+                logger.error(f"Worker {pid} failed to start; stopping")
+                self.boot_failed = True
+                self._stop(signal.SIGTERM, None)
+                continue
+            logger.warning(f"Worker {pid} exited with status {code}; starting a new one")
+            self._spawn(slot)
+        self.sock.close()
+        if self.boot_failed:
+            raise SystemExit(WORKER_BOOT_FAILED)
+
+    def _spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = slot
+            return
+        # In the worker: uvicorn installs its own signal handlers
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 1
+        try:
+            code = 0 if _run_worker(self.app, self.sock, self.uvicorn_options) else WORKER_BOOT_FAILED
+        except BaseException:
+            logger.exception(f"Worker {os.getpid()} failed")
+        finally:
+            os._exit(code)
+
+    def _stop(self, signum: int, frame: Any) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+def serve(
+    app: Any,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    workers: Optional[int] = None,
+    settings: Optional[Settings] = None,
+    **uvicorn_options: Any,
+) -> None:
+    """
+    Run an application in pre-forked uvicorn workers sharing one listening socket.
+
+    The parent imports the application and runs ``preload`` once, then forks the workers, so
+    modules and read-only state are shared copy-on-write instead of being rebuilt per worker.
+    Each worker runs the application's startup, ``start_background_services`` and
+    ``warm_up_worker`` before it starts accepting connections, and stops the background services
+    before the application's shutdown; until then the kernel hands new connections to workers that are ready. Workers
+    that die are replaced, unless one fails to start. SIGINT or SIGTERM stops the workers gracefully.
+
+    Args:
+        app (Any): The ASGI application, or a "module:attribute" string.
+        host (Optional[str]): The address to bind. Defaults to ``SERVER_HOST``.
+        port (Optional[int]): The port to bind. Defaults to ``SERVER_PORT``.
+        workers (Optional[int]): The number of worker processes. Defaults to ``SERVER_WORKERS``, which is one: login
+            throttling and metrics are kept per worker, see the README before raising it.
+        settings (Optional[Settings]): The settings. Defaults to ``get_settings()``.
+        **uvicorn_options: Extra keyword arguments for ``uvicorn.Config``, e.g. log_level.
+    """
+    settings = settings or get_settings()
+    if isinstance(app, str):
+        app = load_app(app)
+    workers = workers or settings.SERVER_WORKERS
+    sock = bind(host or settings.SERVER_HOST, port or settings.SERVER_PORT)
+    preload(app)
+    logger.info(f"Serving on {sock.getsockname()} with {workers} worker(s)")
+
+    if workers == 1:
+        if not _run_worker(app, sock, uvicorn_options):
+            raise SystemExit(WORKER_BOOT_FAILED)
+        return
+    Supervisor(app, sock, workers, uvicorn_options).run()
@@ -1,20 +1,39 @@
-from .decorators import (
-    require_permissions,
-    require_any_permission,
-    require_claims,
-    require_any_claim,
-    require_identity_type
-)
-from .validators import validate_password, validate_email, validate_username, validate_api_key
+from typing import TYPE_CHECKING
 
-__all__ = [
-    "require_permissions",
-    "require_any_permission",
-    "require_claims",
-    "require_any_claim",
-    "require_identity_type",
-    "validate_password",
-    "validate_email",
-    "validate_username",
-    "validate_api_key"
-]
\ No newline at end of file
+from pydentity._lazy import attach
+
+__getattr__, __dir__, __all__ = attach(__name__, {
+    "require_permissions": ".decorators",
+    "require_any_permission": ".decorators",
+    "require_claims": ".decorators",
+    "require_any_claim": ".decorators",
+    "require_identity_type": ".decorators",
+    "require_policy": ".decorators",
+    "validate_password": ".validators",
+    "validate_email": ".validators",
+    "validate_username": ".validators",
+    "validate_api_key": ".validators",
+    "password_errors": ".validators",
+    "validate_passwords": ".validators",
+    "validate_emails": ".validators",
+    "validate_usernames": ".validators",
+    "validate_api_keys": ".validators",
+})
+
+if TYPE_CHECKING:
+    from .decorators import (
+        require_permissions,
+        require_any_permission,
+        require_claims,
+        require_any_claim,
+        require_identity_type,
+        require_policy
+    )
+    from .validators import validate_password, validate_email, validate_username, validate_api_key
+    from .validators import (
+        password_errors,
+        validate_passwords,
+        validate_emails,
+        validate_usernames,
+        validate_api_keys
+    )
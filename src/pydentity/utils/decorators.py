@@ -1,10 +1,11 @@
-# src/pyidentity/utils/decorators.py
+# src/pydentity/utils/decorators.py
 
 from functools import wraps
 from fastapi import HTTPException, Depends
-from typing import Dict, List, Union
-from pyidentity.core.models import Identity, User, Agent
-from pyidentity.core.services import get_current_identity
+from typing import Dict, FrozenSet, List, Tuple, Union
+from pydentity.core.models import Agent, Identity, IdentityType, User
+from pydentity.core.deps import get_current_identity
+from pydentity.core.policy import Policy
 
 def require_permissions(permissions: Union[str, List[str]]):
     if isinstance(permissions, str):
@@ -14,7 +15,7 @@ def require_permissions(permissions: Union[str, List[str]]):
         @wraps(func)
         async def wrapper(*args, current_identity: Identity = Depends(get_current_identity), **kwargs):
             for permission in permissions:
-                if not await current_identity.has_permission(permission):
+                if not await current_identity.has_role_permission(permission):
                     raise HTTPException(status_code=403, detail=f"Permission denied: {permission}")
             return await func(*args, current_identity=current_identity, **kwargs)
         return wrapper
@@ -25,7 +26,7 @@ def require_any_permission(permissions: List[str]):
         @wraps(func)
         async def wrapper(*args, current_identity: Identity = Depends(get_current_identity), **kwargs):
             for permission in permissions:
-                if await current_identity.has_permission(permission):
+                if await current_identity.has_role_permission(permission):
                     return await func(*args, current_identity=current_identity, **kwargs)
             raise HTTPException(status_code=403, detail="Permission denied")
         return wrapper
@@ -45,28 +46,68 @@ def require_identity_type(allowed_types: Union[IdentityType, List[IdentityType]]
     return decorator
 
 """ Claims-based decorators """
+def _normalize_claims(claims: Dict[str, Union[str, List[str]]]) -> List[Tuple[str, FrozenSet[str]]]:
+    # Done once per decorated route, so requests only test set membership
+    return [(claim_type, frozenset([values] if isinstance(values, str) else values)) for claim_type, values in claims.items()]
+
 def require_claims(claims: Dict[str, Union[str, List[str]]]):
+    required = _normalize_claims(claims)
+
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, current_identity: Identity = Depends(get_current_identity), **kwargs):
-            for claim_type, claim_values in claims.items():
-                if isinstance(claim_values, str):
-                    claim_values = [claim_values]
-                if claim_type not in current_identity.claims or not any(value in current_identity.claims[claim_type] for value in claim_values):
+            held = current_identity.claims
+            for claim_type, claim_values in required:
+                values = held.get(claim_type)
+                if values is None or claim_values.isdisjoint(values):
                     raise HTTPException(status_code=403, detail=f"Required claim not found: {claim_type}")
             return await func(*args, current_identity=current_identity, **kwargs)
         return wrapper
     return decorator
 
 def require_any_claim(claims: Dict[str, Union[str, List[str]]]):
+    accepted = _normalize_claims(claims)
+
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, current_identity: Identity = Depends(get_current_identity), **kwargs):
-            for claim_type, claim_values in claims.items():
-                if isinstance(claim_values, str):
-                    claim_values = [claim_values]
-                if claim_type in current_identity.claims and any(value in current_identity.claims[claim_type] for value in claim_values):
+            held = current_identity.claims
+            for claim_type, claim_values in accepted:
+                values = held.get(claim_type)
+                if values is not None and not claim_values.isdisjoint(values):
                     return await func(*args, current_identity=current_identity, **kwargs)
             raise HTTPException(status_code=403, detail="Required claims not found")
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
+
+def require_policy(policy: Union[str, Policy]):
+    """
+    Allow the route only to identities whose claims satisfy a policy expression.
+
+    The expression is compiled when the route is decorated, so a syntax error surfaces at import
+    time and each request only evaluates the compiled policy. See ``Policy`` for the grammar.
+
+    Args:
+        policy (Union[str, Policy]): The expression, e.g. "(dept in {eng, ops}) and clearance >= 3 and not suspended".
+
+    Raises:
+        PolicySyntaxError: If the expression cannot be parsed.
+
+    Example:
+        @router.get("/reports")
+        @require_policy("dept in {finance, audit} and not suspended")
+        async def reports(current_identity: Identity = Depends(get_current_identity)):
+            ...
+    """
+    if isinstance(policy, str):
+        policy = Policy(policy)
+    check = policy.allows
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, current_identity: Identity = Depends(get_current_identity), **kwargs):
+            if not check(current_identity):
+                raise HTTPException(status_code=403, detail="Policy not satisfied")
+            return await func(*args, current_identity=current_identity, **kwargs)
+        return wrapper
+    return decorator
@@ -1,55 +1,90 @@
 import re
-from pydantic import EmailStr, ValidationError
+import string
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+from pydantic import EmailStr, TypeAdapter, ValidationError
 
 from pydentity.core.config import get_settings
 
 
-settings = get_settings()
+USERNAME_PATTERN = re.compile(r"[a-zA-Z][a-zA-Z0-9_-]{2,29}")
+API_KEY_PATTERN = re.compile(r"[a-fA-F0-9]{32}")
+
+PASSWORD_SPECIAL_CHARACTERS = frozenset('!@#$%^&*(),.?":{}|<>')
+_UPPERCASE = frozenset(string.ascii_uppercase)
+_LOWERCASE = frozenset(string.ascii_lowercase)
+_DIGITS = frozenset(string.digits)
+
+# Rule names reported by password_errors, in the order they are checked
+PASSWORD_RULES = ("min_length", "uppercase", "lowercase", "digit", "special")
+
+
+@lru_cache()
+def _email_adapter() -> TypeAdapter:
+    return TypeAdapter(EmailStr)
+
+
+def password_errors(password: str, min_length: Optional[int] = None) -> List[str]:
+    """
+    Check the password against every rule and return the names of the rules it fails.
+
+    The character classes are tested against the set of distinct characters, so the
+    password is scanned once however many rules there are.
+
+    Rules:
+    1. min_length: Minimum length as defined in settings
+    2. uppercase: At least one uppercase letter
+    3. lowercase: At least one lowercase letter
+    4. digit: At least one digit
+    5. special: At least one special character
+
+    :param password: The password to validate
+    :param min_length: The minimum length; defaults to MIN_PASSWORD_LENGTH from settings
+    :return: The failed rule names, empty if the password is valid
+    """
+    if min_length is None:
+        min_length = get_settings().MIN_PASSWORD_LENGTH
+    characters = set(password)
+    errors = []
+    if len(password) < min_length:
+        errors.append("min_length")
+    if characters.isdisjoint(_UPPERCASE):
+        errors.append("uppercase")
+    if characters.isdisjoint(_LOWERCASE):
+        errors.append("lowercase")
+    if characters.isdisjoint(_DIGITS):
+        errors.append("digit")
+    if characters.isdisjoint(PASSWORD_SPECIAL_CHARACTERS):
+        errors.append("special")
+    return errors
+
 
 def validate_password(password: str) -> bool:
     """
     Validate the password against the defined rules.
-    
+
     Rules:
     1. Minimum length as defined in settings
     2. At least one uppercase letter
     3. At least one lowercase letter
     4. At least one digit
     5. At least one special character
-    
+
     :param password: The password to validate
     :return: True if valid, False otherwise
     """
-    if len(password) < settings.MIN_PASSWORD_LENGTH:
-        return False
-    
-    # Check for at least one uppercase letter
-    if not re.search(r"[A-Z]", password):
-        return False
-    
-    # Check for at least one lowercase letter
-    if not re.search(r"[a-z]", password):
-        return False
-    
-    # Check for at least one digit
-    if not re.search(r"\d", password):
-        return False
-    
-    # Check for at least one special character
-    if not re.search(r"[!@#$%^&*(),.?\":{}|<>]", password):
-        return False
-    
-    return True
+    return not password_errors(password)
 
 def validate_email(email: str) -> bool:
     """
     Validate the email using Pydantic's EmailStr.
-    
+
     :param email: The email to validate
     :return: True if valid, False otherwise
     """
     try:
-        EmailStr.validate(email)
+        _email_adapter().validate_python(email)
         return True
     except ValidationError:
         return False
@@ -57,28 +92,77 @@ def validate_email(email: str) -> bool:
 def validate_username(username: str) -> bool:
     """
     Validate the username against defined rules.
-    
+
     Rules:
     1. 3-30 characters long
     2. Can contain letters, numbers, underscores, and hyphens
     3. Must start with a letter
-    
+
     :param username: The username to validate
     :return: True if valid, False otherwise
     """
-    username_pattern = r"^[a-zA-Z][a-zA-Z0-9_-]{2,29}$"
-    return bool(re.match(username_pattern, username))
+    return USERNAME_PATTERN.fullmatch(username) is not None
 
 def validate_api_key(api_key: str) -> bool:
     """
     Validate the API key format.
-    
+
     Rules:
     1. 32 characters long
     2. Contains only hexadecimal characters
-    
+
     :param api_key: The API key to validate
     :return: True if valid, False otherwise
     """
-    api_key_pattern = r"^[a-fA-F0-9]{32}$"
-    return bool(re.match(api_key_pattern, api_key))
\ No newline at end of file
+    return API_KEY_PATTERN.fullmatch(api_key) is not None
+
+
+""" Batch validators """
+def validate_passwords(passwords: Iterable[str]) -> List[List[str]]:
+    """
+    Validate a column of passwords.
+
+    Settings are read once for the whole batch.
+
+    :param passwords: The passwords to validate
+    :return: One list of failed rule names per password, in input order
+    """
+    min_length = get_settings().MIN_PASSWORD_LENGTH
+    return [password_errors(password, min_length) for password in passwords]
+
+def validate_emails(emails: Iterable[str]) -> List[bool]:
+    """
+    Validate a column of emails.
+
+    :param emails: The emails to validate
+    :return: One result per email, in input order
+    """
+    validate = _email_adapter().validate_python
+    results = []
+    for email in emails:
+        try:
+            validate(email)
+            results.append(True)
+        except ValidationError:
+            results.append(False)
+    return results
+
+def validate_usernames(usernames: Iterable[str]) -> List[bool]:
+    """
+    Validate a column of usernames.
+
+    :param usernames: The usernames to validate
+    :return: One result per username, in input order
+    """
+    fullmatch = USERNAME_PATTERN.fullmatch
+    return [fullmatch(username) is not None for username in usernames]
+
+def validate_api_keys(api_keys: Iterable[str]) -> List[bool]:
+    """
+    Validate a column of API keys.
+
+    :param api_keys: The API keys to validate
+    :return: One result per API key, in input order
+    """
+    fullmatch = API_KEY_PATTERN.fullmatch
+    return [fullmatch(api_key) is not None for api_key in api_keys]
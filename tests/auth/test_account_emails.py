@@ -0,0 +1,101 @@
+# tests/auth/test_account_emails.py
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+
+from pydentity.core.models import IdentityType, User, VerificationStatus
+from pydentity.core.services import auth_service
+from pydentity.core.services.auth_service import AuthService
+from pydentity.core.services.token_service import TokenService
+
+
+class QueueStandIn:
+    """Records queued messages, or fails like a stopped or full EmailQueue."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.messages = []
+
+    def enqueue(self, message):
+        if self.error is not None:
+            raise self.error
+        self.messages.append(message)
+
+
+@pytest_asyncio.fixture
+async def user(identities_db):
+    user = User(username="alice01", email="alice@example.com", hashed_password="hash", identity_type=IdentityType.user)
+    await user.insert()
+    return user
+
+
+def use_queue(monkeypatch, queue):
+    monkeypatch.setattr(auth_service, "get_email_queue", lambda: queue)
+    return queue
+
+
+@pytest.mark.asyncio
+async def test_verification_email_carries_a_redeemable_token(user, monkeypatch):
+    queue = use_queue(monkeypatch, QueueStandIn())
+    service = AuthService(TokenService())
+
+    assert await service.request_email_verification(user)
+    assert (await User.get(user.id)).verification_status == VerificationStatus.pending
+    token = queue.messages[0].get_content().split("\n\n")[2].strip()
+    confirmed = await service.confirm_email(token)
+    assert confirmed.verification_status == VerificationStatus.verified
+
+    assert not await service.request_email_verification(confirmed)
+    assert len(queue.messages) == 1
+
+
+@pytest.mark.asyncio
+async def test_verification_email_can_be_sent_again_while_pending(user, monkeypatch):
+    queue = use_queue(monkeypatch, QueueStandIn())
+    service = AuthService(TokenService())
+
+    assert await service.request_email_verification(user)
+    assert await service.request_email_verification(await User.get(user.id))
+    first, second = [message.get_content().split("\n\n")[2].strip() for message in queue.messages]
+
+    assert (await service.confirm_email(second)).verification_status == VerificationStatus.verified
+    # Both tokens were bound to the pending status, so redeeming one spent the other
+    with pytest.raises(HTTPException) as spent:
+        await service.confirm_email(first)
+    assert spent.value.status_code == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("error", [RuntimeError("not started"), asyncio.QueueFull()])
+async def test_verification_is_not_saved_when_the_email_cannot_be_queued(user, monkeypatch, error):
+    use_queue(monkeypatch, QueueStandIn(error))
+
+    with pytest.raises(HTTPException) as unavailable:
+        await AuthService(TokenService()).request_email_verification(user)
+    assert unavailable.value.status_code == 503
+    assert user.verification_status == VerificationStatus.unverified
+    assert (await User.get(user.id)).verification_status == VerificationStatus.unverified
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("error", [RuntimeError("not started"), asyncio.QueueFull()])
+async def test_password_reset_requests_look_the_same_when_the_email_cannot_be_queued(user, monkeypatch, error):
+    use_queue(monkeypatch, QueueStandIn(error))
+    service = AuthService(TokenService())
+
+    assert await service.request_password_reset("alice@example.com") is None
+    assert await service.request_password_reset("nobody@example.com") is None
+
+
+@pytest.mark.asyncio
+async def test_password_reset_email(user, monkeypatch):
+    queue = use_queue(monkeypatch, QueueStandIn())
+    service = AuthService(TokenService())
+
+    await service.request_password_reset("alice@example.com")
+    token = queue.messages[0].get_content().split("\n\n")[2].strip()
+    changed = await service.reset_password(token, "a new password 123")
+    assert service.verify_password("a new password 123", changed.hashed_password)
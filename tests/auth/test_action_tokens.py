@@ -0,0 +1,86 @@
+# tests/auth/test_action_tokens.py
+
+import time
+from types import SimpleNamespace
+
+import jwt
+import pytest
+import pytest_asyncio
+from jose import JWTError
+
+from pydentity.core.models import Identity, IdentityType, VerificationStatus
+from pydentity.core.services.token_service import InvalidActionToken, TokenPurpose, TokenService
+from pydentity.core.tenancy import tenant_context
+
+
+@pytest_asyncio.fixture
+async def identity(mongo_db):
+    with tenant_context("acme"):
+        identity = Identity(username="alice01", identity_type=IdentityType.user, verification_status=VerificationStatus.pending)
+        await identity.insert()
+    return identity
+
+
+@pytest.mark.asyncio
+async def test_action_token_round_trip(identity):
+    service = TokenService()
+    token = service.create_action_token(identity, TokenPurpose.email_verification)
+
+    verified = await service.verify_action_token(token, TokenPurpose.email_verification, model=Identity)
+    assert verified.id == identity.id
+    assert verified.tenant_id == "acme"
+
+
+@pytest.mark.asyncio
+async def test_action_token_is_spent_when_the_bound_state_changes(identity):
+    service = TokenService()
+    token = service.create_action_token(identity, TokenPurpose.email_verification)
+
+    with tenant_context("acme"):
+        identity.verification_status = VerificationStatus.verified
+        await identity.save()
+
+    with pytest.raises(InvalidActionToken):
+        await service.verify_action_token(token, TokenPurpose.email_verification, model=Identity)
+
+
+@pytest.mark.asyncio
+async def test_action_token_is_bound_to_its_purpose(identity):
+    service = TokenService()
+    token = service.create_action_token(identity, TokenPurpose.email_verification)
+
+    with pytest.raises(InvalidActionToken):
+        await service.verify_action_token(token, TokenPurpose.password_reset, model=Identity)
+    with pytest.raises(JWTError):
+        service.decode_token(token)
+    with pytest.raises(InvalidActionToken):
+        await service.verify_action_token(token[:-2], TokenPurpose.email_verification, model=Identity)
+
+
+@pytest.mark.asyncio
+async def test_expired_action_token_is_rejected(identity, monkeypatch):
+    service = TokenService()
+    monkeypatch.setattr(service.settings, "EMAIL_VERIFICATION_TOKEN_EXPIRE_HOURS", -1)
+    token = service.create_action_token(identity, TokenPurpose.email_verification)
+
+    with pytest.raises(InvalidActionToken):
+        await service.verify_action_token(token, TokenPurpose.email_verification, model=Identity)
+
+
+def test_action_token_expiry_is_a_numeric_date(identity):
+    service = TokenService()
+    before = int(time.time())
+    token = service.create_action_token(identity, TokenPurpose.password_reset)
+
+    expires = jwt.decode(token, options={"verify_signature": False})["exp"]
+    lifetime = service.settings.PASSWORD_RESET_TOKEN_EXPIRE_HOURS * 3600
+    assert isinstance(expires, int)
+    assert before + lifetime <= expires <= int(time.time()) + lifetime
+
+
+def test_password_reset_fingerprint_follows_the_password_hash():
+    service = TokenService()
+    user = SimpleNamespace(hashed_password="$2b$12$old", verification_status=VerificationStatus.verified)
+    before = service.fingerprint(user, TokenPurpose.password_reset)
+    user.hashed_password = "$2b$12$new"
+    assert service.fingerprint(user, TokenPurpose.password_reset) != before
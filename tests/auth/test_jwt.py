@@ -0,0 +1,116 @@
+# tests/auth/test_jwt.py
+
+import base64
+import json
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+
+from pydentity.core.config import get_settings
+from pydentity.core.jwt_backends import InvalidToken, JoseBackend, PyJWTBackend
+from pydentity.core.services import token_service
+from pydentity.core.services.token_service import TokenService
+
+
+def private_pem(key) -> str:
+    return key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()).decode()
+
+
+def public_pem(key) -> str:
+    return key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo).decode()
+
+
+RSA_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+ED25519_KEY = ed25519.Ed25519PrivateKey.generate()
+SECRET = "test-secret-key-test-secret-key-1234"
+
+# (algorithm, signing key, verification key)
+KEYS = {
+    "HS256": (SECRET, SECRET),
+    "RS256": (private_pem(RSA_KEY), public_pem(RSA_KEY)),
+    "EdDSA": (private_pem(ED25519_KEY), public_pem(ED25519_KEY)),
+}
+CASES = [(backend, algorithm) for backend in (PyJWTBackend, JoseBackend) for algorithm in KEYS
+         if not (backend is JoseBackend and algorithm == "EdDSA")]
+
+
+def segment(value: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).rstrip(b"=").decode()
+
+
+@pytest.mark.parametrize("backend_class, algorithm", CASES)
+def test_round_trip(backend_class, algorithm):
+    backend = backend_class()
+    signing_key, verifying_key = KEYS[algorithm]
+    claims = {"sub": "alice01", "exp": int(time.time()) + 60}
+
+    token = backend.encode(claims, signing_key, algorithm)
+    assert backend.decode(token, verifying_key, [algorithm]) == claims
+    # A private key verifies with its public half
+    assert backend.decode(token, signing_key, [algorithm]) == claims
+
+
+@pytest.mark.parametrize("algorithm", ["HS256", "RS256"])
+def test_backends_read_each_others_tokens(algorithm):
+    fast, jose = PyJWTBackend(), JoseBackend()
+    signing_key, verifying_key = KEYS[algorithm]
+    claims = {"sub": "bob0001", "tid": "acme", "exp": int(time.time()) + 60}
+
+    assert jose.decode(fast.encode(claims, signing_key, algorithm), verifying_key, [algorithm]) == claims
+    assert fast.decode(jose.encode(claims, signing_key, algorithm), verifying_key, [algorithm]) == claims
+
+
+@pytest.mark.parametrize("backend_class, algorithm", CASES)
+def test_rejects_bad_tokens(backend_class, algorithm):
+    backend = backend_class()
+    signing_key, verifying_key = KEYS[algorithm]
+    token = backend.encode({"sub": "carol01", "exp": int(time.time()) + 60}, signing_key, algorithm)
+    header, payload, signature = token.split(".")
+
+    forged = segment({"sub": "admin", "exp": int(time.time()) + 60})
+    bad_tokens = [
+        f"{header}.{forged}.{signature}",
+        token[:-4] + ("AAAA" if not token.endswith("AAAA") else "BBBB"),
+        f"{header}.{payload}",
+        "not-a-token",
+        backend.encode({"sub": "carol01", "exp": int(time.time()) - 10}, signing_key, algorithm),
+        backend.encode({"sub": "carol01", "aud": "elsewhere"}, signing_key, algorithm),
+    ]
+    for bad_token in bad_tokens:
+        with pytest.raises(InvalidToken):
+            backend.decode(bad_token, verifying_key, [algorithm])
+
+
+@pytest.mark.parametrize("backend_class", [PyJWTBackend, JoseBackend])
+def test_rejects_disallowed_algorithms(backend_class):
+    backend = backend_class()
+    hs384 = backend.encode({"sub": "dave01"}, SECRET, "HS384")
+    unsigned = f"{segment({'alg': 'none', 'typ': 'JWT'})}.{segment({'sub': 'dave01'})}."
+
+    for token in (hs384, unsigned):
+        with pytest.raises(InvalidToken):
+            backend.decode(token, SECRET, ["HS256"])
+
+
+def test_datetime_time_claims_are_encoded_as_numeric_dates():
+    backend = PyJWTBackend()
+    expires = datetime.utcnow().replace(microsecond=0) + timedelta(minutes=5)
+    claims = backend.decode(backend.encode({"sub": "erin01", "exp": expires}, SECRET, "HS256"), SECRET, ["HS256"])
+    assert claims["exp"] == int((expires - datetime(1970, 1, 1)).total_seconds())
+
+
+def test_token_service_signs_with_the_configured_algorithm(monkeypatch):
+    settings = get_settings().model_copy(update={"ALGORITHM": "EdDSA", "JWT_PRIVATE_KEY": KEYS["EdDSA"][0]})
+    monkeypatch.setattr(token_service, "get_settings", lambda: settings)
+    service = TokenService()
+    data = {"sub": "frank01"}
+
+    token = service.create_access_token(data)
+    assert data == {"sub": "frank01"}
+    assert service.decode_token(token)["sub"] == "frank01"
+    assert PyJWTBackend().decode(token, KEYS["EdDSA"][1], ["EdDSA"])["sub"] == "frank01"
+    with pytest.raises(InvalidToken):
+        TokenService().decode_token(PyJWTBackend().encode({"sub": "frank01"}, SECRET, "HS256"))
@@ -0,0 +1,69 @@
+# tests/auth/test_password.py
+
+from types import SimpleNamespace
+
+from passlib.context import CryptContext
+
+from pydentity.core import security
+from pydentity.core.security import (
+    BCRYPT_MIN_ROUNDS,
+    calibrate_bcrypt_rounds,
+    hashing_policy,
+)
+
+
+def make_settings(**overrides):
+    values = dict(
+        PASSWORD_HASH_SCHEMES=["bcrypt"],
+        PASSWORD_HASH_TARGET_MS=None,
+        BCRYPT_ROUNDS=None,
+        ARGON2_TIME_COST=None,
+        ARGON2_MEMORY_COST=65536,
+        ARGON2_PARALLELISM=2,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def test_calibrate_bcrypt_rounds_stays_within_bounds():
+    assert calibrate_bcrypt_rounds(0, samples=1) == BCRYPT_MIN_ROUNDS
+    assert calibrate_bcrypt_rounds(10_000_000, max_rounds=12, samples=1) == 12
+
+
+def test_hashing_policy_uses_explicit_rounds():
+    policy = hashing_policy(make_settings(BCRYPT_ROUNDS=11, PASSWORD_HASH_TARGET_MS=1000))
+    assert policy["bcrypt__default_rounds"] == 11
+    assert policy["bcrypt__min_rounds"] == 11
+    assert "bcrypt__max_rounds" not in policy
+
+
+def test_calibrated_rounds_only_deprecate_hashes_below_the_floor(monkeypatch):
+    monkeypatch.setattr(security, "calibrate_bcrypt_rounds", lambda target_ms: 11)
+    context = CryptContext(**hashing_policy(make_settings(PASSWORD_HASH_TARGET_MS=250)))
+    assert context.to_dict()["bcrypt__default_rounds"] == 11
+
+    # Hashes made by workers that calibrated differently are kept
+    for rounds in (BCRYPT_MIN_ROUNDS, 12):
+        assert not context.needs_update(CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=rounds).hash("Secret123!"))
+    assert context.needs_update(CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=BCRYPT_MIN_ROUNDS - 1).hash("Secret123!"))
+
+
+def test_hashing_policy_without_target_keeps_passlib_defaults():
+    policy = hashing_policy(make_settings())
+    assert policy == {"schemes": ["bcrypt"], "deprecated": "auto"}
+
+
+def test_outdated_hash_is_upgraded_on_verify():
+    old_context = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=10)
+    new_context = CryptContext(**hashing_policy(make_settings(BCRYPT_ROUNDS=11)))
+    stored = old_context.hash("Secret123!")
+
+    assert new_context.needs_update(stored)
+    verified, new_hash = new_context.verify_and_update("Secret123!", stored)
+    assert verified
+    assert new_hash is not None
+    assert not new_context.needs_update(new_hash)
+
+    verified, new_hash = new_context.verify_and_update("wrong", stored)
+    assert not verified
+    assert new_hash is None
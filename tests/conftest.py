@@ -1,30 +1,38 @@
 # tests/conftest.py
 
-import pytest
-import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
+import pytest_asyncio
 from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+
 from pydentity.core.config import get_settings
-from pydentity.models import User, Agent, Identity, Role
-
-@pytest.fixture(scope="session")
-def event_loop():
-    loop = asyncio.get_event_loop_policy().new_event_loop()
-    yield loop
-    loop.close()
-
-@pytest.fixture(scope="session")
-async def db():
-    settings = get_settings()
-    client = AsyncIOMotorClient(settings.TEST_MONGODB_URL)
-    await init_beanie(database=client[settings.TEST_MONGODB_DB_NAME], document_models=[User, Agent, Identity, Role])
-    yield
-    await client.drop_database(settings.TEST_MONGODB_DB_NAME)
+from pydentity.core.models import Agent, Identity, IdentityLog, IdentityLogRollup, Role, User
+
+DOCUMENT_MODELS = [Identity, User, Agent, Role, IdentityLog, IdentityLogRollup]
+
+# Unique indexes that only cover users with an email address or an SSO identity. mongomock
+# ignores partial filters, so they would make every identity without these fields collide
+PARTIAL_INDEXES = ("tenant_email", "tenant_sso")
+
+
+@pytest_asyncio.fixture
+async def mongo_db():
+    """An empty in-memory database with every document model initialised on it."""
+    client = AsyncMongoMockClient()
+    database = client[get_settings().TEST_MONGODB_DB_NAME]
+    await init_beanie(database=database, document_models=DOCUMENT_MODELS)
+    yield database
     client.close()
 
-@pytest.fixture
-async def clear_db(db):
-    yield
-    await User.delete_all()
-    await Agent.delete_all()
-    await Role.delete_all()
\ No newline at end of file
+
+@pytest_asyncio.fixture
+async def identities_db(mongo_db):
+    """``mongo_db`` without the partial unique indexes mongomock cannot honour."""
+    for index in PARTIAL_INDEXES:
+        await User.get_motor_collection().drop_index(index)
+    yield mongo_db
+
+
+@pytest_asyncio.fixture
+async def clear_db(identities_db):
+    """Every test gets a database of its own, so there is nothing to clear afterwards."""
+    yield identities_db
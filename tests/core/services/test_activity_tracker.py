@@ -0,0 +1,133 @@
+# tests/core/services/test_activity_tracker.py
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from pydentity.core.config import get_settings
+from pydentity.core.models import Agent, IdentityType, User
+from pydentity.core.services.activity_tracker import ActivityTracker
+from pydentity.core.tenancy import tenant_context
+
+T0 = datetime(2024, 1, 1, 12, 0, 0)
+# mongomock cannot compare $max values with nulls, so the stored timestamps start in the past
+BEFORE = T0 - timedelta(days=1)
+
+
+def make_tracker(**overrides):
+    return ActivityTracker(get_settings().model_copy(update=overrides))
+
+
+async def make_user(username, last_login=BEFORE):
+    user = User(username=username, email=f"{username}@example.com", hashed_password="hash", identity_type=IdentityType.user, last_login=last_login)
+    await user.insert()
+    return user
+
+
+async def stored(model, identity, field):
+    document = await model.get_motor_collection().find_one({"_id": identity.id})
+    return document.get(field)
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_the_latest_timestamp_per_identity(identities_db):
+    tracker = make_tracker()
+    alice = await make_user("alice")
+    agent = Agent(username="agent01", identity_type=IdentityType.agent, api_key="k" * 32, last_active=BEFORE)
+    await agent.insert()
+
+    tracker.record(alice, "last_login", T0 + timedelta(minutes=5))
+    tracker.record(alice, "last_login", T0)
+    tracker.record(agent, "last_active", T0)
+    assert tracker.pending == 2
+    assert await stored(User, alice, "last_login") == BEFORE
+
+    assert await tracker.flush() == 2
+    assert tracker.pending == 0
+    assert await stored(User, alice, "last_login") == T0 + timedelta(minutes=5)
+    assert await stored(Agent, agent, "last_active") == T0
+
+
+@pytest.mark.asyncio
+async def test_flush_never_moves_a_timestamp_backwards(identities_db):
+    tracker = make_tracker()
+    bob = await make_user("bob01", last_login=T0 + timedelta(hours=1))
+
+    tracker.record(bob, "last_login", T0)
+    assert await tracker.flush() == 0
+    assert await stored(User, bob, "last_login") == T0 + timedelta(hours=1)
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_each_tenant_through_its_own_context(identities_db):
+    tracker = make_tracker()
+    with tenant_context("acme"):
+        acme = await make_user("carol")
+    with tenant_context("globex"):
+        globex = await make_user("carol")
+
+    tracker.record(acme, "last_login", T0)
+    tracker.record(globex, "last_login", T0 + timedelta(minutes=1))
+    assert await tracker.flush() == 2
+
+    assert await stored(User, acme, "last_login") == T0
+    assert await stored(User, globex, "last_login") == T0 + timedelta(minutes=1)
+
+
+@pytest.mark.asyncio
+async def test_background_flush_and_final_flush_on_stop(identities_db):
+    tracker = make_tracker(ACTIVITY_FLUSH_SECONDS=0.01)
+    dave = await make_user("dave01")
+    erin = await make_user("erin01")
+
+    tracker.start()
+    tracker.record(dave, "last_login", T0)
+    await asyncio.sleep(0.05)
+    assert await stored(User, dave, "last_login") == T0
+
+    tracker.interval = 60
+    await asyncio.sleep(0.02)
+    tracker.record(erin, "last_login", T0)
+    await tracker.stop()
+    assert await stored(User, erin, "last_login") == T0
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_updates_pending(identities_db, monkeypatch):
+    tracker = make_tracker()
+    frank = await make_user("frank")
+    tracker.record(frank, "last_login", T0)
+
+    collection = User.get_motor_collection()
+
+    async def failing(*args, **kwargs):
+        raise ConnectionError("primary unavailable")
+
+    monkeypatch.setattr(type(collection), "bulk_write", failing)
+    assert await tracker.flush() == 0
+    assert tracker.pending == 1
+
+    monkeypatch.undo()
+    assert await tracker.flush() == 1
+    assert await stored(User, frank, "last_login") == T0
+
+
+@pytest.mark.asyncio
+async def test_tracker_that_was_not_started_stays_bounded(identities_db):
+    tracker = make_tracker(ACTIVITY_MAX_PENDING=2)
+    alice, bob, carol = [await make_user(name) for name in ("alice", "bob01", "carol")]
+
+    tracker.record(alice, "last_login", T0)
+    tracker.record(bob, "last_login", T0)
+    tracker.record(carol, "last_login", T0)
+    tracker.record(alice, "last_login", T0 + timedelta(minutes=1))
+    assert tracker.pending == 2
+    assert tracker.dropped == 1
+    assert carol.last_login == T0
+
+    assert await tracker.flush() == 2
+    assert await stored(User, alice, "last_login") == T0 + timedelta(minutes=1)
+    assert await stored(User, carol, "last_login") == BEFORE
+    tracker.record(carol, "last_login", T0)
+    assert tracker.pending == 1
@@ -0,0 +1,50 @@
+# tests/core/services/test_claims_service.py
+
+import pytest
+
+from pydentity.core.models import Identity, IdentityType
+from pydentity.core.services.claims_service import ClaimsService
+
+
+async def make_identity(username, claims):
+    identity = Identity(username=username, identity_type=IdentityType.user, claims=claims)
+    await identity.insert()
+    return identity
+
+
+@pytest.mark.asyncio
+async def test_claim_pairs_follow_add_and_remove(identities_db):
+    identity = await make_identity("alice01", {"tenant": ["acme"]})
+    assert [(c.type, c.value) for c in identity.claim_pairs] == [("tenant", "acme")]
+
+    await identity.add_claim("department", "ops")
+    await identity.remove_claim("tenant", "acme")
+
+    stored = await Identity.get(identity.id)
+    assert [(c.type, c.value) for c in stored.claim_pairs] == [("department", "ops")]
+
+
+@pytest.mark.asyncio
+async def test_find_and_count_by_claim(identities_db):
+    service = ClaimsService()
+    for i in range(5):
+        await make_identity(f"acme-user{i}", {"tenant": ["acme"], "department": ["ops" if i % 2 else "eng"]})
+    await make_identity("globex-user", {"tenant": ["globex"], "department": ["ops"]})
+
+    assert await service.count_by_claim("tenant", "acme") == 5
+    assert await service.count_by_claim("department") == 6
+    assert await service.count_by_claim("tenant", "ops") == 0
+
+    first, cursor = await service.find_by_claim("tenant", "acme", limit=3)
+    second, last = await service.find_by_claim("tenant", "acme", after=cursor, limit=3)
+    assert [i.username for i in first + second] == [f"acme-user{i}" for i in range(5)]
+    assert last is None
+
+
+@pytest.mark.asyncio
+async def test_backfill_claim_pairs(identities_db):
+    collection = Identity.get_motor_collection()
+    await collection.insert_one({"username": "legacy01", "identity_type": "user", "claims": {"tenant": ["acme", "initech"]}})
+
+    assert await ClaimsService().backfill_claim_pairs() == 1
+    assert await ClaimsService().count_by_claim("tenant", "initech") == 1
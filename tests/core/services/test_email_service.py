@@ -0,0 +1,149 @@
+# tests/core/services/test_email_service.py
+
+import asyncio
+import smtplib
+
+import pytest
+import pytest_asyncio
+
+from pydentity.core.config import get_settings
+from pydentity.core.services.email_service import EmailQueue, build_message, is_transient
+
+
+class SMTPStandIn:
+    """Minimal local SMTP server recording connections and delivered messages."""
+
+    def __init__(self, transient_failures=0, reject=()):
+        self.connections = 0
+        self.messages = []
+        self.transient_failures = transient_failures
+        self.reject = set(reject)
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        recipients = []
+
+        async def reply(line):
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        await reply("220 stand-in ready")
+        while line := await reader.readline():
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                await reply("250 stand-in")
+            elif command.startswith("RCPT TO:"):
+                recipient = line.decode().strip()[8:].strip("<>")
+                recipients.append(recipient)
+                await reply("550 no such user" if recipient in self.reject else "250 ok")
+            elif command.startswith(("MAIL FROM:", "RSET", "NOOP")):
+                recipients = [] if command.startswith(("MAIL", "RSET")) else recipients
+                await reply("250 ok")
+            elif command == "DATA":
+                await reply("354 go ahead")
+                data = await reader.readuntil(b"\r\n.\r\n")
+                if self.transient_failures:
+                    self.transient_failures -= 1
+                    await reply("451 try again later")
+                else:
+                    self.messages.append((recipients, data))
+                    await reply("250 queued")
+            elif command == "QUIT":
+                await reply("221 bye")
+                break
+            else:
+                await reply("502 not implemented")
+        writer.close()
+
+
+@pytest_asyncio.fixture
+async def smtp():
+    server = SMTPStandIn()
+    port = await server.start()
+    settings = get_settings().model_copy(update={
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": port,
+        "SMTP_TLS": False,
+        "SMTP_USER": None,
+        "EMAILS_FROM_EMAIL": "noreply@example.com",
+        "EMAIL_QUEUE_WORKERS": 1,
+        "EMAIL_QUEUE_RETRY_BACKOFF_SECONDS": 0.01,
+    })
+    yield server, settings
+    await server.stop()
+
+
+def test_is_transient():
+    assert is_transient(smtplib.SMTPServerDisconnected())
+    assert is_transient(ConnectionRefusedError())
+    assert is_transient(smtplib.SMTPDataError(451, b"later"))
+    assert not is_transient(smtplib.SMTPDataError(554, b"rejected"))
+    assert not is_transient(smtplib.SMTPRecipientsRefused({"a@example.com": (550, b"unknown")}))
+    assert not is_transient(smtplib.SMTPNotSupportedError())
+
+
+@pytest.mark.asyncio
+async def test_messages_share_one_connection(smtp):
+    server, settings = smtp
+    queue = EmailQueue(settings)
+    queue.start()
+    for i in range(10):
+        queue.enqueue(build_message(f"user{i}@example.com", "Hello", "Body", settings=settings))
+    await queue.join()
+    await queue.stop()
+
+    assert queue.sent == 10
+    assert len(server.messages) == 10
+    assert server.connections == 1
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_are_retried_and_permanent_ones_dropped(smtp):
+    server, settings = smtp
+    server.transient_failures = 2
+    server.reject = {"gone@example.com"}
+    queue = EmailQueue(settings)
+    queue.start()
+    queue.enqueue(build_message("user@example.com", "Hello", "Body", settings=settings))
+    queue.enqueue(build_message("gone@example.com", "Hello", "Body", settings=settings))
+    await queue.join()
+    await queue.stop()
+
+    assert queue.sent == 1
+    assert queue.failed == 1
+    assert [recipients for recipients, _ in server.messages] == [["user@example.com"]]
+
+
+@pytest.mark.asyncio
+async def test_enqueue_requires_start():
+    with pytest.raises(RuntimeError):
+        EmailQueue().enqueue(build_message("user@example.com", "Hello", "Body"))
+
+
+@pytest.mark.asyncio
+async def test_stopped_queues_refuse_messages(smtp):
+    _, settings = smtp
+    queue = EmailQueue(settings)
+    queue.start()
+    await queue.stop()
+
+    with pytest.raises(RuntimeError):
+        queue.enqueue(build_message("user@example.com", "Hello", "Body", settings=settings))
+
+
+@pytest.mark.asyncio
+async def test_queues_without_an_smtp_host_do_not_start():
+    queue = EmailQueue(get_settings().model_copy(update={"SMTP_HOST": None}))
+
+    with pytest.raises(ValueError):
+        queue.start()
+    assert not queue.running
@@ -0,0 +1,130 @@
+# tests/core/services/test_identity_log_archiver.py
+
+import gzip
+from datetime import datetime, timedelta
+
+import pytest
+from beanie import PydanticObjectId
+
+from pydentity.core.models import Identity, IdentityLog, IdentityType
+from pydentity.core.services.identity_log_archiver import IdentityLogArchiver, segment_range
+from pydentity.core.services.identity_log_service import IdentityLogService
+
+
+async def seed(start, n):
+    identity = Identity(id=PydanticObjectId(), username="someone", identity_type=IdentityType.user)
+    await IdentityLogService().log_many([
+        IdentityLog(identity=identity, action="login", identity_type=IdentityType.user, timestamp=start + timedelta(minutes=i))
+        for i in range(n)
+    ])
+
+
+def test_configure_storage():
+    try:
+        IdentityLog.configure_storage("timeseries", retention_days=30)
+        assert IdentityLog.Settings.timeseries.time_field == "timestamp"
+        assert IdentityLog.Settings.timeseries.expire_after_seconds == 30 * 86400
+
+        IdentityLog.configure_storage("standard", retention_days=7)
+        assert IdentityLog.Settings.timeseries is None
+        assert IdentityLog.Settings.indexes[0].document["expireAfterSeconds"] == 7 * 86400
+
+        with pytest.raises(ValueError):
+            IdentityLog.configure_storage("capped")
+    finally:
+        IdentityLog.configure_storage()
+
+
+@pytest.mark.asyncio
+async def test_archive_moves_old_entries_into_segments(mongo_db, tmp_path):
+    start = datetime(2024, 5, 1, 12, 0)
+    await seed(start, 25)
+    archiver = IdentityLogArchiver(archive_dir=tmp_path, batch_size=4, segment_size=10)
+
+    segments = await archiver.archive(older_than=start + timedelta(minutes=20))
+
+    assert [segment_range(path) for path in segments] == [
+        (start, start + timedelta(minutes=9)),
+        (start + timedelta(minutes=10), start + timedelta(minutes=19)),
+    ]
+    with gzip.open(segments[0], "rb") as f:
+        assert len(f.read().splitlines()) == 10
+    assert await IdentityLog.find_all().count() == 5
+    assert not list(tmp_path.glob(".*"))
+
+
+@pytest.mark.asyncio
+async def test_reingest_range_restores_entries_once(mongo_db, tmp_path):
+    start = datetime(2024, 5, 1, 12, 0)
+    await seed(start, 20)
+    archiver = IdentityLogArchiver(archive_dir=tmp_path, batch_size=4, segment_size=10)
+    await archiver.archive(older_than=start + timedelta(hours=1))
+    assert await IdentityLog.find_all().count() == 0
+
+    assert archiver.segments(start + timedelta(minutes=12), start + timedelta(minutes=15)) == [
+        path for path in archiver.segments() if segment_range(path)[0] == start + timedelta(minutes=10)
+    ]
+    assert await archiver.reingest_range(start + timedelta(minutes=12), start + timedelta(minutes=15)) == 10
+    assert await archiver.reingest_range() == 10
+
+    restored = await IdentityLog.find_all().sort("+timestamp").to_list()
+    assert len(restored) == 20
+    assert restored[0].timestamp == start
+    assert restored[0].action == "login"
+
+
+@pytest.mark.asyncio
+async def test_reingest_does_not_rely_on_a_unique_id_index(mongo_db, tmp_path, monkeypatch):
+    # Time-series collections accept duplicate _ids, so present entries must never be sent
+    start = datetime(2024, 5, 1, 12, 0)
+    await seed(start, 6)
+    archiver = IdentityLogArchiver(archive_dir=tmp_path, batch_size=4, segment_size=10)
+    [segment] = await archiver.archive(older_than=start + timedelta(minutes=3), delete=False)
+
+    collection = IdentityLog.get_motor_collection()
+    sent = []
+    insert_many = type(collection).insert_many
+
+    async def recording(self, documents, *args, **kwargs):
+        sent.extend(documents)
+        return await insert_many(self, documents, *args, **kwargs)
+
+    monkeypatch.setattr(type(collection), "insert_many", recording)
+    assert await archiver.reingest(segment) == 0
+    assert sent == []
+
+    await collection.delete_one({"timestamp": start + timedelta(minutes=1)})
+    assert await archiver.reingest(segment) == 1
+    assert [document["timestamp"] for document in sent] == [start + timedelta(minutes=1)]
+
+
+@pytest.mark.asyncio
+async def test_reingest_skips_entries_past_retention(mongo_db, tmp_path):
+    now = datetime.utcnow().replace(microsecond=0)
+    await seed(now - timedelta(days=10), 2)
+    await seed(now - timedelta(days=1), 2)
+    archiver = IdentityLogArchiver(archive_dir=tmp_path, segment_size=3, retention_days=5)
+    segments = await archiver.archive(older_than=now)
+    assert len(segments) == 2
+
+    assert await archiver.reingest_range() == 2
+    restored = await IdentityLog.find_all().sort("+timestamp").to_list()
+    assert [entry.timestamp for entry in restored] == [now - timedelta(days=1), now - timedelta(days=1, minutes=-1)]
+
+
+@pytest.mark.asyncio
+async def test_segments_are_written_under_unique_temporary_names(mongo_db, tmp_path, monkeypatch):
+    start = datetime(2024, 5, 1, 12, 0)
+    await seed(start, 4)
+    archiver = IdentityLogArchiver(archive_dir=tmp_path, segment_size=2)
+    temporary = []
+    seal = archiver._seal
+
+    def recording(stream, tmp, first, last):
+        temporary.append(tmp.name)
+        return seal(stream, tmp, first, last)
+
+    monkeypatch.setattr(archiver, "_seal", recording)
+    await archiver.archive(older_than=start + timedelta(hours=1))
+    assert len(set(temporary)) == 2
+    assert all(name.startswith(".identity_logs-") and name.endswith(".partial") for name in temporary)
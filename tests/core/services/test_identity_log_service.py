@@ -0,0 +1,82 @@
+# tests/core/services/test_identity_log_service.py
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from beanie import PydanticObjectId
+
+from pydentity.core.models import Identity, IdentityLog, IdentityLogRollup, IdentityType, RollupGranularity
+from pydentity.core.models.identity_log_rollup import bucket_start
+from pydentity.core.services.identity_log_service import IdentityLogService
+from pydentity.core.tenancy import tenant_context
+
+
+def make_log(action, timestamp, identity_type=IdentityType.user, identity_id=None, tenant_id=None):
+    identity = Identity(id=identity_id or PydanticObjectId(), username="someone", identity_type=identity_type, tenant_id=tenant_id)
+    return IdentityLog(identity=identity, action=action, identity_type=identity_type, timestamp=timestamp, tenant_id=tenant_id)
+
+
+def test_bucket_start():
+    timestamp = datetime(2024, 5, 1, 13, 45, 30, 123, tzinfo=timezone.utc)
+    assert bucket_start(timestamp, RollupGranularity.minute) == datetime(2024, 5, 1, 13, 45, tzinfo=timezone.utc)
+    assert bucket_start(timestamp, RollupGranularity.hour) == datetime(2024, 5, 1, 13, tzinfo=timezone.utc)
+    assert bucket_start(timestamp, RollupGranularity.day) == datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+
+def test_updates_coalesce_entries_sharing_a_bucket(mongo_db):
+    timestamp = datetime(2024, 5, 1, 13, 45, tzinfo=timezone.utc)
+    identity_id = PydanticObjectId()
+    logs = [make_log("login", timestamp + timedelta(seconds=i), identity_id=identity_id) for i in range(3)]
+
+    updates = IdentityLogRollup.updates_for(logs)
+
+    # minute, hour and day per identity type, plus day per identity
+    assert len(updates) == 4
+    assert all(update._doc == {"$inc": {"total": 3}} for update in updates)
+
+
+@pytest.mark.asyncio
+async def test_counts_are_answered_from_rollups(mongo_db):
+    service = IdentityLogService()
+    start = datetime(2024, 5, 1, 13, 0)
+    agent_id = PydanticObjectId()
+    await service.log_many([
+        make_log("login", start + timedelta(seconds=10)),
+        make_log("login", start + timedelta(seconds=20)),
+        make_log("login", start + timedelta(minutes=1), identity_type=IdentityType.agent),
+        make_log("verification_failed", start, identity_type=IdentityType.agent, identity_id=agent_id),
+        make_log("verification_failed", start + timedelta(hours=2), identity_type=IdentityType.agent, identity_id=agent_id),
+    ])
+
+    per_minute = await service.counts("login", start, start + timedelta(hours=1))
+    assert [(r.bucket, r.identity_type, r.total) for r in per_minute] == [
+        (start, IdentityType.user, 2),
+        (start + timedelta(minutes=1), IdentityType.agent, 1),
+    ]
+
+    top = await service.top_identities("verification_failed", start, IdentityType.agent)
+    assert [(r.identity_id, r.total) for r in top] == [(agent_id, 2)]
+
+
+@pytest.mark.asyncio
+async def test_counts_are_kept_per_tenant(mongo_db):
+    service = IdentityLogService()
+    start = datetime(2024, 5, 1, 13, 0)
+    day = start.replace(hour=0)
+    acme_agent, globex_agent = PydanticObjectId(), PydanticObjectId()
+    await service.log_many([
+        make_log("login", start, tenant_id="acme"),
+        make_log("login", start + timedelta(seconds=5), tenant_id="globex"),
+        make_log("login", start + timedelta(seconds=10), tenant_id="globex"),
+        make_log("verification_failed", start, IdentityType.agent, acme_agent, tenant_id="acme"),
+        make_log("verification_failed", start, IdentityType.agent, globex_agent, tenant_id="globex"),
+    ])
+
+    with tenant_context("acme"):
+        assert [r.total for r in await service.counts("login", start, start + timedelta(hours=1))] == [1]
+        assert [r.identity_id for r in await service.top_identities("verification_failed", start)] == [acme_agent]
+        assert await service.identity_counts(globex_agent, "verification_failed", day, day + timedelta(days=1)) == []
+    with tenant_context("globex"):
+        assert [r.total for r in await service.counts("login", start, start + timedelta(hours=1))] == [2]
+        assert [r.total for r in await service.identity_counts(globex_agent, "verification_failed", day, day + timedelta(days=1))] == [1]
+    assert await service.counts("login", start, start + timedelta(hours=1)) == []
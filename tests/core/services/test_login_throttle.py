@@ -0,0 +1,98 @@
+# tests/core/services/test_login_throttle.py
+
+import pytest
+from fastapi import HTTPException
+
+from pydentity.core.services.login_throttle import LoginThrottle
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def throttle(clock):
+    return LoginThrottle(
+        max_failures_per_username=3,
+        max_failures_per_source=5,
+        window_seconds=60,
+        lockout_seconds=300,
+        clock=clock,
+    )
+
+
+def test_username_is_locked_after_max_failures(throttle, clock):
+    for _ in range(3):
+        throttle.check("alice", "10.0.0.1")
+        throttle.record_failure("alice", "10.0.0.1")
+
+    with pytest.raises(HTTPException) as exc_info:
+        throttle.check("alice", "10.0.0.2")
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers["Retry-After"] == "301"
+
+    clock.now += 301
+    throttle.check("alice", "10.0.0.2")
+
+
+def test_failures_outside_window_are_forgotten(throttle, clock):
+    throttle.record_failure("alice")
+    throttle.record_failure("alice")
+    clock.now += 61
+    throttle.record_failure("alice")
+
+    assert throttle.retry_after("alice") == 0
+
+
+def test_source_is_locked_across_usernames(throttle):
+    for i in range(5):
+        throttle.record_failure(f"user{i}", "10.0.0.1")
+
+    assert throttle.retry_after("someone-else", "10.0.0.1") > 0
+    assert throttle.retry_after("someone-else", "10.0.0.2") == 0
+
+
+def test_success_clears_username_but_not_source(throttle):
+    for i in range(2):
+        throttle.record_failure("alice", "10.0.0.1")
+    throttle.record_success("alice", "10.0.0.1")
+    throttle.record_failure("alice", "10.0.0.1")
+
+    assert throttle.retry_after("alice") == 0
+    assert len(throttle._sources._windows["10.0.0.1"].failures) == 3
+
+
+def test_tracked_keys_are_bounded(clock):
+    throttle = LoginThrottle(3, 5, window_seconds=60, lockout_seconds=300, max_keys=2, clock=clock)
+    for name in ("a", "b", "c"):
+        throttle.record_failure(name)
+
+    assert list(throttle._usernames._windows) == ["b", "c"]
+
+
+def test_locked_keys_are_not_evicted(clock):
+    throttle = LoginThrottle(2, 5, window_seconds=60, lockout_seconds=300, max_keys=2, clock=clock)
+    throttle.record_failure("victim")
+    throttle.record_failure("victim")
+    throttle.record_failure("other")
+
+    throttle.record_failure("spray1")
+    assert list(throttle._usernames._windows) == ["victim", "spray1"]
+    throttle.record_failure("spray1")
+    throttle.record_failure("spray2")
+    # Both tracked keys are locked: the new key is not tracked rather than lifting a lockout
+    assert list(throttle._usernames._windows) == ["victim", "spray1"]
+    assert throttle.retry_after("victim") > 0
+
+    clock.now += 301
+    throttle.record_failure("spray2")
+    assert list(throttle._usernames._windows) == ["spray1", "spray2"]
@@ -0,0 +1,92 @@
+# tests/core/services/test_permission_service.py
+
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from bson import Binary
+
+from pydentity.core.models import Role
+from pydentity.core.services.permission_service import PermissionService, RoleCycleError
+
+
+@pytest_asyncio.fixture
+async def hierarchy(mongo_db):
+    service = PermissionService()
+    viewer = await service.create_role("viewer", ["posts:read"])
+    editor = await service.create_role("editor", ["posts:write"], parents=[viewer])
+    billing = await service.create_role("billing", ["billing:*"])
+    admin = await service.create_role("admin", ["users:*"], parents=[editor, billing])
+    return service, viewer, editor, billing, admin
+
+
+@pytest.mark.asyncio
+async def test_roles_store_their_transitive_closure(hierarchy):
+    service, viewer, editor, billing, admin = hierarchy
+
+    stored = await Role.find_one(Role.name == "admin")
+    assert set(stored.ancestor_ids) == {viewer.id, editor.id, billing.id}
+    assert stored.effective_permissions == ["billing:*", "posts:read", "posts:write", "users:*"]
+    assert stored.grants("posts:read")
+    assert stored.grants("billing:invoices:read")
+
+
+@pytest.mark.asyncio
+async def test_permission_changes_reach_descendants_only(hierarchy):
+    service, viewer, editor, billing, admin = hierarchy
+
+    await service.add_permission_to_role(viewer, "comments:read")
+    assert "comments:read" in (await Role.get(editor.id)).effective_permissions
+    assert "comments:read" in (await Role.get(admin.id)).effective_permissions
+    assert "comments:read" not in (await Role.get(billing.id)).effective_permissions
+
+    await service.remove_permission_from_role(viewer, "posts:read")
+    assert not (await Role.get(admin.id)).grants("posts:read")
+
+
+@pytest.mark.asyncio
+async def test_reparenting_recomputes_descendants(hierarchy):
+    service, viewer, editor, billing, admin = hierarchy
+
+    await service.remove_parent_from_role(editor, viewer)
+
+    stored = await Role.get(admin.id)
+    assert set(stored.ancestor_ids) == {editor.id, billing.id}
+    assert not stored.grants("posts:read")
+
+
+@pytest.mark.asyncio
+async def test_cycles_are_rejected(hierarchy):
+    service, viewer, editor, billing, admin = hierarchy
+
+    with pytest.raises(RoleCycleError):
+        await service.add_parent_to_role(viewer, admin)
+    with pytest.raises(RoleCycleError):
+        await service.add_parent_to_role(viewer, viewer)
+    assert (await Role.get(viewer.id)).parent_ids == []
+
+
+@pytest.mark.asyncio
+async def test_descendants_changed_concurrently_are_recomputed_not_overwritten(hierarchy, mongo_db, monkeypatch):
+    service, viewer, editor, billing, admin = hierarchy
+    parents_first = PermissionService._parents_first
+    calls = []
+
+    def change_editor_once(roles):
+        # Another request grants editor a permission after its descendants were read
+        if not calls:
+            mongo_db.delegate[Role.get_settings().name].update_one(
+                {"_id": editor.id},
+                {"$push": {"permissions": "posts:publish"}, "$set": {"revision_id": Binary.from_uuid(uuid4())}},
+            )
+        calls.append(roles)
+        return parents_first(roles)
+
+    monkeypatch.setattr(PermissionService, "_parents_first", staticmethod(change_editor_once))
+    await service.add_permission_to_role(viewer, "comments:read")
+
+    assert len(calls) == 2
+    stored = await Role.get(editor.id)
+    assert stored.permissions == ["posts:write", "posts:publish"]
+    assert {"comments:read", "posts:publish"} <= set(stored.effective_permissions)
+    assert {"comments:read", "posts:publish"} <= set((await Role.get(admin.id)).effective_permissions)
@@ -0,0 +1,214 @@
+# tests/core/services/test_sso_service.py
+
+import asyncio
+import time
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from pydentity.core.models import IdentityType, SSOProvider, User, VerificationStatus
+from pydentity.core.resilience import ProviderUnavailable, reset_circuit_breakers
+from pydentity.core.services.sso_service import SSOService, get_facebook_token_cache
+from pydentity.core.singleflight import SingleFlight
+
+
+@pytest_asyncio.fixture
+async def sso_service(mongo_db):
+    service = SSOService()
+    yield service
+    await service.http_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_first_sign_in_creates_a_verified_sso_user(sso_service):
+    user = await sso_service._get_or_create_sso_user(SSOProvider.google, "g-1", "alice@example.com", "Alice Smith")
+
+    assert user.id is not None
+    assert user.username == "alice"
+    assert user.identity_type == IdentityType.sso_user
+    assert user.verification_status == VerificationStatus.verified
+    assert user.hashed_password == ""
+    assert user.last_login is not None
+
+    again = await sso_service._get_or_create_sso_user(SSOProvider.google, "g-1", "alice@example.com", "Alice Smith")
+    assert again.id == user.id
+    assert again.last_login >= user.last_login
+    assert await User.count() == 1
+
+
+@pytest.mark.asyncio
+async def test_sign_in_links_the_account_with_the_same_email(sso_service):
+    existing = User(username="bob_smith", email="bob@example.com", hashed_password="hash", identity_type=IdentityType.user)
+    await existing.insert()
+
+    user = await sso_service._get_or_create_sso_user(SSOProvider.facebook, "fb-7", "bob@example.com", "Bob")
+
+    assert user.id == existing.id
+    assert (user.sso_provider, user.sso_id) == (SSOProvider.facebook, "fb-7")
+    assert user.hashed_password == "hash"
+    assert await User.count() == 1
+
+
+@pytest.mark.asyncio
+async def test_taken_username_gets_a_suffix(sso_service):
+    await User(username="carol", email="carol@old.example", hashed_password="hash", identity_type=IdentityType.user).insert()
+
+    user = await sso_service._get_or_create_sso_user(SSOProvider.apple, "a-3", "carol@new.example", "Carol")
+
+    assert user.username.startswith("carol") and user.username != "carol"
+    assert await User.count() == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sign_ins_share_one_upsert(sso_service):
+    calls = 0
+    upsert = sso_service._upsert_sso_user
+
+    async def counted(*args):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return await upsert(*args)
+
+    sso_service._upsert_sso_user = counted
+    users = await asyncio.gather(*(
+        sso_service._get_or_create_sso_user(SSOProvider.google, "g-9", "dave@example.com", "Dave") for _ in range(10)
+    ))
+
+    assert calls == 1
+    assert len({user.id for user in users}) == 1
+    assert len({id(user) for user in users}) == 10
+    assert await User.count() == 1
+
+
+@pytest.mark.asyncio
+async def test_signed_in_users_can_save_their_changes(sso_service):
+    first, second = await asyncio.gather(*(
+        sso_service._get_or_create_sso_user(SSOProvider.google, "g-4", "erin@example.com", "Erin") for _ in range(2)
+    ))
+
+    await first.add_claim("department", "ops")
+    assert second.claims == {}
+    stored = await User.get(first.id)
+    assert stored.claims == {"department": ["ops"]}
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_errors_and_forgets_finished_calls():
+    flights = SingleFlight()
+    started = 0
+
+    async def failing():
+        nonlocal started
+        started += 1
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(*(flights.do("key", failing) for _ in range(3)), return_exceptions=True)
+
+    assert started == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(flights) == 0
+    with pytest.raises(RuntimeError):
+        await flights.do("key", failing)
+    assert started == 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_a_cancelled_caller():
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return "done"
+
+    first = asyncio.ensure_future(flights.do("key", slow))
+    second = asyncio.ensure_future(flights.do("key", slow))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+@pytest.fixture
+def facebook():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if request.url.params["access_token"] == "good":
+            return httpx.Response(200, json={"id": "fb-1", "name": "Erin", "email": "erin@example.com"})
+        if request.url.params["access_token"] == "flaky":
+            return httpx.Response(503)
+        return httpx.Response(400, json={"error": {"code": 190}})
+
+    get_facebook_token_cache.cache_clear()
+    reset_circuit_breakers()
+    service = SSOService(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    service.facebook.backoff = 0
+    yield service, calls
+    get_facebook_token_cache.cache_clear()
+    reset_circuit_breakers()
+
+
+@pytest.mark.asyncio
+async def test_verified_facebook_tokens_are_cached(facebook):
+    service, calls = facebook
+
+    first = await service._verify_facebook_token("good")
+    first["email"] = "changed@example.com"
+    second = await service._verify_facebook_token("good")
+
+    assert len(calls) == 1
+    assert second["email"] == "erin@example.com"
+
+
+@pytest.mark.asyncio
+async def test_rejected_facebook_tokens_are_cached_but_outages_are_not(facebook):
+    service, calls = facebook
+
+    for token in ("bad", "bad"):
+        with pytest.raises(ValueError):
+            await service._verify_facebook_token(token)
+    for token in ("flaky", "flaky"):
+        with pytest.raises(ProviderUnavailable):
+            await service._verify_facebook_token(token)
+
+    assert [request.url.params["access_token"] for request in calls] == ["bad"] + ["flaky"] * 6
+
+
+@pytest.mark.asyncio
+async def test_google_verification_runs_off_the_event_loop_within_the_deadline(sso_service, monkeypatch):
+    # google-auth fetches Google's certificates through requests
+    pytest.importorskip("requests")
+    from google.oauth2 import id_token
+
+    def slow_verify(token, request, audience):
+        time.sleep(0.5)
+        return {"iss": "accounts.google.com", "sub": "g-1", "email": "alice@example.com"}
+
+    reset_circuit_breakers()
+    monkeypatch.setattr(id_token, "verify_oauth2_token", slow_verify)
+    sso_service.google_deadline = 0.05
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    try:
+        with pytest.raises(ProviderUnavailable):
+            await sso_service.authenticate_google("slow-token")
+    finally:
+        task.cancel()
+    # The loop kept running while Google was being waited on
+    assert ticks >= 2
+    reset_circuit_breakers()
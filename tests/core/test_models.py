@@ -2,7 +2,10 @@
 
 import pytest
 from datetime import datetime, timedelta
-from pydentity.models import User, Agent, Identity, Role, IdentityType, SSOProvider, VerificationStatus
+from pydentity.core.models import User, Agent, Identity, Role, IdentityType, SSOProvider, VerificationStatus
+
+# API keys are at least 32 characters long
+TEST_API_KEY = "test_api_key_0123456789abcdefghij"
 
 @pytest.mark.asyncio
 async def test_user_creation(clear_db):
@@ -25,14 +28,14 @@ async def test_user_creation(clear_db):
 async def test_agent_creation(clear_db):
     agent = Agent(
         username="testagent",
-        api_key="test_api_key",
+        api_key=TEST_API_KEY,
         identity_type=IdentityType.agent
     )
     await agent.insert()
 
     retrieved_agent = await Agent.find_one(Agent.username == "testagent")
     assert retrieved_agent is not None
-    assert retrieved_agent.api_key == "test_api_key"
+    assert retrieved_agent.api_key == TEST_API_KEY
     assert retrieved_agent.identity_type == IdentityType.agent
 
 @pytest.mark.asyncio
@@ -40,6 +43,7 @@ async def test_user_sso_creation(clear_db):
     user = User(
         username="ssouser",
         email="sso@example.com",
+        hashed_password="",
         identity_type=IdentityType.sso_user,
         sso_provider=SSOProvider.google,
         sso_id="google_123456"
@@ -65,8 +69,7 @@ async def test_user_verification(clear_db):
     
     await user.initiate_verification()
     assert user.verification_status == VerificationStatus.pending
-    
-    user.email_verified = True
+
     verification_result = await user.verify_identity()
     assert verification_result == True
     assert user.verification_status == VerificationStatus.verified
@@ -75,7 +78,7 @@ async def test_user_verification(clear_db):
 async def test_agent_verification(clear_db):
     agent = Agent(
         username="verifyagent",
-        api_key="test_api_key",
+        api_key=TEST_API_KEY,
         identity_type=IdentityType.agent
     )
     await agent.insert()
@@ -108,6 +111,7 @@ async def test_user_role_assignment(clear_db):
     await user.save()
 
     retrieved_user = await User.find_one(User.username == "roleuser")
+    await retrieved_user.fetch_link("roles")
     assert len(retrieved_user.roles) == 1
     assert retrieved_user.roles[0].name == "admin"
     assert "read" in retrieved_user.roles[0].permissions
@@ -159,7 +163,7 @@ async def test_user_last_login_update(clear_db):
 async def test_agent_last_active_update(clear_db):
     agent = Agent(
         username="activeagent",
-        api_key="test_api_key",
+        api_key=TEST_API_KEY,
         identity_type=IdentityType.agent
     )
     await agent.insert()
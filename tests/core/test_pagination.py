@@ -0,0 +1,42 @@
+# tests/core/test_pagination.py
+
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+
+from pydentity.core.pagination import KeysetOrder, decode_cursor, encode_cursor, keyset_query
+
+
+def test_id_cursor_round_trip():
+    document_id = ObjectId()
+    cursor = encode_cursor(KeysetOrder.id, document_id)
+
+    assert decode_cursor(cursor) == {"id": document_id}
+    query, sort = keyset_query({"is_active": True}, KeysetOrder.id, cursor)
+    assert query == {"is_active": True, "_id": {"$gt": document_id}}
+    assert sort == [("_id", 1)]
+
+
+def test_created_at_cursor_breaks_ties_on_id():
+    document_id = ObjectId()
+    created_at = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    cursor = encode_cursor(KeysetOrder.created_at, document_id, created_at)
+
+    query, sort = keyset_query({}, KeysetOrder.created_at, cursor)
+    assert query == {"$or": [
+        {"created_at": {"$gt": created_at}},
+        {"created_at": created_at, "_id": {"$gt": document_id}},
+    ]}
+    assert sort == [("created_at", 1), ("_id", 1)]
+
+
+def test_first_page_has_no_range_condition():
+    query, _ = keyset_query({"identity_type": "user"}, KeysetOrder.id)
+    assert query == {"identity_type": "user"}
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor(KeysetOrder.id, ObjectId())])
+def test_invalid_or_mismatched_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        keyset_query({}, KeysetOrder.created_at, cursor)
@@ -0,0 +1,227 @@
+# tests/core/test_partial_updates.py
+
+import bson
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from beanie import init_beanie
+from beanie.exceptions import RevisionIdWasChanged
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from pymongo.errors import ServerSelectionTimeoutError
+
+from pydentity.core.config import get_settings
+from pydentity.core.models import Identity, IdentityType, Role, User, VerificationStatus
+from pydentity.core.services import AuthService, TokenService
+
+WRITE_COMMANDS = {"insert", "update", "findAndModify"}
+
+
+class WireRecorder(monitoring.CommandListener):
+    """Records the write commands a client sends, as they go on the wire."""
+
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name in WRITE_COMMANDS:
+            self.commands.append((event.command_name, bson.decode(bson.encode(event.command))))
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pass
+
+    def clear(self) -> None:
+        self.commands.clear()
+
+    def last_update(self) -> dict:
+        """Return the update document of the last update or findAndModify command."""
+        name, command = self.commands[-1]
+        return command["update"] if name == "findAndModify" else command["updates"][0]["u"]
+
+    def last_size(self) -> int:
+        """Return the BSON size of the last write command."""
+        return len(bson.encode(self.commands[-1][1]))
+
+
+@pytest_asyncio.fixture
+async def wire():
+    settings = get_settings()
+    recorder = WireRecorder()
+    client = AsyncIOMotorClient(settings.TEST_MONGODB_URL, event_listeners=[recorder], serverSelectionTimeoutMS=1000)
+    try:
+        await client.admin.command("ping")
+    except ServerSelectionTimeoutError:
+        pytest.skip("MongoDB is not reachable at TEST_MONGODB_URL")
+    db_name = f"{settings.TEST_MONGODB_DB_NAME}_wire"
+    await init_beanie(database=client[db_name], document_models=[User, Role])
+    yield recorder
+    await client.drop_database(db_name)
+    client.close()
+
+
+def make_user(**fields):
+    # Enough claims that a full replacement is visibly larger than a single-field change
+    claims = {f"project{i}": [f"member-of-project-{i}"] for i in range(50)}
+    return User(username="alice01", email="alice@example.com", hashed_password="$2b$12$" + "x" * 53,
+                identity_type=IdentityType.user, claims=claims, **fields)
+
+
+@pytest.mark.asyncio
+async def test_status_change_sends_only_the_changed_field(wire):
+    user = make_user(verification_status=VerificationStatus.pending)
+    await user.insert()
+    wire.clear()
+
+    user.verification_status = VerificationStatus.verified
+    await user.save_changes()
+
+    update = wire.last_update()
+    assert set(update["$set"]) == {"verification_status", "revision_id"}
+
+
+@pytest.mark.asyncio
+async def test_partial_update_is_smaller_than_a_replacement(wire):
+    user = make_user()
+    await user.insert()
+
+    wire.clear()
+    await user.add_claim("department", "ops")
+    partial = wire.last_size()
+    assert "claims.department" in wire.last_update()["$set"]
+
+    user.claims["department"].append("eng")
+    await user.save()
+    replacement = wire.last_size()
+
+    assert partial < replacement
+
+
+@pytest.mark.asyncio
+async def test_unchanged_documents_are_not_written(wire):
+    user = make_user()
+    await user.insert()
+    wire.clear()
+
+    await user.add_claim("project1", "member-of-project-1")
+    assert wire.commands == []
+
+
+@pytest.mark.asyncio
+async def test_stale_copies_cannot_overwrite_newer_changes(identities_db):
+    identity = Identity(username="bob0001", identity_type=IdentityType.user)
+    await identity.insert()
+    stale = await Identity.get(identity.id)
+
+    await identity.add_claim("department", "ops")
+    with pytest.raises(RevisionIdWasChanged):
+        await stale.add_claim("department", "eng")
+
+    stored = await Identity.get(identity.id)
+    assert stored.claims == {"department": ["ops"]}
+
+
+@pytest.mark.asyncio
+async def test_partial_updates_keep_untouched_fields(identities_db):
+    identity = Identity(username="carol01", identity_type=IdentityType.user, claims={"department": ["ops"]})
+    await identity.insert()
+    # A write that bypasses the document, e.g. a write-behind activity flush
+    await Identity.get_motor_collection().update_one({"_id": identity.id}, {"$set": {"is_active": False}})
+
+    await identity.add_claim("team", "sre")
+
+    stored = await Identity.get(identity.id)
+    assert stored.is_active is False
+    assert stored.claims == {"department": ["ops"], "team": ["sre"]}
+
+
+@pytest.mark.asyncio
+async def test_removing_the_last_value_removes_the_claim_type(identities_db):
+    identity = Identity(username="carol01", identity_type=IdentityType.user, claims={"department": ["ops"], "team": ["sre"]})
+    await identity.insert()
+
+    await identity.remove_claim("department", "ops")
+
+    stored = await Identity.get(identity.id)
+    assert stored.claims == {"team": ["sre"]}
+    assert [(c.type, c.value) for c in stored.claim_pairs] == [("team", "sre")]
+
+
+@pytest.mark.asyncio
+async def test_stale_user_copies_cannot_overwrite_newer_changes(identities_db):
+    user = make_user()
+    await user.insert()
+    stale = await User.get(user.id)
+
+    user.verification_status = VerificationStatus.verified
+    await user.save_changes()
+    stale.hashed_password = "$2b$12$" + "y" * 53
+    with pytest.raises(RevisionIdWasChanged):
+        await stale.save_changes()
+
+    stored = await User.get(user.id)
+    assert stored.verification_status == VerificationStatus.verified
+    assert stored.hashed_password == user.hashed_password
+
+
+@pytest.mark.asyncio
+async def test_user_partial_updates_keep_untouched_fields(identities_db):
+    user = make_user()
+    await user.insert()
+    await User.get_motor_collection().update_one({"_id": user.id}, {"$set": {"is_active": False}})
+
+    await user.add_claim("department", "ops")
+
+    stored = await User.get(user.id)
+    assert stored.is_active is False
+    assert stored.claims["department"] == ["ops"]
+    assert stored.claims["project1"] == ["member-of-project-1"]
+
+
+@pytest.mark.asyncio
+async def test_second_redemption_of_a_user_token_is_rejected(identities_db):
+    user = make_user(verification_status=VerificationStatus.pending)
+    await user.insert()
+    first, second = await User.get(user.id), await User.get(user.id)
+
+    first.verification_status = second.verification_status = VerificationStatus.verified
+    await AuthService._redeem(first)
+    with pytest.raises(HTTPException) as rejected:
+        await AuthService._redeem(second)
+    assert rejected.value.status_code == 400
+
+
+class UpgradingContext:
+    """A password context whose stored hashes always need upgrading."""
+
+    def verify_and_update(self, password, hashed):
+        return True, "$2b$13$" + "z" * 53
+
+
+@pytest.mark.asyncio
+async def test_login_succeeds_when_a_concurrent_write_wins_the_rehash(identities_db, monkeypatch):
+    user = make_user()
+    await user.insert()
+    stale = await User.get(user.id)
+    # A password reset lands between this login's read and its hash upgrade
+    user.hashed_password = "$2b$12$" + "r" * 53
+    await user.save_changes()
+
+    find_one = User.find_one
+
+    async def found(document):
+        return document
+
+    def find_stale(*args, **kwargs):
+        # Only the login's lookup gets the stale copy; the save looks the document up as well
+        monkeypatch.setattr(User, "find_one", find_one)
+        return found(stale)
+    monkeypatch.setattr(User, "find_one", find_stale)
+    service = AuthService(TokenService())
+    service.pwd_context = UpgradingContext()
+
+    assert await service.authenticate_user("alice01", "password") is stale
+    stored = await User.get(user.id)
+    assert stored.hashed_password == user.hashed_password
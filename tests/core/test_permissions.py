@@ -0,0 +1,88 @@
+# tests/core/test_permissions.py
+
+import pytest
+from fastapi import HTTPException
+
+from pydentity.core.models import Identity, IdentityType, Role
+from pydentity.core.permissions import PermissionMatcher, parse_permission
+from pydentity.utils.decorators import require_any_permission, require_permissions
+
+
+def test_parse_permission():
+    assert parse_permission("billing:invoices:read") == ["billing", "invoices", "read"]
+    for invalid in ("", "users:", ":read", "a::b"):
+        with pytest.raises(ValueError):
+            parse_permission(invalid)
+
+
+@pytest.mark.parametrize("grants, permission, expected", [
+    (["users:read"], "users:read", True),
+    (["users:read"], "users:write", False),
+    (["users:*"], "users:read", True),
+    (["users:*"], "users:profile:write", True),
+    (["users:*"], "users", False),
+    (["users:*"], "billing:read", False),
+    (["*"], "billing:invoices:read", True),
+    (["billing:*:read"], "billing:invoices:read", True),
+    (["billing:*:read"], "billing:invoices:write", False),
+    (["billing:*:read"], "billing:invoices:lines:read", False),
+    (["billing:invoices:*", "billing:*:read"], "billing:payments:read", True),
+    (["users:re*"], "users:read", False),
+    ([], "users:read", False),
+])
+def test_matcher(grants, permission, expected):
+    assert PermissionMatcher(grants).matches(permission) is expected
+
+
+def test_matcher_with_many_grants():
+    matcher = PermissionMatcher([f"resource{i}:read" for i in range(10_000)] + ["admin:*"])
+    assert len(matcher) == 10_001
+    assert "resource9999:read" in matcher
+    assert "admin:users:delete" in matcher
+    assert "resource9999:write" not in matcher
+
+
+def test_role_matcher_is_rebuilt_after_invalidation():
+    role = Role(name="editor", permissions=["posts:read"])
+    assert not role.grants("posts:write")
+
+    role.permissions.append("posts:*")
+    assert not role.grants("posts:write")
+    role.invalidate_permissions()
+    assert role.grants("posts:write")
+
+
+@pytest.mark.asyncio
+async def test_stored_roles_share_their_matcher_per_revision(mongo_db):
+    role = Role(name="editor", permissions=["posts:read"], effective_permissions=["posts:read"])
+    await role.insert()
+
+    first, second = await Role.get(role.id), await Role.get(role.id)
+    assert first.permission_matcher is second.permission_matcher
+
+    # A copy edited in memory compiles its own matcher, and does not share it
+    second.permissions.append("posts:*")
+    second.invalidate_permissions()
+    assert second.grants("posts:write")
+    assert not (await Role.get(role.id)).grants("posts:write")
+
+    await second.save_changes()
+    assert (await Role.get(role.id)).grants("posts:write")
+
+
+async def endpoint(*args, current_identity, **kwargs):
+    return "ok"
+
+
+@pytest.mark.asyncio
+async def test_permission_decorators():
+    role = Role(name="editor", permissions=["posts:*"], effective_permissions=["posts:*"])
+    identity = Identity.model_construct(username="editor01", identity_type=IdentityType.user, roles=[role])
+
+    assert await require_permissions(["posts:read", "posts:write"])(endpoint)(current_identity=identity) == "ok"
+    assert await require_any_permission(["users:read", "posts:read"])(endpoint)(current_identity=identity) == "ok"
+    with pytest.raises(HTTPException) as denied:
+        await require_permissions("users:read")(endpoint)(current_identity=identity)
+    assert denied.value.detail == "Permission denied: users:read"
+    with pytest.raises(HTTPException):
+        await require_any_permission(["users:read"])(endpoint)(current_identity=identity)
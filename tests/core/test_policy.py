@@ -0,0 +1,88 @@
+# tests/core/test_policy.py
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from pydentity.core.policy import Policy, PolicySyntaxError
+from pydentity.utils.decorators import require_any_claim, require_claims, require_policy
+
+RULE = "(dept in {eng, ops}) and clearance >= 3 and not suspended"
+
+
+@pytest.mark.parametrize("claims, allowed", [
+    ({"dept": ["eng"], "clearance": ["3"]}, True),
+    ({"dept": ["sales", "ops"], "clearance": ["1", "4"]}, True),
+    ({"dept": ["eng"], "clearance": ["2"]}, False),
+    ({"dept": ["eng"], "clearance": ["high"]}, False),
+    ({"dept": ["eng"], "clearance": ["5"], "suspended": ["true"]}, False),
+    ({"dept": ["hr"], "clearance": ["5"]}, False),
+    ({}, False),
+])
+def test_compound_rule(claims, allowed):
+    assert Policy(RULE)(claims) is allowed
+
+
+@pytest.mark.parametrize("expression, claims, allowed", [
+    ("team == 'platform ops'", {"team": ["platform ops"]}, True),
+    ("team != sre", {"team": ["dev"]}, True),
+    ("team != sre", {"team": ["dev", "sre"]}, False),
+    ("dept not in {hr, legal}", {}, True),
+    ("dept not in {hr, legal}", {"dept": ["legal"]}, False),
+    ("level < 2.5 or admin", {"level": ["2"]}, True),
+    ("level < 2.5 or admin", {"level": ["3"], "admin": ["yes"]}, True),
+    ("a or b and c", {"a": ["1"]}, True),
+    ("(a or b) and c", {"a": ["1"]}, False),
+    ("not not a", {"a": ["1"]}, True),
+    ("scope in {users:read}", {"scope": ["users:read"]}, True),
+])
+def test_operators_and_precedence(expression, claims, allowed):
+    assert Policy(expression)(claims) is allowed
+
+
+def test_policy_reports_the_claims_it_reads():
+    assert Policy(RULE).claims == {"dept", "clearance", "suspended"}
+
+
+@pytest.mark.parametrize("expression", ["", "dept in", "dept in {eng", "(a and b", "a >= b", "a b", "a ! b", "and", "a not b"])
+def test_syntax_errors(expression):
+    with pytest.raises(PolicySyntaxError):
+        Policy(expression)
+
+
+async def endpoint(*args, current_identity, **kwargs):
+    return "ok"
+
+
+def identity(**claims):
+    return SimpleNamespace(claims=claims)
+
+
+@pytest.mark.asyncio
+async def test_require_policy():
+    route = require_policy(RULE)(endpoint)
+    assert await route(current_identity=identity(dept=["ops"], clearance=["3"])) == "ok"
+    with pytest.raises(HTTPException) as denied:
+        await route(current_identity=identity(dept=["ops"], clearance=["3"], suspended=["yes"]))
+    assert denied.value.status_code == 403
+
+
+def test_require_policy_compiles_when_decorating():
+    with pytest.raises(PolicySyntaxError):
+        require_policy("dept in {eng")
+
+
+@pytest.mark.asyncio
+async def test_claim_decorators():
+    all_of = require_claims({"department": ["eng", "ops"], "clearance": "3"})(endpoint)
+    any_of = require_any_claim({"team": "platform", "department": ["eng"]})(endpoint)
+
+    assert await all_of(current_identity=identity(department=["ops"], clearance=["3"])) == "ok"
+    with pytest.raises(HTTPException) as denied:
+        await all_of(current_identity=identity(department=["ops"]))
+    assert denied.value.detail == "Required claim not found: clearance"
+
+    assert await any_of(current_identity=identity(department=["eng"])) == "ok"
+    with pytest.raises(HTTPException):
+        await any_of(current_identity=identity(team=["data"]))
@@ -0,0 +1,74 @@
+# tests/core/test_read_preference.py
+
+import pytest
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import Primary, SecondaryPreferred
+
+from pydentity.core.config import get_settings
+from pydentity.core.models import Identity, IdentityType, Role
+from pydentity.core.read_preference import (
+    apply_read_preference,
+    current_read_preference,
+    lookup_key,
+    mark_written,
+    primary_reads,
+    read_preference,
+)
+
+
+@pytest.fixture
+def secondary_lookups(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "READ_PREFERENCE_OVERRIDES", {"by_username": "secondaryPreferred"})
+    monkeypatch.setattr(settings, "READ_MAX_STALENESS_SECONDS", 90)
+    return settings
+
+
+def test_operations_use_their_configured_mode(secondary_lookups):
+    assert current_read_preference() is None
+    with read_preference("by_username"):
+        assert current_read_preference() == SecondaryPreferred(max_staleness=90)
+    with read_preference("by_email"):
+        assert current_read_preference() == Primary()
+    assert current_read_preference() is None
+
+
+def test_recent_writes_and_primary_reads_stay_on_primary(secondary_lookups):
+    mark_written(lookup_key("username", "fresh-user"))
+    with read_preference("by_username", lookup_key("username", "fresh-user")):
+        assert current_read_preference() == Primary()
+    with read_preference("by_username", lookup_key("username", "older-user")):
+        assert current_read_preference() == SecondaryPreferred(max_staleness=90)
+    with primary_reads(), read_preference("by_username", lookup_key("username", "older-user")):
+        assert current_read_preference() == Primary()
+
+
+def test_unknown_mode_is_rejected(monkeypatch):
+    monkeypatch.setattr(get_settings(), "READ_PREFERENCE", "fastest")
+    with pytest.raises(ValueError):
+        with read_preference("by_username"):
+            pass
+
+
+def test_collections_are_reconfigured_and_reused(secondary_lookups):
+    collection = AsyncIOMotorClient("mongodb://localhost:27017", connect=False)["pydentity"]["identities"]
+    assert apply_read_preference(collection) is collection
+    with read_preference("by_username"):
+        routed = apply_read_preference(collection)
+        assert routed.read_preference == SecondaryPreferred(max_staleness=90)
+        assert apply_read_preference(collection) is routed
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not get_settings().TEST_MONGODB_REPLICA_SET_URL, reason="TEST_MONGODB_REPLICA_SET_URL is not set")
+async def test_lookup_after_write_on_replica_set(secondary_lookups):
+    client = AsyncIOMotorClient(secondary_lookups.TEST_MONGODB_REPLICA_SET_URL)
+    await client.drop_database("pydentity_read_preference")
+    await init_beanie(database=client["pydentity_read_preference"], document_models=[Identity, Role])
+
+    identity = Identity(username="signup-user", identity_type=IdentityType.user)
+    await identity.insert()
+
+    # Served by the primary although by_username reads from secondaries
+    assert (await Identity.by_username("signup-user")).id == identity.id
@@ -0,0 +1,136 @@
+# tests/core/test_resilience.py
+
+import asyncio
+
+import httpx
+import pytest
+
+from pydentity.core.config import get_settings
+from pydentity.core.resilience import CircuitBreaker, ProviderClient, ProviderUnavailable, reset_circuit_breakers
+
+URL = "https://provider.test/keys"
+
+
+class FakeProvider:
+    """Mock transport answering from a script of (delay, status) pairs, then 200s."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+
+    async def __call__(self, request):
+        self.calls += 1
+        delay, status = self.script.pop(0) if self.script else (0, 200)
+        await asyncio.sleep(delay)
+        if status is None:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(status, json={"call": self.calls})
+
+
+def make_client(provider, **overrides):
+    reset_circuit_breakers()
+    settings = get_settings().model_copy(update={
+        "SSO_RETRY_BACKOFF_SECONDS": 0,
+        "SSO_BREAKER_FAILURES": 2,
+        "SSO_BREAKER_RESET_SECONDS": 60,
+        **overrides,
+    })
+    return ProviderClient(httpx.AsyncClient(transport=httpx.MockTransport(provider)), "test", settings)
+
+
+@pytest.mark.asyncio
+async def test_get_retries_network_errors_and_server_errors():
+    provider = FakeProvider((0, None), (0, 503))
+    client = make_client(provider)
+
+    response = await client.get(URL, endpoint="keys")
+
+    assert response.status_code == 200
+    assert provider.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_returned_without_retrying():
+    provider = FakeProvider((0, 400))
+    client = make_client(provider)
+
+    assert (await client.get(URL, endpoint="keys")).status_code == 400
+    assert provider.calls == 1
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_post_is_sent_once():
+    provider = FakeProvider((0, 503))
+    client = make_client(provider)
+
+    with pytest.raises(ProviderUnavailable):
+        await client.post(URL, endpoint="token")
+    assert provider.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_deadline_bounds_the_whole_call():
+    provider = FakeProvider((1, 200))
+    client = make_client(provider, SSO_DEADLINE_SECONDS=0.05)
+
+    started = asyncio.get_running_loop().time()
+    with pytest.raises(ProviderUnavailable, match="did not answer"):
+        await client.get(URL, endpoint="keys")
+    assert asyncio.get_running_loop().time() - started < 0.5
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast_until_a_probe_succeeds():
+    provider = FakeProvider(*[(0, 500)] * 6)
+    client = make_client(provider, SSO_RETRIES=2)
+    now = [0.0]
+    client.breaker._clock = lambda: now[0]
+
+    for _ in range(2):
+        with pytest.raises(ProviderUnavailable, match="failed after 3"):
+            await client.get(URL, endpoint="keys")
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(ProviderUnavailable, match="circuit is open"):
+        await client.get(URL, endpoint="keys")
+    assert provider.calls == 6
+
+    now[0] = 61.0
+    assert (await client.get(URL, endpoint="keys")).status_code == 200
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_probe_reopens_the_circuit():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=lambda: now[0])
+    breaker.record_failure()
+
+    now[0] = 10.0
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+@pytest.mark.asyncio
+async def test_hedged_get_takes_the_first_good_answer():
+    provider = FakeProvider((1, 200), (0, 200))
+    client = make_client(provider, SSO_HEDGE_DELAY_SECONDS=0.01)
+
+    started = asyncio.get_running_loop().time()
+    response = await client.get(URL, endpoint="keys")
+
+    assert response.json() == {"call": 2}
+    assert asyncio.get_running_loop().time() - started < 0.5
+
+
+@pytest.mark.asyncio
+async def test_hedge_is_not_sent_when_the_first_answer_is_fast():
+    provider = FakeProvider((0, 200))
+    client = make_client(provider, SSO_HEDGE_DELAY_SECONDS=0.05)
+
+    await client.get(URL, endpoint="keys")
+    await asyncio.sleep(0.1)
+    assert provider.calls == 1
@@ -0,0 +1,87 @@
+# tests/core/test_serialization.py
+
+import json
+from typing import Dict, List, Optional
+
+import pytest
+from beanie import Link, PydanticObjectId
+from pydantic import BaseModel, TypeAdapter
+
+from pydentity.core.models import IdentityType, Role, User
+from pydentity.core.schemas.identity import IdentityPage
+from pydentity.core.schemas.user import UserOut
+from pydentity.core.serialization import FastJSONResponse, get_serializer
+
+
+def make_users(count):
+    roles = [Role(id=PydanticObjectId(), name=f"role{i}", permissions=[f"resource{i}:read"]) for i in range(2)]
+    return [
+        User(id=PydanticObjectId(), username=f"user{i:04d}", email=f"user{i}@example.com", hashed_password="secret-hash",
+             identity_type=IdentityType.user, roles=roles, claims={"department": ["ops"]})
+        for i in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_output_matches_the_response_model(mongo_db):
+    users = make_users(3)
+    adapter = TypeAdapter(List[UserOut])
+    expected = adapter.dump_python(adapter.validate_python(users, from_attributes=True), mode="json")
+
+    assert json.loads(get_serializer(UserOut).dump_many(users)) == expected
+    assert json.loads(get_serializer(UserOut).dump(users[0])) == expected[0]
+
+
+@pytest.mark.asyncio
+async def test_fields_outside_the_schema_are_not_serialized(mongo_db):
+    body = get_serializer(UserOut).dump(make_users(1)[0])
+    assert b"secret-hash" not in body
+    assert b"hashed_password" not in body
+
+
+@pytest.mark.asyncio
+async def test_pages_serialize_from_mappings(mongo_db):
+    users = make_users(2)
+    page = json.loads(get_serializer(IdentityPage).dump({"items": users, "next_cursor": "abc"}))
+
+    assert page["next_cursor"] == "abc"
+    assert [item["id"] for item in page["items"]] == [str(user.id) for user in users]
+    assert page["items"][0]["identity_type"] == "user"
+
+
+@pytest.mark.asyncio
+async def test_unfetched_links_are_rejected(mongo_db):
+    user = make_users(1)[0]
+    user.roles = [Link(Role.link_from_id(PydanticObjectId()).ref, Role)]
+    with pytest.raises(ValueError, match="Fetch linked documents"):
+        get_serializer(UserOut).dump(user)
+
+
+class RoleName(BaseModel):
+    name: str
+
+
+class Assignment(BaseModel):
+    role: Optional[RoleName] = None
+    roles: Optional[List[RoleName]] = None
+
+
+def test_optional_nested_schemas_are_constructed_from_documents():
+    role = Role(id=PydanticObjectId(), name="viewer", permissions=["posts:read"])
+    serializer = get_serializer(Assignment)
+
+    assert json.loads(serializer.dump({"role": role, "roles": [role]})) == {"role": {"name": "viewer"}, "roles": [{"name": "viewer"}]}
+    assert json.loads(serializer.dump({"role": None, "roles": None})) == {"role": None, "roles": None}
+
+
+def test_unsupported_nested_schemas_are_rejected_when_compiled():
+    class RolesByName(BaseModel):
+        roles: Dict[str, RoleName]
+
+    with pytest.raises(TypeError, match="nested schema"):
+        get_serializer(RolesByName)
+
+
+def test_fast_json_response_passes_encoded_bytes_through():
+    assert FastJSONResponse(b'{"a":1}').body == b'{"a":1}'
+    assert json.loads(FastJSONResponse({"a": [1, 2]}).body) == {"a": [1, 2]}
@@ -0,0 +1,63 @@
+# tests/core/test_tenancy.py
+
+import pytest
+import pytest_asyncio
+from pymongo.errors import DuplicateKeyError
+
+from pydentity.core.config import get_settings
+from pydentity.core.models import Identity, IdentityType
+from pydentity.core.tenancy import (
+    MappingTenantRouter,
+    TenantRouter,
+    get_current_tenant,
+    set_tenant_router,
+    tenant_context,
+)
+
+
+@pytest_asyncio.fixture
+async def client(mongo_db):
+    yield mongo_db.client
+    set_tenant_router(TenantRouter())
+
+
+async def make_identity(username):
+    identity = Identity(username=username, identity_type=IdentityType.user)
+    await identity.insert()
+    return identity
+
+
+def test_tenant_context_nests():
+    assert get_current_tenant() is None
+    with tenant_context("acme"):
+        with tenant_context("globex"):
+            assert get_current_tenant() == "globex"
+        assert get_current_tenant() == "acme"
+    assert get_current_tenant() is None
+
+
+@pytest.mark.asyncio
+async def test_usernames_are_unique_per_tenant(client):
+    with tenant_context("acme"):
+        acme_alice = await make_identity("alice01")
+        with pytest.raises(DuplicateKeyError):
+            await make_identity("alice01")
+    with tenant_context("globex"):
+        globex_alice = await make_identity("alice01")
+        assert (await Identity.by_username("alice01")).id == globex_alice.id
+
+    assert acme_alice.tenant_id == "acme"
+    assert await Identity.by_username("alice01") is None
+
+
+@pytest.mark.asyncio
+async def test_router_moves_a_tenant_to_its_own_database(client):
+    set_tenant_router(MappingTenantRouter({"acme": "pydentity_acme"}))
+    with tenant_context("acme"):
+        await make_identity("alice01")
+        assert (await Identity.by_username("alice01")).tenant_id == "acme"
+    with tenant_context("globex"):
+        await make_identity("bob0001")
+
+    assert await client["pydentity_acme"]["identities"].count_documents({}) == 1
+    assert await client[get_settings().TEST_MONGODB_DB_NAME]["identities"].count_documents({}) == 1
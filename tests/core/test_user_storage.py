@@ -0,0 +1,49 @@
+# tests/core/test_user_storage.py
+
+import pytest
+
+from pydentity.core.models import Identity, IdentityType, User, VerificationStatus
+from pydentity.core.services import AuthService, TokenService
+
+
+@pytest.mark.asyncio
+async def test_users_share_the_identities_collection_settings(identities_db):
+    settings = User.get_settings()
+    assert settings.name == "identities"
+    assert settings.use_state_management is True
+    assert settings.use_revision is True
+
+
+@pytest.mark.asyncio
+async def test_users_are_found_as_identities(identities_db):
+    user = User(username="alice01", email="alice@example.com", hashed_password="hash", identity_type=IdentityType.user)
+    await user.insert()
+
+    assert (await Identity.find_one({"username": "alice01"})) is not None
+    token = TokenService().create_identity_token(user)
+    identity = await AuthService(TokenService()).get_current_identity(token)
+    assert identity.id == user.id
+
+
+@pytest.mark.asyncio
+async def test_user_changes_are_saved_as_partial_updates(identities_db):
+    user = User(username="bob0001", email="bob@example.com", hashed_password="hash", identity_type=IdentityType.user)
+    await user.insert()
+
+    await user.add_claim("department", "ops")
+    stored = await User.get(user.id)
+    assert stored.claims == {"department": ["ops"]}
+    assert stored.revision_id == user.revision_id
+
+
+@pytest.mark.asyncio
+async def test_verify_identity_needs_a_pending_verification(identities_db):
+    user = User(username="carol01", email="carol@example.com", hashed_password="hash", identity_type=IdentityType.user)
+    await user.insert()
+
+    assert not await user.verify_identity()
+    assert await user.initiate_verification()
+    assert await user.verify_identity()
+    assert user.email_verified
+    assert (await User.get(user.id)).verification_status == VerificationStatus.verified
+    assert not await user.verify_identity()
@@ -0,0 +1,112 @@
+# tests/routers/test_auth.py
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+
+from pydentity.core.config import get_settings
+from pydentity.core.deps import get_auth_service
+from pydentity.core.models import IdentityType, User
+from pydentity.core.resilience import get_circuit_breaker, reset_circuit_breakers
+from pydentity.core.services import AuthService, TokenService
+from pydentity.core.services.login_throttle import LoginThrottle
+from pydentity.core.services.sso_service import SSOService
+from pydentity.core.tenancy import TENANT_CLAIM, TENANT_HEADER, get_current_tenant, set_current_tenant
+from pydentity.routers.auth import router
+
+
+def facebook(request):
+    """Answers Graph API calls: "good-token" belongs to a known user, anything else is rejected."""
+    if request.url.params["access_token"] == "good-token":
+        return httpx.Response(200, json={"id": "fb-1", "email": "erin@example.com", "name": "Erin Example"})
+    return httpx.Response(400, json={"error": {"message": "Invalid OAuth access token"}})
+
+
+@pytest_asyncio.fixture
+async def client(identities_db):
+    # Sources lock after two failures, usernames effectively never
+    throttle = LoginThrottle(max_failures_per_username=100, max_failures_per_source=2, window_seconds=60, lockout_seconds=300)
+    reset_circuit_breakers()
+    sso_service = SSOService(httpx.AsyncClient(transport=httpx.MockTransport(facebook)))
+
+    def auth_service():
+        service = AuthService(TokenService(), sso_service=sso_service)
+        service.login_throttle = throttle
+        return service
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_auth_service] = auth_service
+    service = auth_service()
+    await User(username="alice01", email="alice@example.com", hashed_password=service.get_password_hash("Secret123!"),
+               identity_type=IdentityType.user).insert()
+    await User(username="alice01", email="alice@acme.example.com", hashed_password=service.get_password_hash("Acme123!"),
+               identity_type=IdentityType.user, tenant_id="acme").insert()
+    transport = httpx.ASGITransport(app=app, client=("203.0.113.7", 4000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    set_current_tenant(None)
+    reset_circuit_breakers()
+    await sso_service.http_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_login_issues_an_access_token(client):
+    response = await client.post("/token", data={"username": "alice01", "password": "Secret123!"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["token_type"] == "bearer"
+    assert TokenService().decode_token(body["access_token"])["sub"] == "alice01"
+
+
+@pytest.mark.asyncio
+async def test_failures_are_counted_per_client_address(client):
+    for username in ("alice01", "bob0001"):
+        response = await client.post("/token", data={"username": username, "password": "wrong"})
+        assert response.status_code == 401
+
+    # The address is locked out, even with the right password
+    response = await client.post("/token", data={"username": "alice01", "password": "Secret123!"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+
+
+@pytest.mark.asyncio
+async def test_tenant_users_log_in_with_the_tenant_header(client):
+    response = await client.post("/token", data={"username": "alice01", "password": "Acme123!"}, headers={TENANT_HEADER: "acme"})
+    assert response.status_code == 200
+    claims = TokenService().decode_token(response.json()["access_token"])
+    assert claims["sub"] == "alice01"
+    assert claims[TENANT_CLAIM] == "acme"
+    assert get_current_tenant() is None
+
+    # The same username outside the tenant is another user with another password
+    response = await client.post("/token", data={"username": "alice01", "password": "Acme123!"})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_sso_sign_in_issues_a_token_for_the_tenant(client):
+    response = await client.post("/sso", json={"provider": "facebook", "token": "good-token"}, headers={TENANT_HEADER: "acme"})
+    assert response.status_code == 200
+    claims = TokenService().decode_token(response.json()["access_token"])
+    assert claims[TENANT_CLAIM] == "acme"
+    assert (await User.find_one({"tenant_id": "acme", "sso_id": "fb-1"})).username == claims["sub"]
+
+
+@pytest.mark.asyncio
+async def test_sso_tokens_rejected_by_the_provider_are_bad_requests(client):
+    response = await client.post("/sso", json={"provider": "facebook", "token": "revoked-token"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_sso_sign_in_is_unavailable_while_the_provider_circuit_is_open(client):
+    breaker = get_circuit_breaker("facebook")
+    for _ in range(get_settings().SSO_BREAKER_FAILURES):
+        breaker.record_failure()
+
+    response = await client.post("/sso", json={"provider": "facebook", "token": "another-good-token"})
+    assert response.status_code == 503
+    assert response.json()["detail"] == "facebook sign-in is temporarily unavailable"
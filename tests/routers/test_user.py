@@ -0,0 +1,119 @@
+# tests/routers/test_user.py
+
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+
+from pydentity.core.models import Identity, IdentityType, Role
+from pydentity.core.services import IdentityService, TokenService
+from pydentity.core.tenancy import tenant_context
+from pydentity.routers.user import IDENTITIES_EXPORT, IDENTITIES_READ, router
+
+
+async def make_identity(username, permissions=(), tenant_id=None, **fields):
+    roles = []
+    if permissions:
+        role = Role(name=f"{username}-role", permissions=list(permissions), effective_permissions=list(permissions))
+        await role.insert()
+        roles.append(role)
+    identity = Identity(username=username, identity_type=IdentityType.user, tenant_id=tenant_id, roles=roles, **fields)
+    await identity.insert()
+    return identity
+
+
+@pytest_asyncio.fixture
+async def client(identities_db):
+    app = FastAPI()
+    app.include_router(router)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+def auth(identity):
+    return {"Authorization": f"Bearer {TokenService().create_identity_token(identity)}"}
+
+
+@pytest.mark.asyncio
+async def test_list_identities_pages_through_the_tenant(client):
+    admin = await make_identity("admin01", [IDENTITIES_READ], tenant_id="acme")
+    for i in range(4):
+        await make_identity(f"member{i:02d}", tenant_id="acme")
+    await make_identity("outsider", tenant_id="globex")
+
+    first = await client.get("/identities", params={"limit": 3}, headers=auth(admin))
+    assert first.status_code == 200
+    page = first.json()
+    assert len(page["items"]) == 3
+    assert page["next_cursor"] is not None
+
+    second = await client.get("/identities", params={"limit": 3, "after": page["next_cursor"]}, headers=auth(admin))
+    rest = second.json()
+    assert rest["next_cursor"] is None
+    usernames = {item["username"] for item in page["items"] + rest["items"]}
+    assert usernames == {"admin01", "member00", "member01", "member02", "member03"}
+
+
+@pytest.mark.asyncio
+async def test_list_identities_requires_the_read_permission(client):
+    member = await make_identity("member01", ["identities:export"])
+
+    response = await client.get("/identities", headers=auth(member))
+    assert response.status_code == 403
+    assert response.json()["detail"] == f"Permission denied: {IDENTITIES_READ}"
+
+
+@pytest.mark.asyncio
+async def test_list_identities_rejects_bad_cursors(client):
+    admin = await make_identity("admin01", [IDENTITIES_READ])
+
+    response = await client.get("/identities", params={"after": "not-a-cursor"}, headers=auth(admin))
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_export_identities_streams_ndjson(client):
+    admin = await make_identity("admin01", ["identities:*"])
+    await make_identity("member01", is_active=False)
+
+    response = await client.get("/identities/export", params={"is_active": False}, headers=auth(admin))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["username"] for line in lines] == ["member01"]
+    assert "hashed_password" not in lines[0]
+
+
+@pytest.mark.asyncio
+async def test_export_identities_requires_the_export_permission(client):
+    reader = await make_identity("reader01", [IDENTITIES_READ])
+
+    response = await client.get("/identities/export", headers=auth(reader))
+    assert response.status_code == 403
+    assert response.json()["detail"] == f"Permission denied: {IDENTITIES_EXPORT}"
+
+
+@pytest.mark.asyncio
+async def test_requests_without_a_valid_token_are_rejected(client):
+    response = await client.get("/identities", headers={"Authorization": "Bearer not-a-token"})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_export_skips_secrets_and_other_tenants(identities_db):
+    await make_identity("member01", tenant_id="acme")
+    await make_identity("member02", tenant_id="globex")
+    with tenant_context("acme"):
+        body = b"".join([chunk async for chunk in IdentityService(None).export_identities()])
+    assert [json.loads(line)["username"] for line in body.splitlines()] == ["member01"]
+
+
+@pytest.mark.asyncio
+async def test_identities_load_their_roles_for_permission_checks(identities_db):
+    stored = await make_identity("admin01", [IDENTITIES_READ])
+
+    identity = await Identity.get(stored.id)
+    assert await identity.has_role_permission(IDENTITIES_READ)
+    assert not await identity.has_role_permission(IDENTITIES_EXPORT)
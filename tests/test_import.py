@@ -0,0 +1,36 @@
+# tests/test_import.py
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.import_time import HEAVY_MODULES
+
+
+def loaded_modules(code: str):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    process = subprocess.run([sys.executable, "-c", code + "; import sys; print(','.join(sorted(sys.modules)))"],
+                             capture_output=True, text=True, env=env, check=True)
+    return set(process.stdout.strip().split(","))
+
+
+def test_import_pydentity_is_lazy():
+    modules = loaded_modules("import pydentity, pydentity.core, pydentity.core.models, pydentity.utils")
+    assert not [name for name in HEAVY_MODULES if name in modules]
+
+
+@pytest.mark.parametrize("name", ["Settings", "get_settings", "MetricsMiddleware", "ReadYourWritesMiddleware"])
+def test_lazy_attributes_resolve(name):
+    import pydentity
+
+    assert name in dir(pydentity)
+    assert getattr(pydentity, name).__name__ == name
+
+
+def test_unknown_attribute_raises():
+    import pydentity
+
+    with pytest.raises(AttributeError):
+        pydentity.DoesNotExist
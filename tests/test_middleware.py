@@ -0,0 +1,99 @@
+# tests/test_middleware.py
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from pydentity.core.config import get_settings
+from pydentity.core.metrics import TOKEN_SECONDS, configure_metrics, render_prometheus, reset_metrics, timed
+from pydentity.core.read_preference import current_read_preference, mark_written, read_preference
+from pydentity.middleware import MetricsMiddleware, ReadYourWritesMiddleware
+
+
+@pytest.fixture
+def metrics():
+    reset_metrics()
+    yield
+    configure_metrics(False)
+    reset_metrics()
+
+
+def make_app(**kwargs):
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        with timed(TOKEN_SECONDS, operation="encode"):
+            pass
+        return {"item_id": item_id}
+
+    app.add_middleware(MetricsMiddleware, path="/metrics", **kwargs)
+    return app
+
+
+def test_metrics_endpoint_serves_prometheus_text(metrics):
+    client = TestClient(make_app(enabled=True, tracing=False))
+    client.get("/items/1")
+    client.get("/items/2")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert "# TYPE pydentity_token_seconds histogram" in body
+    assert 'pydentity_token_seconds_count{operation="encode"} 2' in body
+    assert 'pydentity_http_request_seconds_count{method="GET",route="/items/{item_id}",status="200"} 2' in body
+
+
+def test_disabled_metrics_record_nothing(metrics):
+    client = TestClient(make_app(enabled=False, tracing=False))
+    client.get("/items/1")
+
+    assert "pydentity_token_seconds_count" not in client.get("/metrics").text
+
+
+def test_errors_are_counted(metrics):
+    configure_metrics(True)
+    with pytest.raises(ValueError):
+        with timed(TOKEN_SECONDS, operation="decode"):
+            raise ValueError("bad token")
+
+    body = render_prometheus()
+    assert 'pydentity_errors_total{metric="pydentity_token_seconds",operation="decode"} 1' in body
+
+
+def make_pinning_app():
+    app = FastAPI()
+
+    @app.post("/identities")
+    async def write():
+        mark_written(("acme", "username", "alice01"))
+        return {}
+
+    @app.get("/identities/me")
+    async def read():
+        with read_preference("by_username"):
+            return {"mode": current_read_preference().mongos_mode}
+
+    app.add_middleware(ReadYourWritesMiddleware, window_seconds=30)
+    return app
+
+
+def test_clients_that_wrote_read_from_the_primary(monkeypatch):
+    monkeypatch.setattr(get_settings(), "READ_PREFERENCE", "secondaryPreferred")
+    app = make_pinning_app()
+    writer = TestClient(app)
+
+    response = writer.post("/identities")
+    assert response.cookies[get_settings().READ_YOUR_WRITES_COOKIE]
+    # The pin travels with the client, so it holds on whichever worker the next request reaches
+    assert writer.get("/identities/me").json() == {"mode": "primary"}
+    assert TestClient(app).get("/identities/me").json() == {"mode": "secondaryPreferred"}
+
+
+def test_pins_beyond_one_window_are_ignored(monkeypatch):
+    monkeypatch.setattr(get_settings(), "READ_PREFERENCE", "secondaryPreferred")
+    client = TestClient(make_pinning_app())
+
+    client.cookies.set(get_settings().READ_YOUR_WRITES_COOKIE, "99999999999")
+    assert client.get("/identities/me").json() == {"mode": "secondaryPreferred"}
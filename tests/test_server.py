@@ -0,0 +1,109 @@
+# tests/test_server.py
+
+import gc
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import time
+import urllib.request
+
+import pytest
+from fastapi import FastAPI
+
+from pydentity.server import WORKER_BOOT_FAILED, load_app, preload
+
+APP = '''
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+state = {"ready": False}
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if os.environ.get("FAIL_STARTUP"):
+        raise RuntimeError("database unreachable")
+    await asyncio.sleep(0.2)
+    state["ready"] = True
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.get("/worker")
+async def worker():
+    from pydentity.core.services.activity_tracker import get_activity_tracker
+    from pydentity.core.services.email_service import get_email_queue
+
+    running = get_email_queue().running and get_activity_tracker().running
+    return {"pid": os.getpid(), "ready": state["ready"], "services": running}
+'''
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(tmp_path, port, **env):
+    (tmp_path / "served_app.py").write_text(textwrap.dedent(APP))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(tmp_path)] + sys.path), **env)
+    command = [sys.executable, "-m", "pydentity", "serve", "served_app:app", "--port", str(port), "--workers", "2", "--log-level", "warning"]
+    return subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+
+def get(url, deadline):
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                return json.loads(response.read())
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def test_load_app():
+    assert load_app("pydentity.server:load_app") is load_app
+    with pytest.raises(ValueError):
+        load_app("pydentity.server")
+
+
+def test_preload_builds_shared_state_and_freezes_it():
+    app = FastAPI()
+    try:
+        preload(app)
+        assert app.openapi_schema is not None
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+
+def test_workers_accept_connections_only_once_started(tmp_path):
+    port = free_port()
+    # The email queue only starts with an SMTP server configured; it connects on the first message
+    process = start_server(tmp_path, port, SMTP_HOST="127.0.0.1")
+    try:
+        deadline = time.monotonic() + 30
+        replies = [get(f"http://127.0.0.1:{port}/worker", deadline) for _ in range(10)]
+        assert all(reply["ready"] and reply["services"] for reply in replies)
+        assert process.pid not in {reply["pid"] for reply in replies}
+    finally:
+        process.send_signal(signal.SIGTERM)
+        output = process.communicate(timeout=30)[0]
+    assert process.returncode == 0, output.decode()
+
+
+def test_server_stops_when_a_worker_cannot_start(tmp_path):
+    process = start_server(tmp_path, free_port(), FAIL_STARTUP="1")
+    output = process.communicate(timeout=30)[0]
+    assert process.returncode == WORKER_BOOT_FAILED, output.decode()
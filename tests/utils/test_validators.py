@@ -0,0 +1,54 @@
+# tests/utils/test_validators.py
+
+import pytest
+
+from pydentity.utils.validators import (
+    password_errors,
+    validate_api_key,
+    validate_api_keys,
+    validate_password,
+    validate_passwords,
+    validate_username,
+    validate_usernames,
+)
+
+
+@pytest.mark.parametrize("password, errors", [
+    ("Str0ng!Pass", []),
+    ("short1!A", []),
+    ("Sh0!", ["min_length"]),
+    ("alllowercase", ["uppercase", "digit", "special"]),
+    ("ALLUPPER123!", ["lowercase"]),
+    ("", ["min_length", "uppercase", "lowercase", "digit", "special"]),
+])
+def test_password_errors_reports_every_failed_rule(password, errors):
+    assert password_errors(password, min_length=8) == errors
+
+
+def test_validate_password_uses_settings_min_length():
+    assert validate_password("Str0ng!Pass")
+    assert not validate_password("Sh0!")
+
+
+@pytest.mark.parametrize("username, valid", [
+    ("alice", True),
+    ("a_b-c", True),
+    ("1alice", False),
+    ("al", False),
+    ("a" * 31, False),
+    ("alice\n", False),
+])
+def test_validate_username(username, valid):
+    assert validate_username(username) is valid
+
+
+def test_validate_api_key():
+    assert validate_api_key("0123456789abcdef0123456789ABCDEF")
+    assert not validate_api_key("0123456789abcdef")
+    assert not validate_api_key("g" * 32)
+
+
+def test_batch_validators_return_per_row_results():
+    assert validate_passwords(["Str0ng!Pass", "weak"]) == [[], ["min_length", "uppercase", "digit", "special"]]
+    assert validate_usernames(["alice", "1bob", "carol"]) == [True, False, True]
+    assert validate_api_keys(["a" * 32, "z" * 32]) == [True, False]